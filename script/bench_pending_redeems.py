@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for check_pending_redeems against a local JSON-RPC stand-in.
+
+`serve` starts a JSON-RPC server that answers eth_chainId, eth_blockNumber,
+eth_getBlockByNumber, eth_getLogs, eth_getStorageAt, eth_getProof and Multicall3
+aggregate3 eth_calls from a synthetic withdrawal queue. eth_calls with a state
+override run the overriding code on a tiny EVM interpreter, enough for the range
+reader. Request fields are computed from the id and block, so queues of a million
+requests need no memory and historical blocks answer consistently with the logs.
+Latency and errors can be injected. The node itself is tests/stand_in.py, which the
+unit tests serve too.
+
+`run` (the default) starts that server in a subprocess and runs each benchmark
+case in a fresh child process against it, so peak RSS is measured per case. It
+reports requests/sec, RPC round trips, bytes moved and peak RSS. Cases:
+
+  fetch   fetch_requests() into a list
+  stream  iter_request_keys() without keeping results
+  aio     AIO_CHECKS RedeemsClient.check() calls over one long-lived client
+  csv, ndjson, json, table
+          the full check_pending_redeems CLI writing that format to /dev/null
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import socket
+import subprocess
+import sys
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from pending_redeems import cli
+from pending_redeems import core as redeems
+from pending_redeems.aio import RedeemsClient
+from tests.stand_in import StandInNode, SyntheticQueue, make_handler
+
+RPC_STATS_LINE = re.compile(
+    r"rpc: (?P<requests>\d+) requests .* sent: (?P<sent>\d+) B .* received: (?P<received>\d+) B"
+)
+CASES = ["fetch", "stream", "aio", "csv", "ndjson", "json", "table"]
+AIO_CHECKS = 10
+
+
+def serve(args: argparse.Namespace) -> int:
+    queue = SyntheticQueue(args.size, args.claimed_fraction, args.words)
+    failing_ids = frozenset(int(value) for value in args.failing_ids.split(",") if value)
+    node = StandInNode(
+        queue, args.error_rate, args.max_calls, not args.no_state_override, args.subcall_error_rate, failing_ids
+    )
+    handler = make_handler(node, args.latency_ms / 1000, args.http_error_rate, args.slow_fraction, args.slow_ms / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    server.daemon_threads = True
+    print(f"serving {args.size} requests on http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def check_repeatedly(args: argparse.Namespace) -> tuple[int, redeems.TransportStats]:
+    """Check the whole queue AIO_CHECKS times from one RedeemsClient, like a service polling it."""
+    async with RedeemsClient(
+        args.rpc_url,
+        concurrency=args.concurrency,
+        calls_per_post=args.calls_per_post,
+        batch_size=args.batch_size,
+        target_latency=args.target_latency,
+        reader=args.reader,
+    ) as client:
+        count = 0
+        for _ in range(AIO_CHECKS):
+            report = await client.check(include_claimed=True)
+            count += len(report.requests)
+    return count, client.client.transport.stats
+
+
+def run_case(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    if args.case in ("fetch", "stream"):
+        client = redeems.RpcClient(args.rpc_url, timeout=90)
+        client.reader = args.reader
+        if args.resilient:
+            client.failures = redeems.FailureReport(client.retries + 1)
+        block_tag, snapshot, _ = redeems.fetch_pinned_snapshot(client, redeems.DEFAULT_ARM, "latest")
+        sizer = redeems.BatchSizer(args.batch_size, args.target_latency)
+        if args.case == "fetch":
+            count = len(
+                redeems.fetch_requests(
+                    client,
+                    redeems.DEFAULT_ARM,
+                    block_tag,
+                    0,
+                    snapshot.next_withdrawal_index,
+                    sizer,
+                    args.concurrency,
+                    args.calls_per_post,
+                )
+            )
+        else:
+            keys = ((redeems.DEFAULT_ARM, request_id) for request_id in range(snapshot.next_withdrawal_index))
+            count = sum(
+                len(chunk)
+                for chunk in redeems.iter_request_keys(
+                    client, block_tag, keys, sizer, args.concurrency, args.calls_per_post
+                )
+            )
+        stats = client.transport.stats
+    elif args.case == "aio":
+        count, stats = asyncio.run(check_repeatedly(args))
+    else:
+        argv = [
+            "--rpc-url",
+            args.rpc_url,
+            "--format",
+            args.case,
+            "--out",
+            os.devnull,
+            "--include-claimed",
+            "--batch-size",
+            str(args.batch_size),
+            "--target-latency",
+            str(args.target_latency),
+            "--concurrency",
+            str(args.concurrency),
+            "--calls-per-post",
+            str(args.calls_per_post),
+            "--reader",
+            args.reader,
+            *(["--resilient"] if args.resilient else []),
+            "--rpc-stats",
+        ]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            sys.argv = ["check_pending_redeems.py", *argv]
+            cli.main()
+        count = args.size
+        # Parse the --rpc-stats line rather than reaching into main()'s client.
+        match = RPC_STATS_LINE.search(stderr.getvalue())
+        if match is None:
+            raise RuntimeError(f"no --rpc-stats line in stderr: {stderr.getvalue()!r}")
+        stats = redeems.TransportStats(
+            requests=int(match["requests"]),
+            bytes_sent=int(match["sent"]),
+            bytes_received=int(match["received"]),
+        )
+
+    elapsed = time.perf_counter() - started
+    print(
+        json.dumps(
+            {
+                "case": args.case,
+                "size": args.size,
+                "seconds": round(elapsed, 4),
+                "requests_per_second": round(count / elapsed, 1) if elapsed else None,
+                "round_trips": stats.requests,
+                "bytes_sent": stats.bytes_sent,
+                "bytes_received": stats.bytes_received,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            }
+        )
+    )
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(args: argparse.Namespace) -> int:
+    script = str(Path(__file__).resolve())
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        port = free_port()
+        server_cmd = [
+            sys.executable,
+            script,
+            "serve",
+            "--port",
+            str(port),
+            "--size",
+            str(size),
+            "--claimed-fraction",
+            str(args.claimed_fraction),
+            "--words",
+            str(args.words),
+            "--latency-ms",
+            str(args.latency_ms),
+            "--error-rate",
+            str(args.error_rate),
+            "--http-error-rate",
+            str(args.http_error_rate),
+            "--slow-fraction",
+            str(args.slow_fraction),
+            "--slow-ms",
+            str(args.slow_ms),
+            *(["--max-calls", str(args.max_calls)] if args.max_calls else []),
+            *(["--no-state-override"] if args.no_state_override else []),
+            "--subcall-error-rate",
+            str(args.subcall_error_rate),
+            "--failing-ids",
+            args.failing_ids,
+        ]
+        server = subprocess.Popen(server_cmd, stdout=subprocess.PIPE, text=True)
+        try:
+            server.stdout.readline()
+            for case in args.cases.split(","):
+                case_cmd = [
+                    sys.executable,
+                    script,
+                    "case",
+                    "--case",
+                    case,
+                    "--rpc-url",
+                    f"http://127.0.0.1:{port}",
+                    "--size",
+                    str(size),
+                    "--batch-size",
+                    str(args.batch_size),
+                    "--target-latency",
+                    str(args.target_latency),
+                    "--concurrency",
+                    str(args.concurrency),
+                    "--calls-per-post",
+                    str(args.calls_per_post),
+                    "--reader",
+                    args.reader,
+                    *(["--resilient"] if args.resilient else []),
+                ]
+                output = subprocess.run(case_cmd, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                print(
+                    f"{result['case']:<7} {size:>9} req  {result['seconds']:8.3f} s  "
+                    f"{result['requests_per_second']:>11.1f} req/s  {result['round_trips']:>6} RTs  "
+                    f"{result['bytes_sent'] / 1e6:8.2f} MB out  {result['bytes_received'] / 1e6:8.2f} MB in  "
+                    f"{result['peak_rss_mb']:7.1f} MB RSS",
+                    flush=True,
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+def add_queue_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--claimed-fraction", type=float, default=0.9, help="Share of the queue that is claimed.")
+    parser.add_argument(
+        "--words",
+        type=int,
+        choices=[5, 6],
+        default=5,
+        help="withdrawalRequests return words: 5 for the current layout, 6 for the legacy layout with shares.",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every HTTP request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of JSON-RPC calls that fail.")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="Fraction of HTTP POSTs answered with 503.")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Fraction of HTTP POSTs delayed by --slow-ms.")
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="Extra delay of the --slow-fraction POSTs.")
+    parser.add_argument(
+        "--subcall-error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of withdrawalRequests subcalls that fail, reverting aggregate3 unless allowFailure is set.",
+    )
+    parser.add_argument(
+        "--failing-ids",
+        default="",
+        help="Comma-separated request ids whose withdrawalRequests subcall always fails.",
+    )
+    parser.add_argument(
+        "--max-calls",
+        type=int,
+        default=None,
+        help="Fail aggregate3 calls and range reader runs with more subcalls than this with an out-of-gas error.",
+    )
+    parser.add_argument(
+        "--no-state-override",
+        action="store_true",
+        help="Ignore eth_call state overrides, like a provider that does not support them.",
+    )
+
+
+def add_client_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--batch-size", type=int, default=redeems.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--target-latency", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--calls-per-post", type=int, default=8)
+    parser.add_argument("--reader", choices=redeems.READERS, default="multicall")
+    parser.add_argument("--resilient", action="store_true")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark check_pending_redeems against a local JSON-RPC server.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Start a server and run the benchmark cases (default).")
+    run_parser.add_argument("--sizes", default="1000,10000", help="Comma-separated queue sizes.")
+    run_parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated cases from {CASES}.")
+    run_parser.add_argument("--json-out", default=None, help="Also write the results to this JSON file.")
+    add_queue_args(run_parser)
+    add_client_args(run_parser)
+
+    serve_parser = subparsers.add_parser("serve", help="Only run the stand-in JSON-RPC server.")
+    serve_parser.add_argument("--port", type=int, default=8545)
+    serve_parser.add_argument("--size", type=int, default=10_000, help="Number of requests in the queue.")
+    add_queue_args(serve_parser)
+
+    case_parser = subparsers.add_parser("case", help="Run one case against a running server.")
+    case_parser.add_argument("--case", choices=CASES, required=True)
+    case_parser.add_argument("--rpc-url", required=True)
+    case_parser.add_argument("--size", type=int, required=True)
+    add_client_args(case_parser)
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in ("run", "serve", "case", "-h", "--help"):
+        argv = ["run", *argv]
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "serve":
+        return serve(args)
+    if args.command == "case":
+        return run_case(args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Micro-benchmark the withdrawalRequests aggregate3 decoders in check_pending_redeems.
+
+Builds a synthetic Multicall3 aggregate3 return for one batch and times the
+generic decoder (decode_aggregate3_return + decode_withdrawal_request) against
+the fixed-layout decode_withdrawal_requests. No RPC is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from pending_redeems import core as redeems
+
+
+def synthetic_aggregate3_return(count: int, words: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    queued = 0
+    payloads = []
+    for request_id in range(count):
+        assets = rng.randrange(1, 10**21)
+        queued += assets
+        fields = [rng.getrandbits(160), request_id % 3 == 0, 1_700_000_000 + request_id, assets, queued]
+        if words == 6:
+            fields.append(assets)
+        payloads.append(b"".join(redeems.word(field) for field in fields))
+
+    tuples = [redeems.word(True) + redeems.word(64) + redeems.encode_bytes(payload) for payload in payloads]
+    offsets = []
+    offset = 32 * count
+    for encoded in tuples:
+        offsets.append(redeems.word(offset))
+        offset += len(encoded)
+    return "0x" + (redeems.word(32) + redeems.word(count) + b"".join(offsets) + b"".join(tuples)).hex()
+
+
+def generic_decode(hex_data: str, request_ids: list[int]) -> list[redeems.WithdrawalRequest]:
+    results = redeems.decode_aggregate3_return(hex_data)
+    return [
+        redeems.decode_withdrawal_request(request_id, return_data)
+        for request_id, (_, return_data) in zip(request_ids, results, strict=True)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the withdrawalRequests aggregate3 decoders.")
+    parser.add_argument("--batch-size", type=int, default=250, help="withdrawalRequests results per aggregate3.")
+    parser.add_argument("--words", type=int, choices=[5, 6], default=5, help="Return words per request.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats; the best one is reported.")
+    parser.add_argument("--number", type=int, default=20, help="Decodes per timing repeat.")
+    args = parser.parse_args()
+
+    hex_data = synthetic_aggregate3_return(args.batch_size, args.words)
+    request_ids = list(range(args.batch_size))
+    if redeems.decode_withdrawal_requests(hex_data, request_ids) != generic_decode(hex_data, request_ids):
+        raise SystemExit("decoders disagree")
+
+    cases = [
+        ("generic", lambda: generic_decode(hex_data, request_ids)),
+        ("fixed-layout", lambda: redeems.decode_withdrawal_requests(hex_data, request_ids)),
+    ]
+
+    print(f"batch: {args.batch_size} requests, {args.words}-word layout, {len(hex_data) // 2} bytes of hex")
+    baseline = None
+    for name, func in cases:
+        best = min(timeit.repeat(func, repeat=args.repeat, number=args.number)) / args.number
+        baseline = baseline or best
+        per_request = best / args.batch_size * 1e6
+        print(f"{name:<18} {best * 1e3:8.3f} ms/batch  {per_request:6.2f} us/request  {baseline / best:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
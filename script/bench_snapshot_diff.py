@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Micro-benchmark writing, opening and diffing binary queue snapshots.
+
+Builds two synthetic snapshots of one queue, the later one with more requests
+and some of the earlier open ones claimed, and times write_snapshot_file,
+SnapshotFile and diff_snapshot_files on them. No RPC is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import timeit
+from pathlib import Path
+
+from pending_redeems import core as redeems
+from pending_redeems.snapshot_file import SnapshotFile, diff_snapshot_files, write_snapshot_file
+
+
+def synthetic_store(size: int, claimed_fraction: float, seed: int = 1) -> redeems.RequestStore:
+    rng = random.Random(seed)
+    store = redeems.RequestStore()
+    queued = 0
+    for request_id in range(size):
+        assets = rng.randrange(1, 10**21)
+        queued += assets
+        claimed = request_id < size * claimed_fraction
+        withdrawer = "0x" + rng.getrandbits(160).to_bytes(20, "big").hex()
+        request = redeems.WithdrawalRequest(
+            request_id, withdrawer, claimed, 1_700_000_000 + request_id, assets, queued, None, "assets"
+        )
+        store.append(request, "claimed" if claimed else "waiting_liquidity")
+    return store
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark binary snapshot files and their diff.")
+    parser.add_argument("--size", type=int, default=100_000, help="Requests in the later snapshot.")
+    parser.add_argument("--new", type=int, default=1000, help="Requests the later snapshot adds.")
+    parser.add_argument("--claimed-fraction", type=float, default=0.9, help="Share of the queue that is claimed.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats; the best one is reported.")
+    args = parser.parse_args()
+
+    target = redeems.ArmTarget("lidoARM", redeems.DEFAULT_ARM.lower(), 18)
+    old_store = synthetic_store(args.size - args.new, args.claimed_fraction)
+    new_store = synthetic_store(args.size, args.claimed_fraction)
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path, new_path = Path(tmp) / "old.snap", Path(tmp) / "new.snap"
+        old_snapshot = redeems.Snapshot(20_000_000, 1_700_000_000, len(old_store), 0, 600)
+        new_snapshot = redeems.Snapshot(20_001_000, 1_700_012_000, len(new_store), 0, 600)
+        write_snapshot_file(old_path, target, 1, old_snapshot, old_store)
+        write_snapshot_file(new_path, target, 1, new_snapshot, new_store)
+
+        def diff() -> int:
+            with SnapshotFile(old_path) as old, SnapshotFile(new_path) as new:
+                return len(diff_snapshot_files(old, new).changes)
+
+        cases = [
+            ("write", lambda: write_snapshot_file(new_path, target, 1, new_snapshot, new_store)),
+            ("open", lambda: SnapshotFile(new_path).close()),
+            ("diff", diff),
+        ]
+        print(f"snapshots: {len(old_store)} -> {len(new_store)} requests, {diff()} changed")
+        for name, func in cases:
+            best = min(timeit.repeat(func, repeat=args.repeat, number=1))
+            print(f"{name:<6} {best * 1e3:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
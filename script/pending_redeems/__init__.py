@@ -0,0 +1,47 @@
+"""Importable API of check_pending_redeems.py.
+
+RedeemsClient (in pending_redeems.aio) is the entry point for services that
+check queues repeatedly from one process; pending_redeems.core holds the RPC
+client, readers and request classification it is built on. Names are loaded
+on first use, so importing the package for the command line stays cheap.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any
+
+_EXPORTS = {
+    "RedeemsClient": "aio",
+    "ArmTarget": "core",
+    "DEFAULT_ARM": "core",
+    "KNOWN_ARMS": "core",
+    "QueueCounts": "core",
+    "QueuePlan": "core",
+    "QueueReport": "core",
+    "QueueScan": "core",
+    "ReaderFallbackWarning": "core",
+    "RpcClient": "core",
+    "Snapshot": "core",
+    "WithdrawalRequest": "core",
+    "WithdrawerTotals": "core",
+    "build_rows": "core",
+    "fetch_pinned_snapshot": "core",
+    "fetch_requests": "core",
+    "fetch_snapshot": "core",
+    "plan_queue": "core",
+    "scan_plans": "core",
+    "scan_queues": "core",
+    "SnapshotDiff": "snapshot_file",
+    "SnapshotFile": "snapshot_file",
+    "diff_snapshot_files": "snapshot_file",
+    "write_snapshot_file": "snapshot_file",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
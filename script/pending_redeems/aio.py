@@ -0,0 +1,160 @@
+"""Asyncio API for services that check ARM redeem queues from one long-lived process.
+
+    async with RedeemsClient(os.environ["MAINNET_URL"]) as redeems:
+        report = await redeems.check("lidoARM")
+        print(report.counts.claimable_now_count, report.totals.claimable_now_assets)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from .core import (
+    DEFAULT_ARM,
+    DEFAULT_BATCH_SIZE,
+    READERS,
+    ArmTarget,
+    BatchSizer,
+    CallCache,
+    QueueReport,
+    RpcClient,
+    ScanState,
+    Snapshot,
+    fall_back_to_multicall,
+    fetch_pinned_snapshots,
+    resolve_arms,
+    scan_queues,
+    storage_layout_problem,
+)
+
+T = TypeVar("T")
+
+
+class RedeemsClient:
+    """Checks ARM redeem queues over one RpcClient that lives as long as this client.
+
+    Every check shares the keep-alive connections, the tuned batch size and the
+    claimed requests seen so far, so a repeated check only re-reads the requests
+    that are still open and those queued since. The RPC work runs on a small
+    thread pool and never blocks the event loop. Checks of the same ARM run one
+    at a time; checks of different ARMs run side by side.
+    """
+
+    def __init__(
+        self,
+        rpc_urls: str | list[str],
+        *,
+        concurrency: int = 8,
+        calls_per_post: int = 8,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        target_latency: float = 2.0,
+        reader: str = "multicall",
+        hedge: bool = True,
+        decimals: int = 18,
+        state_dir: str | Path | None = None,
+        cache: CallCache | None = None,
+        max_checks: int = 4,
+        timeout: int = 90,
+    ) -> None:
+        urls = [rpc_urls] if isinstance(rpc_urls, str) else list(rpc_urls)
+        if not urls:
+            raise ValueError("at least one RPC URL is required")
+        if reader not in READERS:
+            raise ValueError(f"unknown reader: {reader}. Expected one of {', '.join(READERS)}")
+
+        self.client = RpcClient(urls[0], timeout, cache=cache, fallback_urls=urls[1:], hedge=hedge)
+        self.client.reader = reader
+        self.sizer = BatchSizer(batch_size, target_latency)
+        self.concurrency = concurrency
+        self.calls_per_post = calls_per_post
+        self.decimals = decimals
+        self.state_dir = Path(state_dir) if state_dir else None
+        # The storage and proof readers are checked against Multicall3 once per ARM, before its first scan.
+        # The lock keeps the check and a fall back to Multicall3 from racing checks of other ARMs.
+        self._layout_checked: set[str] = set()
+        self._layout_lock = threading.Lock()
+        self._chain_id: int | None = None
+        # Claimed requests seen so far, by ARM address.
+        self._states: dict[str, ScanState] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_checks, thread_name_prefix="pending-redeems")
+
+    async def __aenter__(self) -> RedeemsClient:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def snapshot(self, arm: str = DEFAULT_ARM, block: int | str = "latest") -> Snapshot:
+        """Read the queue header of one ARM without fetching any request."""
+        targets = resolve_arms([arm], self.decimals)
+        _, snapshots, _ = await self._run(fetch_pinned_snapshots, self.client, [targets[0].address], str(block))
+        return snapshots[0]
+
+    async def check(
+        self, arm: str = DEFAULT_ARM, *, block: int | str = "latest", include_claimed: bool = False
+    ) -> QueueReport:
+        """Read and classify the queue of one ARM, given by address, name or preset."""
+        return (await self.check_many([arm], block=block, include_claimed=include_claimed))[0]
+
+    async def check_many(
+        self, arms: list[str], *, block: int | str = "latest", include_claimed: bool = False
+    ) -> list[QueueReport]:
+        """Read and classify the queues of several ARMs at one shared block."""
+        targets = resolve_arms(arms, self.decimals)
+        async with AsyncExitStack() as stack:
+            # Take the locks in address order so overlapping multi-ARM checks cannot deadlock.
+            for address in sorted(target.address for target in targets):
+                await stack.enter_async_context(self._locks.setdefault(address, asyncio.Lock()))
+            return await self._run(self._check_many, targets, str(block), include_claimed)
+
+    def _check_many(self, targets: list[ArmTarget], block_arg: str, include_claimed: bool) -> list[QueueReport]:
+        if self._chain_id is None:
+            self._chain_id = int(self.client.call("eth_chainId", []), 16)
+        self._check_layout(targets, block_arg)
+        for target in targets:
+            if target.address not in self._states:
+                self._states[target.address] = (
+                    ScanState.load(self.state_dir, self._chain_id, target.address)
+                    if self.state_dir
+                    else ScanState(None, self._chain_id, target.address)
+                )
+        return scan_queues(
+            self.client,
+            targets,
+            block_arg,
+            self.sizer,
+            self.concurrency,
+            self.calls_per_post,
+            include_claimed,
+            self._states,
+        )
+
+    def _check_layout(self, targets: list[ArmTarget], block_arg: str) -> None:
+        with self._layout_lock:
+            unchecked = [target for target in targets if target.address not in self._layout_checked]
+            if not unchecked or self.client.reader not in ("storage", "proof"):
+                return
+            block_tag, snapshots, _ = fetch_pinned_snapshots(
+                self.client, [target.address for target in unchecked], block_arg
+            )
+            problem = storage_layout_problem(
+                self.client, block_tag, [(target.address, snapshot) for target, snapshot in zip(unchecked, snapshots)]
+            )
+            if problem:
+                fall_back_to_multicall(self.client, problem)
+            self._layout_checked.update(target.address for target in unchecked)
+
+    async def aclose(self) -> None:
+        """Close the RPC connections; checks still running finish first."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.client.close()
@@ -0,0 +1,664 @@
+"""Command line of check_pending_redeems.py."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import warnings
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .core import (
+    ARM_PRESETS,
+    DEFAULT_ARM,
+    DEFAULT_BATCH_SIZE,
+    KNOWN_ARMS,
+    PROFILER,
+    READERS,
+    ArmTarget,
+    BatchSizer,
+    CallCache,
+    FailureReport,
+    Frontier,
+    QueuePlan,
+    QueueWatcher,
+    RequestStore,
+    RpcClient,
+    ScanState,
+    Snapshot,
+    TransportPool,
+    backfill_series,
+    build_rows,
+    deployment_block,
+    fall_back_to_multicall,
+    fetch_pinned_snapshots,
+    find_frontiers,
+    format_units,
+    iso_timestamp,
+    iter_request_keys,
+    load_dotenv,
+    open_ids_from_logs,
+    parse_block_range,
+    plan_queue,
+    resolve_arms,
+    resolve_withdrawers,
+    scan_plans,
+    storage_layout_problem,
+    withdrawer_request_ids,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fetch ARM withdrawalRequests via Multicall3 and list unclaimed requests.",
+        epilog="Run 'check_pending_redeems.py diff OLD NEW' to compare two --format snapshot files.",
+    )
+    parser.add_argument(
+        "--rpc-url",
+        action="append",
+        default=None,
+        help=(
+            "Ethereum RPC URL. Repeat to spread requests over several endpoints, with failover and hedging. "
+            "Defaults to MAINNET_URL plus the comma-separated MAINNET_FALLBACK_URLS from env or .env."
+        ),
+    )
+    parser.add_argument(
+        "--no-hedge",
+        action="store_true",
+        help="With several RPC URLs, never resend a slow request to a second endpoint.",
+    )
+    parser.add_argument(
+        "--arm",
+        action="append",
+        default=None,
+        help=(
+            f"ARM address, ARM name ({', '.join(KNOWN_ARMS)}) or preset ({', '.join(ARM_PRESETS)}). "
+            "Repeat or comma-separate to scan several ARMs at one block. "
+            f"Defaults to stETH ARM {DEFAULT_ARM}."
+        ),
+    )
+    parser.add_argument(
+        "--block",
+        default="latest",
+        help="Block number or 'latest'. Calls are pinned to this block.",
+    )
+    parser.add_argument(
+        "--block-range",
+        default=None,
+        help=(
+            "START:END:STEP. Write a time series of queue metrics sampled every STEP blocks from START to END "
+            "(inclusive) instead of listing requests. Only the first sample reads every open request; later "
+            "samples follow the RedeemRequested/RedeemClaimed logs."
+        ),
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["scan", "logs"],
+        default="scan",
+        help=(
+            "scan reads every id in range. logs finds open ids from RedeemRequested/RedeemClaimed "
+            "events and only reads those."
+        ),
+    )
+    parser.add_argument(
+        "--from-block",
+        type=int,
+        default=None,
+        help=(
+            "First block to read events from in --mode logs and --withdrawer. Defaults to the deployment block "
+            "of a known ARM and is required for any other address."
+        ),
+    )
+    parser.add_argument(
+        "--withdrawer",
+        action="append",
+        default=None,
+        help=(
+            "Only look up these withdrawers' requests, found with RedeemRequested/RedeemClaimed logs filtered "
+            "on the indexed withdrawer topic, and report per-withdrawer totals. Repeat or comma-separate."
+        ),
+    )
+    parser.add_argument("--start-id", type=int, default=0, help="First request id to check, inclusive.")
+    parser.add_argument(
+        "--frontier",
+        action="store_true",
+        help=(
+            "Search for the first request past the claimable() liquidity instead of scanning every id, "
+            "report how much more liquidity the next --frontier-next requests need, and only scan "
+            "the window around that frontier. Request counts then cover that window only."
+        ),
+    )
+    parser.add_argument(
+        "--frontier-next",
+        type=int,
+        default=10,
+        help="Requests past the frontier to report the missing liquidity for and to scan in --frontier mode.",
+    )
+    parser.add_argument(
+        "--frontier-window",
+        type=int,
+        default=0,
+        help="Requests before the frontier to also scan in --frontier mode.",
+    )
+    parser.add_argument(
+        "--frontier-probes",
+        type=int,
+        default=16,
+        help="withdrawalRequests probes per search round and ARM in --frontier mode. 1 is a binary search.",
+    )
+    parser.add_argument(
+        "--end-id",
+        type=int,
+        default=None,
+        help="Last request id to check, exclusive. Defaults to nextWithdrawalIndex().",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help=(
+            "Initial withdrawalRequests calls per Multicall3 aggregate3 call. "
+            f"Defaults to the size remembered for this RPC URL in --state-dir, else {DEFAULT_BATCH_SIZE}."
+        ),
+    )
+    parser.add_argument(
+        "--fixed-batch-size",
+        action="store_true",
+        help="Do not grow the batch size. Failed batches are still split.",
+    )
+    parser.add_argument(
+        "--target-latency",
+        type=float,
+        default=2.0,
+        help="Seconds per RPC POST the batch size is tuned towards.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of RPC POSTs in flight at once.",
+    )
+    parser.add_argument(
+        "--calls-per-post",
+        type=int,
+        default=8,
+        help="aggregate3 eth_calls sent together in one JSON-RPC batch POST. Use 1 to disable batching.",
+    )
+    parser.add_argument(
+        "--reader",
+        choices=READERS,
+        default="multicall",
+        help=(
+            "How withdrawalRequests are read. override places a small range-reader contract at a throwaway "
+            "address with an eth_call state override and gets 58 packed bytes per request back. storage "
+            "reads the request's two storage slots with batched eth_getStorageAt, proof with one "
+            "multi-key eth_getProof per batch, skipping EVM execution and Multicall3 gas caps; they are "
+            "first checked against Multicall3 for each ARM. All fall back to Multicall3 when unavailable."
+        ),
+    )
+    parser.add_argument(
+        "--resilient",
+        action="store_true",
+        help=(
+            "Send withdrawalRequests subcalls with allowFailure and retry only the failed ones, with backoff. "
+            "Requests that still fail are left out and reported, and the exit code is 2, instead of the "
+            "whole run aborting."
+        ),
+    )
+    parser.add_argument(
+        "--error-report",
+        default=None,
+        help="Write the requests --resilient gave up on as JSON to this file. Implies --resilient.",
+    )
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        default=18,
+        help="Decimals used when formatting assets and shares of ARMs given by address.",
+    )
+    parser.add_argument(
+        "--state-dir",
+        default=None,
+        help="Directory for the incremental scan state. Claimed requests recorded there are not fetched again.",
+    )
+    parser.add_argument(
+        "--call-cache",
+        default=None,
+        help=(
+            "SQLite file caching eth_call results at blocks at or below the finalized tag, so reruns "
+            "against a fixed --block are answered locally. With --block the batch size is held fixed "
+            "so reruns repeat the same calls."
+        ),
+    )
+    parser.add_argument(
+        "--call-cache-mb",
+        type=int,
+        default=1024,
+        help="Size limit of --call-cache in MB; least recently used results are evicted past it.",
+    )
+    parser.add_argument(
+        "--rpc-stats",
+        action="store_true",
+        help="Print RPC transport statistics (requests, connection reuse, bytes) to stderr.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-operation latency, batch size, byte and retry statistics to stderr.",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default=None,
+        help=(
+            "Also write the --profile statistics to this file: a Prometheus textfile if it ends in .prom "
+            "(for node-exporter's textfile collector), JSON otherwise. Implies --profile."
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and print one JSON line per new block with the queue changes.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=4.0,
+        help="Seconds between new-head polls in --watch mode.",
+    )
+    parser.add_argument("--include-claimed", action="store_true", help="Include claimed requests in the output.")
+    parser.add_argument(
+        "--format",
+        choices=["table", "json", "csv", "ndjson", "snapshot"],
+        default="table",
+        help=(
+            "Output format. csv and ndjson are written batch by batch as results arrive. snapshot writes "
+            "every request read, claimed ones included, to a fixed-width binary file for the diff command."
+        ),
+    )
+    parser.add_argument("--out", default=None, help="Optional output file.")
+    return parser.parse_args()
+
+
+def parse_diff_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="check_pending_redeems.py diff",
+        description="Compare two --format snapshot files of one ARM request by request. Makes no RPC calls.",
+    )
+    parser.add_argument("old", help="The earlier snapshot file.")
+    parser.add_argument("new", help="The later snapshot file.")
+    parser.add_argument("--format", choices=["table", "json"], default="table", help="Output format.")
+    parser.add_argument("--out", default=None, help="Optional output file.")
+    return parser.parse_args(argv)
+
+
+def diff_main(argv: list[str]) -> int:
+    from .snapshot_file import SnapshotFile, diff_snapshot_files, diff_table_lines
+    from .writers import write_text
+
+    args = parse_diff_args(argv)
+    with SnapshotFile(args.old) as old, SnapshotFile(args.new) as new:
+        diff = diff_snapshot_files(old, new)
+        if args.format == "json":
+            write_text(json.dumps(diff.to_dict(), indent=2), args.out)
+        else:
+            write_text("\n".join(diff_table_lines(diff)), args.out)
+    return 0
+
+
+def show_warning(message: Warning | str, category: type[Warning], *args: Any, **kwargs: Any) -> None:
+    print(f"warning: {message}", file=sys.stderr)
+
+
+def main() -> int:
+    if sys.argv[1:2] == ["diff"]:
+        return diff_main(sys.argv[2:])
+
+    repo_root = Path(__file__).resolve().parents[2]
+    load_dotenv(repo_root / ".env")
+    args = parse_args()
+    warnings.showwarning = show_warning
+    # The writers are only needed here, so importing the package for its API does not load them.
+    from .writers import StreamWriter, run_watch, write_json, write_multi_table, write_series, write_table
+
+    if args.start_id < 0:
+        raise ValueError("--start-id must be >= 0")
+    if args.end_id is not None and args.end_id < args.start_id:
+        raise ValueError("--end-id must be >= --start-id")
+    if args.batch_size is not None and args.batch_size <= 0:
+        raise ValueError("--batch-size must be > 0")
+    if args.target_latency <= 0:
+        raise ValueError("--target-latency must be > 0")
+    if args.watch and args.end_id is not None:
+        raise ValueError("--end-id is not supported with --watch")
+    if args.mode == "logs" and args.include_claimed:
+        raise ValueError("--include-claimed is not supported with --mode logs")
+    if args.concurrency <= 0:
+        raise ValueError("--concurrency must be > 0")
+    if args.calls_per_post <= 0:
+        raise ValueError("--calls-per-post must be > 0")
+    if args.frontier and (args.end_id is not None or args.watch):
+        raise ValueError("--end-id and --watch are not supported with --frontier")
+    if args.frontier_next < 0 or args.frontier_window < 0:
+        raise ValueError("--frontier-next and --frontier-window must be >= 0")
+    if args.frontier_probes <= 0:
+        raise ValueError("--frontier-probes must be > 0")
+    blocks = parse_block_range(args.block_range) if args.block_range else None
+    withdrawers = resolve_withdrawers(args.withdrawer or [])
+    if withdrawers and (args.mode == "logs" or args.watch or args.frontier or blocks is not None):
+        raise ValueError("--withdrawer does not combine with --mode logs, --watch, --frontier or --block-range")
+    if blocks is not None and (args.block != "latest" or args.watch or args.frontier or args.include_claimed):
+        raise ValueError("--block-range does not combine with --block, --watch, --frontier or --include-claimed")
+    if blocks is not None and (args.start_id or args.end_id is not None):
+        raise ValueError("--block-range always covers every request; drop --start-id and --end-id")
+    resilient = args.resilient or args.error_report is not None
+    if resilient and (args.watch or blocks is not None):
+        raise ValueError("--resilient does not combine with --watch or --block-range")
+    if args.format == "snapshot" and (args.out is None or args.watch or blocks is not None):
+        raise ValueError("--format snapshot needs --out and does not combine with --watch or --block-range")
+
+    if args.profile or args.profile_out:
+        PROFILER.enable()
+
+    rpc_urls = args.rpc_url or [
+        url.strip()
+        for url in [os.environ.get("MAINNET_URL", ""), *os.environ.get("MAINNET_FALLBACK_URLS", "").split(",")]
+        if url.strip()
+    ]
+    if not rpc_urls:
+        raise RuntimeError("missing RPC URL. Set MAINNET_URL in .env/env or pass --rpc-url.")
+    # Batch sizes are remembered per endpoint set; a single URL keeps its existing key.
+    rpc_url = " ".join(rpc_urls)
+
+    targets = resolve_arms(args.arm or [DEFAULT_ARM], args.decimals)
+    if len(targets) > 1 and args.end_id is not None:
+        raise ValueError("--end-id is not supported with more than one ARM")
+    if len(targets) > 1 and args.watch:
+        raise ValueError("--watch is not supported with more than one ARM")
+    if len(targets) > 1 and blocks is not None:
+        raise ValueError("--block-range is not supported with more than one ARM")
+    if len(targets) > 1 and args.format == "snapshot":
+        raise ValueError("--format snapshot writes one ARM; pass a single --arm")
+    # Where each ARM's event scans start, for --mode logs and --withdrawer.
+    from_blocks: dict[str, int] = {}
+    if args.mode == "logs" or withdrawers:
+        for target in targets:
+            from_block = args.from_block if args.from_block is not None else deployment_block(target.address)
+            if from_block is None:
+                raise ValueError(f"--from-block is required for {target.address}, which is not a known ARM")
+            from_blocks[target.address] = from_block
+    cache = CallCache(Path(args.call_cache), args.call_cache_mb * 1024 * 1024) if args.call_cache else None
+    client = RpcClient(rpc_urls[0], timeout=90, cache=cache, fallback_urls=rpc_urls[1:], hedge=not args.no_hedge)
+    client.reader = args.reader
+    if resilient:
+        client.failures = FailureReport(client.retries + 1)
+
+    block_arg = str(blocks[0]) if blocks is not None else args.block
+    block_tag, snapshots, chain_id = fetch_pinned_snapshots(client, [target.address for target in targets], block_arg)
+    if client.reader in ("storage", "proof"):
+        problem = storage_layout_problem(
+            client, block_tag, [(target.address, snapshot) for target, snapshot in zip(targets, snapshots)]
+        )
+        if problem:
+            fall_back_to_multicall(client, problem)
+
+    batch_sizes_path = Path(args.state_dir) / "batch-sizes.json" if args.state_dir else None
+    initial_size = args.batch_size or DEFAULT_BATCH_SIZE
+    # Cached results are keyed by the exact aggregate3 calldata, so pinned reruns must batch the same way.
+    repeatable = cache is not None and (blocks is not None or args.block != "latest")
+    if batch_sizes_path and args.batch_size is None and not repeatable:
+        sizer = BatchSizer.load(batch_sizes_path, rpc_url, initial_size, args.target_latency)
+    else:
+        sizer = BatchSizer(initial_size, args.target_latency)
+    if args.fixed_batch_size or repeatable:
+        sizer.max_size = sizer.size
+    state_dir = Path(args.state_dir) if args.state_dir else None
+
+    if blocks is not None:
+        target, snapshot = targets[0], snapshots[0]
+        if args.mode == "logs":
+            first_ids: Iterable[int] = open_ids_from_logs(
+                client, state_dir, chain_id, target.address, from_blocks[target.address], snapshot
+            )
+        else:
+            first_ids = range(snapshot.next_withdrawal_index)
+        first_keys = ((target.address, request_id) for request_id in first_ids)
+        open_requests = [
+            request
+            for chunk in iter_request_keys(client, block_tag, first_keys, sizer, args.concurrency, args.calls_per_post)
+            for request in chunk
+            if not request.claimed
+        ]
+        metadata = {
+            "name": target.name,
+            "arm": target.address,
+            "decimals": target.decimals,
+            "mode": args.mode,
+            "block_range": args.block_range,
+        }
+        samples = backfill_series(
+            client,
+            target.address,
+            target.decimals,
+            blocks,
+            snapshot,
+            open_requests,
+            sizer,
+            args.concurrency,
+            args.calls_per_post,
+        )
+        write_series(samples, metadata, args.format, args.out)
+        if batch_sizes_path:
+            sizer.save(batch_sizes_path, rpc_url)
+        finish(client, args.rpc_stats, args.profile_out)
+        return 0
+
+    frontiers: list[Frontier | None] = [None] * len(targets)
+    if args.frontier:
+        frontiers = find_frontiers(
+            client,
+            block_tag,
+            [(target.address, snapshot) for target, snapshot in zip(targets, snapshots, strict=True)],
+            args.frontier_next,
+            args.frontier_probes,
+        )
+
+    # Work out which ids each ARM needs, then fetch all of them in shared aggregate3 batches.
+    plans: list[QueuePlan] = []
+    for target, snapshot, frontier in zip(targets, snapshots, frontiers, strict=True):
+        start_id = args.start_id
+        end_id = args.end_id if args.end_id is not None else snapshot.next_withdrawal_index
+        if end_id > snapshot.next_withdrawal_index:
+            raise ValueError(f"--end-id exceeds nextWithdrawalIndex ({snapshot.next_withdrawal_index})")
+        if frontier is not None:
+            start_id = max(start_id, frontier.frontier_id - args.frontier_window)
+            end_id = max(start_id, frontier.frontier_id + frontier.next_count)
+
+        ids: Iterable[int] | None = None
+        state = None
+        if withdrawers:
+            ids = withdrawer_request_ids(
+                client,
+                target.address,
+                withdrawers,
+                from_blocks[target.address],
+                snapshot.block_number,
+                args.include_claimed,
+            )
+        elif args.mode == "logs":
+            ids = open_ids_from_logs(client, state_dir, chain_id, target.address, from_blocks[target.address], snapshot)
+        elif state_dir:
+            state = ScanState.load(state_dir, chain_id, target.address)
+        plans.append(plan_queue(target, snapshot, start_id, end_id, ids, state, frontier))
+
+    multi = len(targets) > 1
+    # A snapshot keeps claimed requests too, so a later diff can tell which requests were claimed in between.
+    keep_claimed = args.include_claimed or args.format == "snapshot"
+    streaming = args.format in ("csv", "ndjson") and not args.watch
+    writer = StreamWriter(args.format, args.out, with_arm=multi) if streaming else None
+    sections: list[tuple[RequestStore, dict[str, Any]]] = []
+    try:
+        scans = scan_plans(
+            client, block_tag, plans, sizer, args.concurrency, args.calls_per_post, keep_claimed, withdrawers
+        )
+        for scan in scans:
+            target, snapshot, frontier = scan.plan.target, scan.plan.snapshot, scan.plan.frontier
+            metadata: dict[str, Any] = {
+                "name": target.name,
+                "arm": target.address,
+                "decimals": target.decimals,
+                "mode": "withdrawer" if withdrawers else args.mode,
+                "block_number": snapshot.block_number,
+                "block_timestamp": snapshot.block_timestamp,
+                "block_timestamp_utc": iso_timestamp(snapshot.block_timestamp),
+                "next_withdrawal_index": snapshot.next_withdrawal_index,
+                "claimable_frontier_raw": str(snapshot.claimable_frontier),
+                "claimable_frontier": format_units(snapshot.claimable_frontier, target.decimals),
+                "claim_delay": snapshot.claim_delay,
+                "start_id": scan.plan.start_id,
+                "end_id": scan.plan.end_id,
+                "fetched_count": len(scan.plan.missing),
+            }
+            if frontier is not None:
+                metadata.update(
+                    frontier_id=frontier.frontier_id,
+                    frontier_next_count=frontier.next_count,
+                    frontier_next_queued_raw=str(frontier.next_queued),
+                    liquidity_needed_raw=str(frontier.liquidity_needed),
+                    liquidity_needed=format_units(frontier.liquidity_needed, target.decimals),
+                    frontier_probes=frontier.probes,
+                    frontier_rounds=frontier.rounds,
+                    counts_scope="frontier_window",
+                )
+            if writer:
+                writer.begin_section(metadata)
+
+            # Streaming formats write the selected requests chunk by chunk; the others keep
+            # them packed until the output is written.
+            store = RequestStore()
+            for selected, statuses in scan.chunks():
+                if writer:
+                    rows = build_rows(selected, snapshot, target.decimals, statuses)
+                    if multi:
+                        rows = [{"arm": target.name, **row} for row in rows]
+                    writer.write_rows(rows)
+                else:
+                    for request, status in zip(selected, statuses, strict=True):
+                        store.append(request, status)
+
+            metadata.update(
+                open_count=scan.counts.open_count,
+                claimable_now_count=scan.counts.claimable_now_count,
+                zero_share_open_count=scan.counts.zero_share_open_count,
+            )
+            if client.failures is not None:
+                metadata["failed_count"] = client.failures.count(target.address)
+            if scan.by_withdrawer is not None:
+                metadata["withdrawers"] = [
+                    withdrawer_totals.to_dict(withdrawer, target.decimals)
+                    for withdrawer, withdrawer_totals in scan.by_withdrawer.items()
+                ]
+            if writer:
+                writer.end_section(metadata)
+            sections.append((store, metadata))
+
+        summary = {
+            "block_number": snapshots[0].block_number,
+            "block_timestamp": snapshots[0].block_timestamp,
+            "block_timestamp_utc": iso_timestamp(snapshots[0].block_timestamp),
+            "arm_count": len(sections),
+            "next_withdrawal_index": sum(metadata["next_withdrawal_index"] for _, metadata in sections),
+            "fetched_count": sum(metadata["fetched_count"] for _, metadata in sections),
+            "open_count": sum(metadata["open_count"] for _, metadata in sections),
+            "claimable_now_count": sum(metadata["claimable_now_count"] for _, metadata in sections),
+            "zero_share_open_count": sum(metadata["zero_share_open_count"] for _, metadata in sections),
+        }
+        if args.frontier:
+            summary["counts_scope"] = "frontier_window"
+        if client.failures is not None:
+            summary["failed_count"] = sum(metadata["failed_count"] for _, metadata in sections)
+        if writer and multi:
+            writer.write_total(summary)
+    finally:
+        if writer:
+            writer.close()
+    if batch_sizes_path:
+        sizer.save(batch_sizes_path, rpc_url)
+
+    def section_rows(target: ArmTarget, snapshot: Snapshot, store: RequestStore) -> Iterator[dict[str, Any]]:
+        for row in store.rows(snapshot, target.decimals):
+            yield {"arm": target.name, **row} if multi else row
+
+    if args.watch:
+        store, metadata = sections[0]
+        watcher = QueueWatcher(
+            client, targets[0].address, targets[0].decimals, sizer, args.concurrency, args.calls_per_post
+        )
+        watcher.start(snapshots[0], [request for request, status in store.items() if status != "claimed"])
+        run_watch(watcher, metadata, args.poll_interval, args.out)
+    elif args.format == "snapshot":
+        from .snapshot_file import write_snapshot_file
+
+        write_snapshot_file(args.out, targets[0], chain_id, snapshots[0], sections[0][0])
+    elif writer is None and not multi:
+        store, metadata = sections[0]
+        if args.format == "json":
+            write_json(section_rows(targets[0], snapshots[0], store), metadata, args.out)
+        else:
+            write_table(list(section_rows(targets[0], snapshots[0], store)), metadata, args.out)
+    elif writer is None and args.format == "table":
+        write_multi_table(
+            [
+                (list(section_rows(target, snapshot, store)), metadata)
+                for target, snapshot, (store, metadata) in zip(targets, snapshots, sections, strict=True)
+            ],
+            summary,
+            args.out,
+        )
+    elif writer is None:
+        combined_rows = (
+            row
+            for target, snapshot, (store, _) in zip(targets, snapshots, sections, strict=True)
+            for row in section_rows(target, snapshot, store)
+        )
+        write_json(combined_rows, {**summary, "arms": [metadata for _, metadata in sections]}, args.out)
+
+    finish(client, args.rpc_stats, args.profile_out)
+    if client.failures is not None:
+        if args.error_report:
+            client.failures.save(Path(args.error_report))
+        if client.failures.failed:
+            print(
+                f"error: {len(client.failures.failed)} requests still failed after "
+                f"{client.failures.max_attempts} attempts and are missing from the output",
+                file=sys.stderr,
+            )
+            return 2
+    return 0
+
+
+def finish(client: RpcClient, rpc_stats: bool, profile_out: str | None) -> None:
+    """Close the client and print the --rpc-stats and --profile reports."""
+    client.close()
+    if rpc_stats:
+        stats = client.transport.stats
+        print(
+            f"rpc: {stats.requests} requests | connections opened: {stats.connections_opened} | "
+            f"reused: {stats.connections_reused} | sent: {stats.bytes_sent} B | "
+            f"received: {stats.bytes_received} B ({stats.bytes_decoded} B decoded)",
+            file=sys.stderr,
+        )
+        if isinstance(client.transport, TransportPool):
+            print("\n".join(client.transport.summary_lines()), file=sys.stderr)
+        cache = client.cache
+        if cache is not None:
+            print(
+                f"call cache: {cache.hits} hits | {cache.misses} misses | {cache.evicted} evicted | "
+                f"{cache.total_bytes} B stored",
+                file=sys.stderr,
+            )
+    if PROFILER.enabled:
+        print("\n".join(PROFILER.summary_lines()), file=sys.stderr)
+        if profile_out:
+            PROFILER.save(Path(profile_out))
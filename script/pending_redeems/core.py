@@ -0,0 +1,3178 @@
+"""RPC, decoding and classification core of the pending redeems checker.
+
+Everything here is independent of the command line: the transports and RpcClient,
+the Multicall3 and storage readers, the scan state and log index, and the
+request classification that the writers and the async API build on.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import warnings
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Sequence
+
+DEFAULT_ARM = "0x85B78AcA6Deae198fBF201c82DAF6Ca21942acc6"
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Mainnet ARMs from src/js/utils/addresses.js with their liquidity asset decimals.
+# name -> (address, decimals, deployment block). The deployment block only has to
+# come before the ARM's first redeem request: event scans start there, not at genesis.
+KNOWN_ARMS = {
+    "lidoARM": ("0x85B78AcA6Deae198fBF201c82DAF6Ca21942acc6", 18, 20_500_000),
+    "etherfiARM": ("0xfB0A3CF9B019BFd8827443d131b235B3E0FC58d2", 18, 20_500_000),
+    "ethenaARM": ("0xCEDa2d856238aA0D12f6329de20B9115f07C366d", 18, 20_500_000),
+    "OethARM": ("0x6bac785889A4127dB0e0CeFEE88E0a9F1Aaf3cC7", 18, 20_500_000),
+    "usdcARM": ("0x9E3A7026E5767F2d7Ff5e83b0ed011005f45a170", 6, 20_500_000),
+    "wethARM": ("0x68025A4615407993A680102b08a23A61D11C657C", 18, 20_500_000),
+}
+ARM_PRESETS = {
+    "mainnet": ["lidoARM", "etherfiARM", "ethenaARM", "OethARM", "usdcARM", "wethARM"],
+}
+
+SELECTOR_AGGREGATE3 = bytes.fromhex("82ad56cb")
+SELECTOR_NEXT_WITHDRAWAL_INDEX = bytes.fromhex("bba9282e")
+SELECTOR_WITHDRAWAL_REQUESTS = bytes.fromhex("937b2581")
+SELECTOR_CLAIMABLE = bytes.fromhex("af38d757")
+SELECTOR_CLAIM_DELAY = bytes.fromhex("1c8ec299")
+SELECTOR_GET_BLOCK_NUMBER = bytes.fromhex("42cbb15c")
+SELECTOR_GET_CURRENT_BLOCK_TIMESTAMP = bytes.fromhex("0f28c97d")
+SELECTOR_GET_CHAIN_ID = bytes.fromhex("3408e470")
+
+TOPIC_REDEEM_REQUESTED = "0xc04c86cfd81036557541f9c68971ace59cbc9057ecab7d48874a6177ad117f4f"
+TOPIC_REDEEM_CLAIMED = "0x36dd2c9b55f12509e3b5f4f4d765ddefc2776a28018b18da2335cf2ab93bb268"
+
+# Throwaway address the range reader's code is placed at with an eth_call state override.
+RANGE_READER = "0x0000000000000000000000000000000052454144"
+# Runtime code of the range reader, hand-assembled. Calldata is arm, start, end as three words.
+# For each id in [start, end) it staticcalls arm.withdrawalRequests(id), requires a 160-byte
+# return and appends withdrawer (20 bytes), claimed (1), claimTimestamp (5), assets (16) and
+# queued (16) to the output; any failure reverts the whole call.
+#
+#   0x00  PUSH4 937b2581 PUSH1 e0 SHL PUSH1 00 MSTORE     selector at mem[0:4]
+#   0x0a  PUSH1 20 CALLDATALOAD PUSH2 0200                stack: i = start, p = 0x200
+#   0x11  loop: JUMPDEST PUSH1 40 CALLDATALOAD DUP3 LT ISZERO PUSH2 done JUMPI
+#   0x1c  DUP2 PUSH1 04 MSTORE                            id at mem[4:36]
+#   0x20  PUSH1 a0 PUSH1 40 PUSH1 24 PUSH1 00 PUSH1 00 CALLDATALOAD GAS STATICCALL
+#   0x2d  ISZERO PUSH2 fail JUMPI RETURNDATASIZE PUSH1 a0 EQ ISZERO PUSH2 fail JUMPI
+#   0x3b  PUSH1 40 MLOAD PUSH1 60 SHL DUP2 MSTORE         mem[p:] = withdrawer
+#   0x43  PUSH1 60 MLOAD PUSH1 f8 SHL DUP2 PUSH1 14 ADD MSTORE
+#   0x4e  PUSH1 80 MLOAD PUSH1 d8 SHL DUP2 PUSH1 15 ADD MSTORE
+#   0x59  PUSH1 a0 MLOAD PUSH1 80 SHL DUP2 PUSH1 1a ADD MSTORE
+#   0x64  PUSH1 c0 MLOAD PUSH1 80 SHL DUP2 PUSH1 2a ADD MSTORE
+#   0x6f  PUSH1 3a ADD SWAP1 PUSH1 01 ADD SWAP1 PUSH2 loop JUMP
+#   0x7b  done: JUMPDEST PUSH2 0200 SWAP1 SUB PUSH2 0200 RETURN
+#   0x85  fail: JUMPDEST PUSH1 00 DUP1 REVERT
+RANGE_READER_CODE = (
+    "0x63937b258160e01b6000526020356102005b60403582101561007b578160045260a06040602460006000355afa15"
+    "610085573d60a014156100855760405160601b815260605160f81b816014015260805160d81b816015015260a051"
+    "60801b81601a015260c05160801b81602a0152603a019060010190610011565b6102009003610200f35b600080fd"
+)
+RANGE_READER_RECORD = 58
+
+# AbstractARM storage: OwnableOperable takes slots 0-49 and the OpenZeppelin v5 parents use
+# namespaced storage. withdrawalRequests[id] takes the two slots from keccak256(id . 51), with
+# withdrawer, claimed and claimTimestamp packed from the low bits of the first and assets and
+# queued in the low and high halves of the second.
+NEXT_WITHDRAWAL_INDEX_SLOT = 50
+WITHDRAWAL_REQUESTS_SLOT = 51
+READERS = ("multicall", "override", "storage", "proof")
+
+# JSON-RPC error codes that will not go away on retry.
+NON_RETRYABLE_RPC_ERRORS = {3, -32600, -32601, -32602}
+# Provider error messages meaning the call was too big, not that the node was flaky.
+CAPACITY_ERROR_MARKERS = (
+    "gas",
+    "too large",
+    "size limit",
+    "response size",
+    "limit exceeded",
+    "timeout",
+    "timed out",
+    "block range",
+    "range is too",
+    "returned more than",
+    "too many results",
+)
+
+DEFAULT_BATCH_SIZE = 250
+MAX_BATCH_SIZE = 5000
+DEFAULT_LOG_CHUNK = 50_000
+MAX_LOG_CHUNK = 1_000_000
+# Logs newer than this many blocks below the pinned block are re-read every run
+# instead of being persisted, so a reorg cannot leave stale ids in the index.
+LOG_REORG_DEPTH = 64
+# Seconds the finalized block number read for the call cache is trusted before a
+# call above it reads it again; about one slot.
+FINALIZED_REFRESH_INTERVAL = 12.0
+# Upper bounds in seconds of the --profile latency histogram buckets.
+PROFILE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(frozen=True, slots=True)
+class WithdrawalRequest:
+    request_id: int
+    withdrawer: str
+    claimed: bool
+    claim_timestamp: int
+    assets: int
+    queued: int
+    shares: int | None
+    queue_units: str
+
+
+@dataclass(frozen=True)
+class ArmTarget:
+    name: str
+    address: str
+    decimals: int
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    block_number: int
+    block_timestamp: int
+    next_withdrawal_index: int
+    claimable_frontier: int
+    claim_delay: int
+
+
+def load_dotenv(path: Path) -> None:
+    if not path.exists():
+        return
+
+    for raw_line in path.read_text().splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export ") :].strip()
+        if "=" not in line:
+            continue
+
+        key, value = line.split("=", 1)
+        key = key.strip()
+        value = value.strip().strip("'\"")
+        if key and key not in os.environ:
+            os.environ[key] = value
+
+
+def write_file_atomically(path: Path, *chunks: str | bytes) -> None:
+    """Replace path with the chunks written one after another, through a temporary file of its own.
+
+    Concurrent writers of one path each rename a complete file into place, so none
+    can clobber another's half-written file. The file gets the mode open() would
+    give it rather than the 0600 of a temporary file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as handle:
+        try:
+            for chunk in chunks:
+                handle.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        except BaseException:
+            handle.close()
+            os.unlink(handle.name)
+            raise
+    # The umask can only be read by setting it.
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(handle.name, 0o666 & ~umask)
+    os.replace(handle.name, path)
+
+
+def resolve_arms(values: list[str], default_decimals: int) -> list[ArmTarget]:
+    """Expand ARM addresses, names from KNOWN_ARMS and ARM_PRESETS into a de-duplicated list.
+
+    Each value may itself be a comma-separated list.
+    """
+    names: list[str] = []
+    for value in values:
+        for item in value.split(","):
+            item = item.strip()
+            if item:
+                names.extend(ARM_PRESETS.get(item, [item]))
+
+    known_by_address = {validate_address(address): name for name, (address, _, _) in KNOWN_ARMS.items()}
+    targets: list[ArmTarget] = []
+    seen: set[str] = set()
+    for name in names:
+        if name in KNOWN_ARMS:
+            address, decimals, _ = KNOWN_ARMS[name]
+            address = validate_address(address)
+        else:
+            address = validate_address(name)
+            name = known_by_address.get(address, address)
+            decimals = default_decimals
+        if address not in seen:
+            seen.add(address)
+            targets.append(ArmTarget(name=name, address=address, decimals=decimals))
+    return targets
+
+
+def deployment_block(address: str) -> int | None:
+    """Deployment block of the KNOWN_ARMS ARM at address, None for any other address."""
+    for known, _, block_number in KNOWN_ARMS.values():
+        if validate_address(known) == validate_address(address):
+            return block_number
+    return None
+
+
+def strip_0x(value: str) -> str:
+    return value[2:] if value.startswith("0x") else value
+
+
+def validate_address(address: str) -> str:
+    raw = strip_0x(address).lower()
+    if len(raw) != 40:
+        raise ValueError(f"invalid address length: {address}")
+    int(raw, 16)
+    return "0x" + raw
+
+
+def resolve_withdrawers(values: list[str]) -> list[str]:
+    """Validate --withdrawer addresses into a de-duplicated list; each value may be comma-separated."""
+    withdrawers: list[str] = []
+    for value in values:
+        for item in value.split(","):
+            if item.strip() and validate_address(item.strip()) not in withdrawers:
+                withdrawers.append(validate_address(item.strip()))
+    return withdrawers
+
+
+def is_capacity_error(message: str) -> bool:
+    message = message.lower()
+    return any(marker in message for marker in CAPACITY_ERROR_MARKERS)
+
+
+KECCAK_LANE_MASK = (1 << 64) - 1
+KECCAK_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+KECCAK_RATE = 136
+
+
+def keccak256(data: bytes) -> bytes:
+    """Ethereum's keccak256, from OpenSSL when it has it (3.2+), else in pure Python."""
+    if OPENSSL_KECCAK:
+        return hashlib.new("keccak-256", data).digest()
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(bytes(-len(padded) % KECCAK_RATE))
+    padded[-1] |= 0x80
+    lanes = [0] * 25
+    for start in range(0, len(padded), KECCAK_RATE):
+        for i in range(KECCAK_RATE // 8):
+            lanes[i] ^= int.from_bytes(padded[start + 8 * i : start + 8 * i + 8], "little")
+        lanes = _keccak_f1600(lanes)
+    return b"".join(lane.to_bytes(8, "little") for lane in lanes[:4])
+
+
+def _keccak_f1600(lanes: list[int]) -> list[int]:
+    """Keccak-f[1600] on 25 little-endian 64-bit lanes, unrolled within each round."""
+    (
+        a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12,
+        a13, a14, a15, a16, a17, a18, a19, a20, a21, a22, a23, a24,
+    ) = lanes
+    mask = KECCAK_LANE_MASK
+    for rc in KECCAK_ROUND_CONSTANTS:
+        c0 = a0 ^ a5 ^ a10 ^ a15 ^ a20
+        c1 = a1 ^ a6 ^ a11 ^ a16 ^ a21
+        c2 = a2 ^ a7 ^ a12 ^ a17 ^ a22
+        c3 = a3 ^ a8 ^ a13 ^ a18 ^ a23
+        c4 = a4 ^ a9 ^ a14 ^ a19 ^ a24
+        d0 = c4 ^ (((c1 << 1) | (c1 >> 63)) & mask)
+        d1 = c0 ^ (((c2 << 1) | (c2 >> 63)) & mask)
+        d2 = c1 ^ (((c3 << 1) | (c3 >> 63)) & mask)
+        d3 = c2 ^ (((c4 << 1) | (c4 >> 63)) & mask)
+        d4 = c3 ^ (((c0 << 1) | (c0 >> 63)) & mask)
+        # theta, then rho and pi: b[y + 5 * ((2x + 3y) % 5)] = rot(a[x + 5y] ^ d[x], r[x + 5y])
+        b0 = a0 ^ d0
+        t = a6 ^ d1
+        b1 = ((t << 44) | (t >> 20)) & mask
+        t = a12 ^ d2
+        b2 = ((t << 43) | (t >> 21)) & mask
+        t = a18 ^ d3
+        b3 = ((t << 21) | (t >> 43)) & mask
+        t = a24 ^ d4
+        b4 = ((t << 14) | (t >> 50)) & mask
+        t = a3 ^ d3
+        b5 = ((t << 28) | (t >> 36)) & mask
+        t = a9 ^ d4
+        b6 = ((t << 20) | (t >> 44)) & mask
+        t = a10 ^ d0
+        b7 = ((t << 3) | (t >> 61)) & mask
+        t = a16 ^ d1
+        b8 = ((t << 45) | (t >> 19)) & mask
+        t = a22 ^ d2
+        b9 = ((t << 61) | (t >> 3)) & mask
+        t = a1 ^ d1
+        b10 = ((t << 1) | (t >> 63)) & mask
+        t = a7 ^ d2
+        b11 = ((t << 6) | (t >> 58)) & mask
+        t = a13 ^ d3
+        b12 = ((t << 25) | (t >> 39)) & mask
+        t = a19 ^ d4
+        b13 = ((t << 8) | (t >> 56)) & mask
+        t = a20 ^ d0
+        b14 = ((t << 18) | (t >> 46)) & mask
+        t = a4 ^ d4
+        b15 = ((t << 27) | (t >> 37)) & mask
+        t = a5 ^ d0
+        b16 = ((t << 36) | (t >> 28)) & mask
+        t = a11 ^ d1
+        b17 = ((t << 10) | (t >> 54)) & mask
+        t = a17 ^ d2
+        b18 = ((t << 15) | (t >> 49)) & mask
+        t = a23 ^ d3
+        b19 = ((t << 56) | (t >> 8)) & mask
+        t = a2 ^ d2
+        b20 = ((t << 62) | (t >> 2)) & mask
+        t = a8 ^ d3
+        b21 = ((t << 55) | (t >> 9)) & mask
+        t = a14 ^ d4
+        b22 = ((t << 39) | (t >> 25)) & mask
+        t = a15 ^ d0
+        b23 = ((t << 41) | (t >> 23)) & mask
+        t = a21 ^ d1
+        b24 = ((t << 2) | (t >> 62)) & mask
+        # chi and iota
+        a0 = b0 ^ ((b1 ^ mask) & b2)
+        a1 = b1 ^ ((b2 ^ mask) & b3)
+        a2 = b2 ^ ((b3 ^ mask) & b4)
+        a3 = b3 ^ ((b4 ^ mask) & b0)
+        a4 = b4 ^ ((b0 ^ mask) & b1)
+        a5 = b5 ^ ((b6 ^ mask) & b7)
+        a6 = b6 ^ ((b7 ^ mask) & b8)
+        a7 = b7 ^ ((b8 ^ mask) & b9)
+        a8 = b8 ^ ((b9 ^ mask) & b5)
+        a9 = b9 ^ ((b5 ^ mask) & b6)
+        a10 = b10 ^ ((b11 ^ mask) & b12)
+        a11 = b11 ^ ((b12 ^ mask) & b13)
+        a12 = b12 ^ ((b13 ^ mask) & b14)
+        a13 = b13 ^ ((b14 ^ mask) & b10)
+        a14 = b14 ^ ((b10 ^ mask) & b11)
+        a15 = b15 ^ ((b16 ^ mask) & b17)
+        a16 = b16 ^ ((b17 ^ mask) & b18)
+        a17 = b17 ^ ((b18 ^ mask) & b19)
+        a18 = b18 ^ ((b19 ^ mask) & b15)
+        a19 = b19 ^ ((b15 ^ mask) & b16)
+        a20 = b20 ^ ((b21 ^ mask) & b22)
+        a21 = b21 ^ ((b22 ^ mask) & b23)
+        a22 = b22 ^ ((b23 ^ mask) & b24)
+        a23 = b23 ^ ((b24 ^ mask) & b20)
+        a24 = b24 ^ ((b20 ^ mask) & b21)
+        a0 ^= rc
+    return [a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12,
+            a13, a14, a15, a16, a17, a18, a19, a20, a21, a22, a23, a24]
+
+
+def openssl_has_keccak() -> bool:
+    # hashlib's sha3_256 is FIPS SHA-3, whose padding differs from Ethereum's keccak256.
+    try:
+        return hashlib.new("keccak-256", b"").hexdigest() == (
+            "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+        )
+    except ValueError:
+        return False
+
+
+OPENSSL_KECCAK = openssl_has_keccak()
+
+
+def pad32(data: bytes) -> bytes:
+    padding = (-len(data)) % 32
+    return data + (b"\x00" * padding)
+
+
+def word(value: int | bool) -> bytes:
+    return int(value).to_bytes(32, byteorder="big")
+
+
+def address_word(address: str) -> bytes:
+    return b"\x00" * 12 + bytes.fromhex(strip_0x(validate_address(address)))
+
+
+def encode_bytes(data: bytes) -> bytes:
+    return word(len(data)) + pad32(data)
+
+
+def encode_call3(target: str, allow_failure: bool, call_data: bytes) -> bytes:
+    return (
+        address_word(target)
+        + word(allow_failure)
+        + word(96)
+        + encode_bytes(call_data)
+    )
+
+
+def encode_aggregate3(calls: Iterable[tuple[str, bool, bytes]]) -> str:
+    encoded_calls = [
+        encode_call3(target, allow_failure, data)
+        for target, allow_failure, data in calls
+    ]
+
+    offsets = []
+    offset = 32 * len(encoded_calls)
+    for encoded in encoded_calls:
+        offsets.append(word(offset))
+        offset += len(encoded)
+
+    array_body = word(len(encoded_calls)) + b"".join(offsets) + b"".join(encoded_calls)
+    return "0x" + (SELECTOR_AGGREGATE3 + word(32) + array_body).hex()
+
+
+def calldata_no_args(selector: bytes) -> bytes:
+    return selector
+
+
+def calldata_with_uint256(selector: bytes, value: int) -> bytes:
+    return selector + word(value)
+
+
+def read_word(data: bytes | memoryview, offset: int) -> int:
+    end = offset + 32
+    if end > len(data):
+        raise ValueError("ABI decode out of bounds")
+    return int.from_bytes(data[offset:end], byteorder="big")
+
+
+def decode_aggregate3_return(hex_data: str) -> list[tuple[bool, bytes]]:
+    with PROFILER.timed("decode.aggregate3"):
+        return _decode_aggregate3_return(hex_data)
+
+
+def _decode_aggregate3_return(hex_data: str) -> list[tuple[bool, bytes]]:
+    data = bytes.fromhex(strip_0x(hex_data))
+    if len(data) < 64:
+        raise ValueError("short Multicall3 return data")
+
+    array_start = read_word(data, 0)
+    length = read_word(data, array_start)
+    offsets_start = array_start + 32
+
+    results: list[tuple[bool, bytes]] = []
+    for i in range(length):
+        tuple_start = offsets_start + read_word(data, offsets_start + (32 * i))
+        success = read_word(data, tuple_start) != 0
+        return_offset = read_word(data, tuple_start + 32)
+        return_start = tuple_start + return_offset
+        return_length = read_word(data, return_start)
+        start = return_start + 32
+        end = start + return_length
+        if end > len(data):
+            raise ValueError("ABI decode out of bounds")
+        results.append((success, data[start:end]))
+
+    return results
+
+
+def aggregate3_has_failure(hex_data: str) -> bool:
+    """Whether any allowFailure call in an aggregate3 return failed; malformed data counts as failed."""
+    try:
+        data = bytes.fromhex(strip_0x(hex_data))
+        array_start = read_word(data, 0)
+        offsets_start = array_start + 32
+        return any(
+            read_word(data, offsets_start + read_word(data, offsets_start + 32 * i)) == 0
+            for i in range(read_word(data, array_start))
+        )
+    except ValueError:
+        return True
+
+
+def decode_uint256(data: bytes) -> int:
+    if len(data) < 32:
+        raise ValueError("short uint256 return data")
+    return read_word(data, 0)
+
+
+def decode_withdrawal_request(request_id: int, data: bytes) -> WithdrawalRequest:
+    if len(data) < 32 * 5:
+        raise ValueError(f"short withdrawalRequests({request_id}) return data")
+
+    shares = read_word(data, 160) if len(data) >= 32 * 6 else None
+    queue_units = "shares" if shares is not None else "assets"
+
+    raw_address = data[12:32].hex()
+    return WithdrawalRequest(
+        request_id=request_id,
+        withdrawer="0x" + raw_address,
+        claimed=read_word(data, 32) != 0,
+        claim_timestamp=read_word(data, 64),
+        assets=read_word(data, 96),
+        queued=read_word(data, 128),
+        shares=shares,
+        queue_units=queue_units,
+    )
+
+
+def decode_withdrawal_requests(hex_data: str, request_ids: list[int]) -> list[WithdrawalRequest]:
+    """Decode an aggregate3 return made only of withdrawalRequests calls.
+
+    Every successful withdrawalRequests call returns the same number of bytes, so
+    the result tuples are evenly spaced and each field sits at a fixed offset
+    from the start of its tuple. Fields are read through a memoryview of the
+    response buffer without slicing out per-call payloads. Responses that do not
+    have that uniform shape fall back to the generic decoders.
+    """
+    with PROFILER.timed("decode.withdrawal_requests", len(request_ids)):
+        return _decode_withdrawal_requests(hex_data, request_ids)
+
+
+def _decode_withdrawal_requests(hex_data: str, request_ids: list[int]) -> list[WithdrawalRequest]:
+    data = bytes.fromhex(strip_0x(hex_data))
+    view = memoryview(data)
+    count = len(request_ids)
+    try:
+        array_start = read_word(view, 0)
+        if read_word(view, array_start) != count:
+            raise ValueError("length mismatch")
+        base = array_start + 32
+        first = base + (read_word(view, base) if count else 0)
+        # (success, offset to bytes, bytes length) header shared by every result tuple
+        header = view[first : first + 96]
+        return_length = read_word(view, first + 64) if count else 0
+        stride = 96 + return_length
+        if (
+            count
+            and (return_length not in (160, 192) or read_word(view, first) != 1 or read_word(view, first + 32) != 64)
+        ) or len(data) != base + 32 * count + count * stride:
+            raise ValueError("non-uniform layout")
+    except ValueError:
+        results = decode_aggregate3_return(hex_data)
+        if len(results) != count:
+            raise RuntimeError(f"Multicall3 returned {len(results)} results for {count} calls")
+        failed = [i for i, (success, _) in enumerate(results) if not success]
+        if failed:
+            raise RuntimeError(f"Multicall3 subcalls failed at indices: {failed[:10]}")
+        return [
+            decode_withdrawal_request(request_id, return_data)
+            for request_id, (_, return_data) in zip(request_ids, results, strict=True)
+        ]
+
+    from_bytes = int.from_bytes
+    has_shares = return_length == 192
+    queue_units = "shares" if has_shares else "assets"
+    requests: list[WithdrawalRequest] = []
+    position = base + 32 * count + 96
+    for request_id in request_ids:
+        if view[position - 96 : position] != header:
+            raise RuntimeError("Multicall3 returned a failed or malformed withdrawalRequests result")
+        requests.append(
+            WithdrawalRequest(
+                request_id,
+                "0x" + view[position + 12 : position + 32].hex(),
+                from_bytes(view[position + 32 : position + 64], "big") != 0,
+                from_bytes(view[position + 64 : position + 96], "big"),
+                from_bytes(view[position + 96 : position + 128], "big"),
+                from_bytes(view[position + 128 : position + 160], "big"),
+                from_bytes(view[position + 160 : position + 192], "big") if has_shares else None,
+                queue_units,
+            )
+        )
+        position += stride
+    return requests
+
+
+def decode_withdrawal_requests_allowing_failure(
+    hex_data: str,
+    request_ids: list[int],
+) -> list[WithdrawalRequest | Exception]:
+    """Decode an aggregate3 return of allowFailure calls, with the error in place of each failed result."""
+    try:
+        return list(decode_withdrawal_requests(hex_data, request_ids))
+    except RuntimeError:
+        pass
+    results = decode_aggregate3_return(hex_data)
+    if len(results) != len(request_ids):
+        raise RuntimeError(f"Multicall3 returned {len(results)} results for {len(request_ids)} calls")
+    requests: list[WithdrawalRequest | Exception] = []
+    for request_id, (success, return_data) in zip(request_ids, results, strict=True):
+        try:
+            if not success:
+                raise RuntimeError(f"withdrawalRequests({request_id}) reverted: 0x{return_data.hex()}")
+            requests.append(decode_withdrawal_request(request_id, return_data))
+        except (RuntimeError, ValueError) as exc:
+            requests.append(exc)
+    return requests
+
+
+def decode_range_reader_return(hex_data: str, request_ids: list[int]) -> list[WithdrawalRequest]:
+    """Decode the range reader's packed RANGE_READER_RECORD-byte records, one per id."""
+    with PROFILER.timed("decode.range_reader", len(request_ids)):
+        data = bytes.fromhex(strip_0x(hex_data))
+        if len(data) != RANGE_READER_RECORD * len(request_ids):
+            raise ValueError(f"range reader returned {len(data)} bytes for {len(request_ids)} requests")
+
+        view = memoryview(data)
+        from_bytes = int.from_bytes
+        requests = []
+        for position, request_id in zip(range(0, len(data), RANGE_READER_RECORD), request_ids):
+            requests.append(
+                WithdrawalRequest(
+                    request_id,
+                    "0x" + view[position : position + 20].hex(),
+                    data[position + 20] != 0,
+                    from_bytes(view[position + 21 : position + 26], "big"),
+                    from_bytes(view[position + 26 : position + 42], "big"),
+                    from_bytes(view[position + 42 : position + 58], "big"),
+                    None,
+                    "assets",
+                )
+            )
+        return requests
+
+
+@lru_cache(maxsize=1 << 16)
+def withdrawal_request_slot(request_id: int) -> int:
+    """First of the two storage slots of withdrawalRequests[request_id], memoized for --watch re-reads."""
+    return int.from_bytes(keccak256(word(request_id) + word(WITHDRAWAL_REQUESTS_SLOT)), "big")
+
+
+def decode_withdrawal_request_slots(request_ids: list[int], values: list[str]) -> list[WithdrawalRequest]:
+    """Decode the two storage words read for each id, given as hex quantities, in id order."""
+    with PROFILER.timed("decode.storage", len(request_ids)):
+        if len(values) != 2 * len(request_ids):
+            raise ValueError(f"got {len(values)} storage words for {len(request_ids)} requests")
+        requests = []
+        for i, request_id in enumerate(request_ids):
+            first = int(values[2 * i], 16)
+            second = int(values[2 * i + 1], 16)
+            requests.append(
+                WithdrawalRequest(
+                    request_id,
+                    f"0x{first & ((1 << 160) - 1):040x}",
+                    (first >> 160) & 0xFF != 0,
+                    (first >> 168) & ((1 << 40) - 1),
+                    second & ((1 << 128) - 1),
+                    second >> 128,
+                    None,
+                    "assets",
+                )
+            )
+        return requests
+
+
+class RpcError(RuntimeError):
+    pass
+
+
+class BatchRejectedError(RuntimeError):
+    pass
+
+
+class RpcConnectionError(RuntimeError):
+    """The RPC endpoint could not be reached; says nothing about the request itself."""
+
+
+class RpcHttpError(RuntimeError):
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(f"RPC HTTP {status}: {detail}")
+        self.status = status
+
+
+@dataclass
+class TransportStats:
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    bytes_decoded: int = 0
+
+
+@dataclass
+class OperationStats:
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    # Observations per PROFILE_BUCKETS bound, plus one for slower ones.
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(PROFILE_BUCKETS) + 1))
+    items: int = 0
+    max_items: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    retries: int = 0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the histogram bucket holding the q-quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, bucket in zip(PROFILE_BUCKETS, self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class Profiler:
+    """Latency histograms, batch sizes, byte counts and retries per instrumented operation.
+
+    Operations are named like "rpc.eth_call", "decode.aggregate3" or "write.csv".
+    Every hook is a no-op until enable() is called, which main() does for --profile.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = 0.0
+        self.operations: dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def observe(
+        self,
+        name: str,
+        seconds: float,
+        items: int = 0,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+    ) -> None:
+        bucket = next((i for i, bound in enumerate(PROFILE_BUCKETS) if seconds <= bound), len(PROFILE_BUCKETS))
+        with self._lock:
+            stats = self.operations.setdefault(name, OperationStats())
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.buckets[bucket] += 1
+            stats.items += items
+            stats.max_items = max(stats.max_items, items)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def count_retries(self, name: str, retries: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.operations.setdefault(name, OperationStats()).retries += retries
+
+    def timed(self, name: str, items: int = 0) -> ContextManager[None]:
+        return self._timed(name, items) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _timed(self, name: str, items: int) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, items)
+
+    def summary_lines(self) -> list[str]:
+        lines = [
+            f"profile: {time.perf_counter() - self.started:.3f} s wall",
+            (
+                f"{'operation':<28} {'count':>7} {'total_s':>9} {'mean_ms':>9} {'p95_ms':>9} {'max_ms':>9} "
+                f"{'items':>9} {'max_batch':>9} {'sent_B':>11} {'recv_B':>11} {'retries':>7}"
+            ),
+        ]
+        for name, stats in sorted(self.operations.items()):
+            mean = stats.seconds / stats.count if stats.count else 0.0
+            lines.append(
+                f"{name:<28} {stats.count:>7} {stats.seconds:>9.3f} {mean * 1e3:>9.2f} "
+                f"{stats.quantile(0.95) * 1e3:>9.2f} {stats.max_seconds * 1e3:>9.2f} {stats.items:>9} "
+                f"{stats.max_items:>9} {stats.bytes_sent:>11} {stats.bytes_received:>11} {stats.retries:>7}"
+            )
+        return lines
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "bucket_bounds": list(PROFILE_BUCKETS),
+            "operations": {
+                name: {
+                    "count": stats.count,
+                    "seconds": stats.seconds,
+                    "max_seconds": stats.max_seconds,
+                    "p95_seconds": stats.quantile(0.95),
+                    "buckets": stats.buckets,
+                    "items": stats.items,
+                    "max_items": stats.max_items,
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "retries": stats.retries,
+                }
+                for name, stats in sorted(self.operations.items())
+            },
+        }
+
+    def prometheus_text(self) -> str:
+        """Render the metrics in the Prometheus text format for node-exporter's textfile collector."""
+        prefix = "check_pending_redeems"
+        lines = [
+            f"# HELP {prefix}_operation_seconds Latency of instrumented operations in the last run.",
+            f"# TYPE {prefix}_operation_seconds histogram",
+        ]
+        operations = sorted(self.operations.items())
+        for name, stats in operations:
+            cumulative = 0
+            for bound, bucket in zip(PROFILE_BUCKETS, stats.buckets):
+                cumulative += bucket
+                lines.append(f'{prefix}_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_operation_seconds_bucket{{operation="{name}",le="+Inf"}} {stats.count}')
+            lines.append(f'{prefix}_operation_seconds_sum{{operation="{name}"}} {stats.seconds}')
+            lines.append(f'{prefix}_operation_seconds_count{{operation="{name}"}} {stats.count}')
+
+        for metric, kind, help_text, attribute in [
+            ("operation_items_total", "counter", "Items (calls, requests, rows) handled.", "items"),
+            ("operation_batch_size_max", "gauge", "Largest batch handled in one operation.", "max_items"),
+            ("operation_sent_bytes_total", "counter", "Request bytes sent.", "bytes_sent"),
+            ("operation_received_bytes_total", "counter", "Decompressed response bytes.", "bytes_received"),
+            ("operation_retries_total", "counter", "Retried requests or split batches.", "retries"),
+        ]:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            lines.extend(
+                f'{prefix}_{metric}{{operation="{name}"}} {getattr(stats, attribute)}' for name, stats in operations
+            )
+
+        lines.extend(
+            [
+                f"# HELP {prefix}_run_seconds Wall time of the last run.",
+                f"# TYPE {prefix}_run_seconds gauge",
+                f"{prefix}_run_seconds {time.perf_counter() - self.started}",
+                f"# HELP {prefix}_last_run_timestamp_seconds Unix time the last run finished.",
+                f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+                f"{prefix}_last_run_timestamp_seconds {time.time()}",
+            ]
+        )
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Path) -> None:
+        """Write a Prometheus textfile if path ends in .prom, JSON otherwise."""
+        text = self.prometheus_text() if path.suffix == ".prom" else json.dumps(self.to_json(), indent=2) + "\n"
+        # Written then renamed so a scraper never reads a half-written file; the
+        # temporary name ends in .tmp, which the textfile collector skips.
+        write_file_atomically(path, text)
+
+
+PROFILER = Profiler()
+
+
+class HttpTransport:
+    """Keep-alive HTTP/1.1 POST transport with a small pool of idle connections."""
+
+    def __init__(self, url: str, timeout: int, max_idle: int = 16) -> None:
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported RPC URL scheme: {parsed.scheme or url}")
+
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname or ""
+        self.port = parsed.port
+        self.path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        # HTTP_PROXY, HTTPS_PROXY and NO_PROXY, as urllib applies them. Plain HTTP goes to
+        # the proxy with the full URL; HTTPS is tunnelled through it with CONNECT.
+        netloc = self.host + (f":{self.port}" if self.port else "")
+        proxy = urllib.request.getproxies().get(self.scheme)
+        self.proxy = None
+        self.proxy_headers: dict[str, str] = {}
+        if proxy and not urllib.request.proxy_bypass(netloc):
+            self.proxy = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            if self.proxy.username is not None:
+                user = urllib.parse.unquote(self.proxy.username)
+                password = urllib.parse.unquote(self.proxy.password or "")
+                token = base64.b64encode(f"{user}:{password}".encode()).decode()
+                self.proxy_headers["Proxy-Authorization"] = f"Basic {token}"
+            if self.scheme == "http":
+                self.path = f"http://{netloc}{self.path}"
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.stats = TransportStats()
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.proxy is None:
+            if self.scheme == "https":
+                return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        proxy_host, proxy_port = self.proxy.hostname or "", self.proxy.port or 80
+        if self.scheme == "https":
+            connection = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout)
+            connection.set_tunnel(self.host, self.port, headers=self.proxy_headers)
+            return connection
+        return http.client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                self.stats.connections_reused += 1
+                return self._idle.pop(), True
+            self.stats.connections_opened += 1
+        return self._connect(), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def post(self, body: bytes) -> bytes:
+        headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
+            "User-Agent": "check_pending_redeems",
+        }
+        if self.scheme == "http":
+            headers.update(self.proxy_headers)
+
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request("POST", self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                raw = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+                connection.close()
+                # The server may drop an idle keep-alive connection at any time; retry on a new one.
+                if reused:
+                    continue
+                raise RpcConnectionError(f"RPC connection failed: {exc}") from exc
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                raise RpcConnectionError(f"RPC connection failed: {exc}") from exc
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_sent += len(body)
+            self.stats.bytes_received += len(raw)
+
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            try:
+                raw = gzip.decompress(raw)
+            except (gzip.BadGzipFile, zlib.error, EOFError) as exc:
+                # A body cut short in transit; sending the request again can fix it.
+                raise RpcConnectionError(f"RPC response body is truncated or corrupt: {exc}") from exc
+        with self._lock:
+            self.stats.bytes_decoded += len(raw)
+
+        if response.status >= 400:
+            raise RpcHttpError(response.status, raw.decode(errors="replace"))
+        return raw
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def endpoint_label(url: str) -> str:
+    """scheme://host[:port] of an RPC URL, leaving out the path and query that often hold API keys."""
+    parsed = urllib.parse.urlsplit(url)
+    return f"{parsed.scheme}://{parsed.hostname}" + (f":{parsed.port}" if parsed.port else "")
+
+
+@dataclass
+class EndpointHealth:
+    """Observed latency and errors of one TransportPool endpoint, and its circuit breaker."""
+
+    transport: HttpTransport
+    label: str
+    # Moving averages; latency stays 0 until the first successful POST.
+    latency: float = 0.0
+    error_rate: float = 0.0
+    # Recent POST latencies by request size class (bit length of the body size).
+    samples: dict[int, deque[float]] = field(default_factory=dict)
+    failures: int = 0
+    consecutive_failures: int = 0
+    # While open_until is set the circuit is open; once it has passed one trial POST is let through.
+    open_until: float = 0.0
+    cooldown: float = 0.0
+    trial_in_flight: bool = False
+    hedges_sent: int = 0
+    hedges_won: int = 0
+
+    def available(self, now: float) -> bool:
+        return not self.open_until or (self.open_until <= now and not self.trial_in_flight)
+
+    def weight(self, default_latency: float) -> float:
+        return (1.0 - self.error_rate) ** 2 / max(self.latency or default_latency, 1e-4)
+
+    def p95(self, size_class: int, min_samples: int) -> float | None:
+        recent = self.samples.get(size_class)
+        if not recent or len(recent) < min_samples:
+            return None
+        ordered = sorted(recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def circuit(self, now: float) -> str:
+        if not self.open_until:
+            return "closed"
+        return "open" if self.open_until > now else "half-open"
+
+
+class TransportPool:
+    """Spreads RPC POSTs over several endpoints, weighted by their observed health.
+
+    Each POST goes to an endpoint picked at random with weight (1 - error rate)^2 /
+    latency. A POST still running past its endpoint's p95 for that request size is
+    sent again to a second endpoint and the first response wins; it is the same
+    body, so the block pin is the same. Connection failures, 429s and 5xxs fail over
+    to another endpoint. FAILURE_THRESHOLD failures in a row open an endpoint's
+    circuit for a cooldown that doubles up to MAX_COOLDOWN, after which one trial
+    POST decides whether it closes again.
+    """
+
+    FAILURE_THRESHOLD = 3
+    BASE_COOLDOWN = 5.0
+    MAX_COOLDOWN = 60.0
+    MIN_HEDGE_SAMPLES = 20
+    LATENCY_SAMPLES = 200
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self, urls: list[str], timeout: int, hedge: bool = True) -> None:
+        self.endpoints = [EndpointHealth(HttpTransport(url, timeout), endpoint_label(url)) for url in urls]
+        self.hedge = hedge and len(self.endpoints) > 1
+        self._executor = ThreadPoolExecutor(max_workers=64) if self.hedge else None
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> TransportStats:
+        total = TransportStats()
+        for endpoint in self.endpoints:
+            for name, value in vars(endpoint.transport.stats).items():
+                setattr(total, name, getattr(total, name) + value)
+        return total
+
+    def _pick(self, exclude: list[EndpointHealth]) -> EndpointHealth | None:
+        now = time.monotonic()
+        with self._lock:
+            rest = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            candidates = [endpoint for endpoint in rest if endpoint.available(now)]
+            if not candidates and not exclude and rest:
+                # Every circuit is open: try the one closest to closing rather than failing outright.
+                candidates = [min(rest, key=lambda endpoint: endpoint.open_until)]
+            if not candidates:
+                return None
+            known = [endpoint.latency for endpoint in self.endpoints if endpoint.latency]
+            default_latency = min(known) if known else 1.0
+            weights = [endpoint.weight(default_latency) for endpoint in candidates]
+            chosen = self._random.choices(candidates, weights=weights)[0]
+            if chosen.open_until:
+                chosen.trial_in_flight = True
+            return chosen
+
+    def _record(self, endpoint: EndpointHealth, size_class: int, elapsed: float | None) -> None:
+        """Record a POST that succeeded after elapsed seconds, or failed when elapsed is None."""
+        alpha = self.EWMA_WEIGHT
+        with self._lock:
+            endpoint.trial_in_flight = False
+            endpoint.error_rate = (1 - alpha) * endpoint.error_rate + (alpha if elapsed is None else 0.0)
+            if elapsed is not None:
+                endpoint.latency = elapsed if not endpoint.latency else (1 - alpha) * endpoint.latency + alpha * elapsed
+                endpoint.samples.setdefault(size_class, deque(maxlen=self.LATENCY_SAMPLES)).append(elapsed)
+                endpoint.consecutive_failures = 0
+                endpoint.open_until = 0.0
+                endpoint.cooldown = 0.0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.open_until or endpoint.consecutive_failures >= self.FAILURE_THRESHOLD:
+                endpoint.cooldown = min(self.MAX_COOLDOWN, endpoint.cooldown * 2 or self.BASE_COOLDOWN)
+                endpoint.open_until = time.monotonic() + endpoint.cooldown
+
+    def _post_one(self, endpoint: EndpointHealth, body: bytes, size_class: int) -> bytes:
+        started = time.perf_counter()
+        try:
+            raw = endpoint.transport.post(body)
+        except RpcHttpError as exc:
+            # Other 4xx answers, like 413 for a batch that is too big, say nothing about the endpoint's health.
+            elapsed = time.perf_counter() - started
+            self._record(endpoint, size_class, None if exc.status == 429 or exc.status >= 500 else elapsed)
+            raise
+        except RuntimeError:
+            self._record(endpoint, size_class, None)
+            raise
+        self._record(endpoint, size_class, time.perf_counter() - started)
+        return raw
+
+    def _post_hedged(self, primary: EndpointHealth, body: bytes, size_class: int, tried: list[EndpointHealth]) -> bytes:
+        threshold = primary.p95(size_class, self.MIN_HEDGE_SAMPLES) if self._executor else None
+        if threshold is None or self._executor is None:
+            return self._post_one(primary, body, size_class)
+
+        first = self._executor.submit(self._post_one, primary, body, size_class)
+        try:
+            return first.result(timeout=threshold)
+        except FutureTimeoutError:
+            pass
+        backup = self._pick(tried)
+        if backup is None:
+            return first.result()
+        tried.append(backup)
+        with self._lock:
+            backup.hedges_sent += 1
+        second = self._executor.submit(self._post_one, backup, body, size_class)
+
+        # The slower POST is left to finish in the background, still updating its endpoint's health.
+        pending: set[Future[bytes]] = {first, second}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            backup.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def post(self, body: bytes) -> bytes:
+        size_class = len(body).bit_length()
+        tried: list[EndpointHealth] = []
+        last_error: RuntimeError | None = None
+        while True:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                raise last_error or RpcConnectionError("no RPC endpoint available")
+            tried.append(endpoint)
+            try:
+                return self._post_hedged(endpoint, body, size_class, tried)
+            except RuntimeError as exc:
+                if isinstance(exc, RpcHttpError) and exc.status != 429 and exc.status < 500:
+                    raise
+                last_error = exc
+
+    def summary_lines(self) -> list[str]:
+        now = time.monotonic()
+        lines = []
+        with self._lock:
+            for endpoint in self.endpoints:
+                lines.append(
+                    f"rpc endpoint {endpoint.label}: {endpoint.transport.stats.requests} requests | "
+                    f"{endpoint.failures} failures | latency {endpoint.latency * 1000:.1f} ms | "
+                    f"hedges won {endpoint.hedges_won}/{endpoint.hedges_sent} | circuit {endpoint.circuit(now)}"
+                )
+        return lines
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for endpoint in self.endpoints:
+            endpoint.transport.close()
+
+
+class CallCache:
+    """SQLite store of eth_call results, content-addressed and evicted least recently used first.
+
+    Keys hash (chain id, block number, to, calldata hash). Results are stored as
+    zlib-compressed bytes; once their total size exceeds max_bytes the least
+    recently used ones are dropped down to 90% of it.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS calls "
+            "(key BLOB PRIMARY KEY, result BLOB NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS calls_used ON calls (used)")
+        self.max_bytes = max_bytes
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM calls").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chain_id: int, block_number: int, to: str, data: str) -> bytes:
+        data_hash = hashlib.sha256(bytes.fromhex(strip_0x(data))).digest()
+        return hashlib.sha256(f"{chain_id}:{block_number}:{to.lower()}:".encode() + data_hash).digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, str]:
+        found: dict[bytes, str] = {}
+        with self._lock:
+            # Stay under SQLite's limit on query parameters.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, result FROM calls WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((bytes(key), "0x" + zlib.decompress(result).hex()) for key, result in rows)
+            if found:
+                used = time.time_ns()
+                self.connection.executemany("UPDATE calls SET used = ? WHERE key = ?", [(used, key) for key in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: list[tuple[bytes, str]]) -> None:
+        with self._lock:
+            used = time.time_ns()
+            self.connection.execute("BEGIN")
+            for key, result in items:
+                compressed = zlib.compress(bytes.fromhex(strip_0x(result)), 1)
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO calls (key, result, size, used) VALUES (?, ?, ?, ?)",
+                    (key, compressed, len(compressed), used),
+                )
+                self.total_bytes += len(compressed) * cursor.rowcount
+            self.connection.execute("COMMIT")
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int) -> None:
+        victims = []
+        for key, size in self.connection.execute("SELECT key, size FROM calls ORDER BY used"):
+            if self.total_bytes <= target_bytes:
+                break
+            victims.append((key,))
+            self.total_bytes -= size
+        self.connection.executemany("DELETE FROM calls WHERE key = ?", victims)
+        self.evicted += len(victims)
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+
+class RpcClient:
+    def __init__(
+        self,
+        rpc_url: str,
+        timeout: int,
+        max_batch: int = 100,
+        retries: int = 3,
+        cache: CallCache | None = None,
+        fallback_urls: list[str] | None = None,
+        hedge: bool = True,
+    ) -> None:
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        # With fallback URLs every POST goes through a health-weighted, hedging pool of endpoints.
+        self.transport: HttpTransport | TransportPool = HttpTransport(rpc_url, timeout)
+        if fallback_urls:
+            self.transport = TransportPool([rpc_url, *fallback_urls], timeout, hedge)
+        # Largest JSON-RPC array the provider has accepted. Halved whenever a batch is rejected.
+        self.max_batch = max_batch
+        self.retries = retries
+        self.next_id = 1
+        self._id_lock = threading.Lock()
+        self.cache = cache
+        # Chain id, finalized block number and when they were read, read the first time the cache needs them.
+        self._cache_chain: tuple[int, int, float] | None = None
+        self._cache_lock = threading.Lock()
+        # How withdrawalRequests are read, one of READERS. Reset to multicall the first time another reader fails.
+        self.reader = "multicall"
+        # Set for --resilient: subcalls may fail, failed ones are retried on their own and
+        # requests that keep failing are recorded here instead of aborting the run.
+        self.failures: FailureReport | None = None
+
+    def _allocate_ids(self, count: int) -> int:
+        with self._id_lock:
+            first_id = self.next_id
+            self.next_id += count
+        return first_id
+
+    def _send(self, requests: list[tuple[str, list[Any]]]) -> dict[int, dict[str, Any]]:
+        first_id = self._allocate_ids(len(requests))
+        payload = [
+            {"jsonrpc": "2.0", "id": first_id + i, "method": method, "params": params}
+            for i, (method, params) in enumerate(requests)
+        ]
+        request_body = json.dumps(payload[0] if len(payload) == 1 else payload).encode()
+        started = time.perf_counter()
+        raw = self.transport.post(request_body)
+        if PROFILER.enabled:
+            PROFILER.observe(
+                rpc_operation(requests),
+                time.perf_counter() - started,
+                items=len(payload),
+                bytes_sent=len(request_body),
+                bytes_received=len(raw),
+            )
+        with PROFILER.timed("decode.json", len(payload)):
+            body = json.loads(raw)
+
+        if isinstance(body, dict):
+            if len(payload) > 1:
+                raise BatchRejectedError(f"RPC batch of {len(payload)} rejected: {body.get('error', body)}")
+            body = [body]
+        # An error the node could not tie to a request, like a rate limit, has a null id and applies to the whole POST.
+        if len(body) == 1 and body[0].get("id") is None and "error" in body[0]:
+            if len(payload) > 1:
+                raise BatchRejectedError(f"RPC batch of {len(payload)} rejected: {body[0]['error']}")
+            return {0: body[0]}
+        return {
+            response["id"] - first_id: response
+            for response in body
+            if isinstance(response.get("id"), int) and 0 <= response["id"] - first_id < len(payload)
+        }
+
+    def _cache_key(self, method: str, params: list[Any]) -> bytes | None:
+        """Cache key of an eth_call pinned to a finalized block, None for anything else."""
+        if method != "eth_call" or len(params) != 2 or set(params[0]) != {"to", "data"}:
+            return None
+        if not isinstance(params[1], str) or not params[1].startswith("0x"):
+            return None
+
+        block_number = int(params[1], 16)
+        with self._cache_lock:
+            # Calls above the finalized block read it again once it is older than the refresh interval.
+            now = time.monotonic()
+            if self._cache_chain is None or (
+                block_number > self._cache_chain[1] and now - self._cache_chain[2] >= FINALIZED_REFRESH_INTERVAL
+            ):
+                chain_id, finalized = self.batch(
+                    [("eth_chainId", []), ("eth_getBlockByNumber", ["finalized", False])], raise_errors=False
+                )
+                if isinstance(chain_id, Exception):
+                    raise chain_id
+                # Providers without the finalized tag get no caching; a failed re-read keeps the last number.
+                finalized_number = self._cache_chain[1] if self._cache_chain else -1
+                if finalized and not isinstance(finalized, Exception):
+                    finalized_number = int(finalized["number"], 16)
+                self._cache_chain = (int(chain_id, 16), finalized_number, now)
+            chain_id, finalized_number, _ = self._cache_chain
+
+        if block_number > finalized_number:
+            return None
+        return CallCache.key(chain_id, block_number, params[0]["to"], params[0]["data"])
+
+    def batch(self, requests: list[tuple[str, list[Any]]], raise_errors: bool = True) -> list[Any]:
+        """Send requests as JSON-RPC 2.0 arrays and return the results in request order.
+
+        Requests that come back with an error or are missing from the response are
+        retried individually. The array size shrinks if the provider rejects it.
+        A POST that cannot reach the endpoint is sent again with backoff and raises
+        RpcConnectionError once client.retries are used up. With raise_errors=False
+        a request that still fails yields an RpcError in its slot.
+        eth_calls at finalized blocks are answered from, and saved to, the call cache,
+        except aggregate3 results with a failed call, so a rerun asks for those again.
+        """
+        if self.cache is None:
+            return self._batch(requests, raise_errors)
+
+        keys = [self._cache_key(method, params) for method, params in requests]
+        cached = self.cache.get_many([key for key in keys if key is not None])
+        pending = [i for i, key in enumerate(keys) if key is None or key not in cached]
+        fetched = self._batch([requests[i] for i in pending], raise_errors) if pending else []
+
+        results: list[Any] = [cached.get(key) if key is not None else None for key in keys]
+        new_entries = []
+        for i, result in zip(pending, fetched, strict=True):
+            results[i] = result
+            key = keys[i]
+            if key is None or not isinstance(result, str):
+                continue
+            is_aggregate3 = strip_0x(requests[i][1][0]["data"]).startswith(SELECTOR_AGGREGATE3.hex())
+            if is_aggregate3 and aggregate3_has_failure(result):
+                continue
+            new_entries.append((key, result))
+        if new_entries:
+            self.cache.put_many(new_entries)
+        return results
+
+    def _batch(self, requests: list[tuple[str, list[Any]]], raise_errors: bool) -> list[Any]:
+        results: list[Any] = [None] * len(requests)
+        attempts = [0] * len(requests)
+        pending = list(range(len(requests)))
+        connection_failures = 0
+
+        while pending:
+            failed: list[tuple[int, str, bool]] = []
+            position = 0
+            while position < len(pending):
+                chunk = pending[position : position + self.max_batch]
+                try:
+                    responses = self._send([requests[index] for index in chunk])
+                except RpcConnectionError:
+                    # The same POST is sent again; a connection failure is no reason to split or fail requests.
+                    connection_failures += 1
+                    if connection_failures > self.retries:
+                        raise
+                    PROFILER.count_retries(rpc_operation([requests[index] for index in chunk]))
+                    time.sleep(0.25 * 2 ** (connection_failures - 1))
+                    continue
+                except (BatchRejectedError, RpcHttpError) as exc:
+                    too_large = isinstance(exc, BatchRejectedError) or exc.status == 413
+                    if too_large and len(chunk) > 1:
+                        self.max_batch = max(1, len(chunk) // 2)
+                        continue
+                    retryable = isinstance(exc, RpcHttpError) and exc.status in (429, 500, 502, 503, 504)
+                    failed.extend((index, str(exc), retryable) for index in chunk)
+                    position += len(chunk)
+                    continue
+
+                for offset, index in enumerate(chunk):
+                    response = responses.get(offset)
+                    if response is None:
+                        failed.append((index, "missing from batch response", True))
+                    elif "error" in response:
+                        error = response["error"]
+                        code = error.get("code") if isinstance(error, dict) else None
+                        retryable = code not in NON_RETRYABLE_RPC_ERRORS and not is_capacity_error(str(error))
+                        failed.append((index, str(error), retryable))
+                    else:
+                        results[index] = response["result"]
+                position += len(chunk)
+
+            pending = []
+            for index, error, retryable in failed:
+                attempts[index] += 1
+                if not retryable or attempts[index] > self.retries:
+                    rpc_error = RpcError(f"RPC {requests[index][0]} error: {error}")
+                    if raise_errors:
+                        raise rpc_error
+                    results[index] = rpc_error
+                    continue
+                PROFILER.count_retries(rpc_operation([requests[index]]))
+                pending.append(index)
+            if pending:
+                time.sleep(0.25 * 2 ** (max(attempts[index] for index in pending) - 1))
+
+        return results
+
+    def call(self, method: str, params: list[Any]) -> Any:
+        return self.batch([(method, params)])[0]
+
+    def close(self) -> None:
+        self.transport.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def eth_call(self, to: str, data: str, block_tag: str) -> str:
+        return self.call("eth_call", [{"to": validate_address(to), "data": data}, block_tag])
+
+
+def rpc_operation(requests: list[tuple[str, list[Any]]]) -> str:
+    methods = {method for method, _ in requests}
+    return f"rpc.{methods.pop()}" if len(methods) == 1 else "rpc.batch"
+
+
+def multicall(
+    client: RpcClient,
+    block_tag: str,
+    calls: list[tuple[str, bytes]],
+) -> list[bytes]:
+    return multicall_batch(client, block_tag, [calls])[0]
+
+
+def multicall_batch(
+    client: RpcClient,
+    block_tag: str,
+    call_groups: list[list[tuple[str, bytes]]],
+) -> list[list[bytes]]:
+    """Run one aggregate3 eth_call per group, all in a single JSON-RPC batch."""
+    groups = [calls for calls in call_groups if calls]
+    with PROFILER.timed("multicall", sum(len(calls) for calls in groups)):
+        raw_results = client.batch(
+            [("eth_call", multicall_params(calls, block_tag)) for calls in groups]
+        )
+        decoded = iter([check_multicall_results(calls, raw) for calls, raw in zip(groups, raw_results, strict=True)])
+        return [next(decoded) if calls else [] for calls in call_groups]
+
+
+def multicall_params(calls: list[tuple[str, bytes]], block_tag: str, allow_failure: bool = False) -> list[Any]:
+    with PROFILER.timed("encode.aggregate3", len(calls)):
+        data = encode_aggregate3((target, allow_failure, call_data) for target, call_data in calls)
+    return [{"to": MULTICALL3, "data": data}, block_tag]
+
+
+def check_multicall_results(calls: list[tuple[str, bytes]], raw_result: str) -> list[bytes]:
+    results = decode_aggregate3_return(raw_result)
+
+    if len(results) != len(calls):
+        raise RuntimeError(f"Multicall3 returned {len(results)} results for {len(calls)} calls")
+
+    failed = [i for i, (success, _) in enumerate(results) if not success]
+    if failed:
+        raise RuntimeError(f"Multicall3 subcalls failed at indices: {failed[:10]}")
+
+    return [return_data for _, return_data in results]
+
+
+def block_tag_from_args(client: RpcClient, block_arg: str) -> tuple[str, int, int]:
+    if block_arg == "latest":
+        block_number = int(client.call("eth_blockNumber", []), 16)
+    else:
+        block_number = int(block_arg, 0)
+
+    block_tag = hex(block_number)
+    block = client.call("eth_getBlockByNumber", [block_tag, False])
+    if block is None:
+        raise RuntimeError(f"block not found: {block_tag}")
+
+    return block_tag, block_number, int(block["timestamp"], 16)
+
+
+def fetch_snapshot(client: RpcClient, arm: str, block_tag: str, block_number: int, block_timestamp: int) -> Snapshot:
+    call_results = multicall(
+        client,
+        block_tag,
+        [
+            (arm, calldata_no_args(SELECTOR_NEXT_WITHDRAWAL_INDEX)),
+            (arm, calldata_no_args(SELECTOR_CLAIMABLE)),
+            (arm, calldata_no_args(SELECTOR_CLAIM_DELAY)),
+        ],
+    )
+
+    return Snapshot(
+        block_number=block_number,
+        block_timestamp=block_timestamp,
+        next_withdrawal_index=decode_uint256(call_results[0]),
+        claimable_frontier=decode_uint256(call_results[1]),
+        claim_delay=decode_uint256(call_results[2]),
+    )
+
+
+def snapshot_calls(arm: str) -> list[tuple[str, bytes]]:
+    return [
+        (arm, calldata_no_args(SELECTOR_NEXT_WITHDRAWAL_INDEX)),
+        (arm, calldata_no_args(SELECTOR_CLAIMABLE)),
+        (arm, calldata_no_args(SELECTOR_CLAIM_DELAY)),
+    ]
+
+
+def fetch_pinned_snapshot(client: RpcClient, arm: str, block_arg: str) -> tuple[str, Snapshot, int]:
+    """Resolve the block and read the snapshot in one round trip.
+
+    For 'latest' the block number and timestamp come from Multicall3 in the same
+    eth_call as the snapshot, so they always describe the same state.
+    Returns the pinned block tag, the snapshot and the chain id.
+    """
+    block_tag, snapshots, chain_id = fetch_pinned_snapshots(client, [arm], block_arg)
+    return block_tag, snapshots[0], chain_id
+
+
+def fetch_pinned_snapshots(
+    client: RpcClient,
+    arms: list[str],
+    block_arg: str,
+) -> tuple[str, list[Snapshot], int]:
+    """Like fetch_pinned_snapshot, reading every ARM in the same aggregate3 call."""
+    calls = [(MULTICALL3, calldata_no_args(SELECTOR_GET_CHAIN_ID))]
+    for arm in arms:
+        calls.extend(snapshot_calls(arm))
+
+    if block_arg == "latest":
+        calls = [
+            (MULTICALL3, calldata_no_args(SELECTOR_GET_BLOCK_NUMBER)),
+            (MULTICALL3, calldata_no_args(SELECTOR_GET_CURRENT_BLOCK_TIMESTAMP)),
+            *calls,
+        ]
+        results = multicall(client, "latest", calls)
+        block_number = decode_uint256(results[0])
+        block_timestamp = decode_uint256(results[1])
+        results = results[2:]
+    else:
+        block_number = int(block_arg, 0)
+        block, raw_result = client.batch(
+            [
+                ("eth_getBlockByNumber", [hex(block_number), False]),
+                ("eth_call", multicall_params(calls, hex(block_number))),
+            ]
+        )
+        if block is None:
+            raise RuntimeError(f"block not found: {hex(block_number)}")
+        block_timestamp = int(block["timestamp"], 16)
+        results = check_multicall_results(calls, raw_result)
+
+    chain_id = decode_uint256(results[0])
+    snapshots = [
+        Snapshot(
+            block_number=block_number,
+            block_timestamp=block_timestamp,
+            next_withdrawal_index=decode_uint256(results[1 + 3 * i]),
+            claimable_frontier=decode_uint256(results[2 + 3 * i]),
+            claim_delay=decode_uint256(results[3 + 3 * i]),
+        )
+        for i in range(len(arms))
+    ]
+    return hex(block_number), snapshots, chain_id
+
+
+class BatchSizer:
+    """Tunes the number of withdrawalRequests calls per aggregate3 for one RPC endpoint.
+
+    A failed batch caps the size below its length and halves it. A full-size batch
+    that returns in under half the latency target grows it by half.
+    """
+
+    def __init__(self, size: int, target_latency: float, max_size: int = MAX_BATCH_SIZE) -> None:
+        self.size = max(1, min(size, max_size))
+        self.target_latency = target_latency
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def on_success(self, batch_len: int, elapsed: float) -> None:
+        with self._lock:
+            if batch_len >= self.size and elapsed < self.target_latency / 2:
+                self.size = min(self.max_size, self.size + max(1, self.size // 2))
+
+    def on_failure(self, batch_len: int) -> None:
+        with self._lock:
+            self.max_size = max(1, min(self.max_size, batch_len - 1))
+            self.size = max(1, min(self.size, batch_len // 2))
+
+    @staticmethod
+    def url_key(rpc_url: str) -> str:
+        # Hash the URL so provider API keys are not written to disk.
+        return hashlib.sha256(rpc_url.encode()).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path: Path, rpc_url: str, default_size: int, target_latency: float) -> BatchSizer:
+        size = default_size
+        if path.exists():
+            size = json.loads(path.read_text()).get(cls.url_key(rpc_url), default_size)
+        return cls(size, target_latency)
+
+    def save(self, path: Path, rpc_url: str) -> None:
+        # Read right before writing, so sizes other runs saved for other URLs meanwhile are kept.
+        sizes = json.loads(path.read_text()) if path.exists() else {}
+        sizes[self.url_key(rpc_url)] = self.size
+        write_file_atomically(path, json.dumps(sizes, indent=2, sort_keys=True))
+
+
+@dataclass(frozen=True)
+class FailedRequest:
+    arm: str
+    request_id: int
+    error: str
+
+
+class FailureReport:
+    """Requests --resilient gave up on, so a scan can finish without them."""
+
+    def __init__(self, max_attempts: int) -> None:
+        self.max_attempts = max_attempts
+        self.failed: list[FailedRequest] = []
+        self.retried_subcalls = 0
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, arm: str, request_id: int, error: str) -> None:
+        with self._lock:
+            self.failed.append(FailedRequest(arm, request_id, error))
+            self._counts[arm] = self._counts.get(arm, 0) + 1
+
+    def count_retries(self, subcalls: int) -> None:
+        with self._lock:
+            self.retried_subcalls += subcalls
+
+    def count(self, arm: str) -> int:
+        with self._lock:
+            return self._counts.get(arm, 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            failed = sorted(self.failed, key=lambda failure: (failure.arm, failure.request_id))
+            return {
+                "failed_count": len(failed),
+                "retried_subcalls": self.retried_subcalls,
+                "max_attempts": self.max_attempts,
+                "failed": [
+                    {"arm": failure.arm, "request_id": failure.request_id, "error": failure.error}
+                    for failure in failed
+                ],
+            }
+
+    def save(self, path: Path) -> None:
+        write_file_atomically(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+
+def fetch_requests(
+    client: RpcClient,
+    arm: str,
+    block_tag: str,
+    start_id: int,
+    end_id: int,
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> list[WithdrawalRequest]:
+    return fetch_request_ids(
+        client, arm, block_tag, list(range(start_id, end_id)), batch_size, concurrency, calls_per_post
+    )
+
+
+def fetch_request_batches(
+    client: RpcClient,
+    block_tag: str,
+    key_batches: list[list[tuple[str, int]]],
+) -> list[list[WithdrawalRequest | None] | Exception]:
+    """Fetch each batch of (ARM, request id) keys with its own aggregate3 call, all in one POST.
+
+    Returns the decoded requests per batch, or the exception that batch failed with.
+    client.reader can pick another way to read a batch, see reader_requests(). If
+    that fails for any reason but the call being too big, the client falls back to
+    multicall and those batches are read again through Multicall3.
+    With client.failures set, subcalls that fail are retried on their own and the
+    requests still failing after that are recorded there and left as None.
+    """
+    outcomes = read_request_batches(client, block_tag, key_batches)
+    if client.failures is not None:
+        retry_failed_subcalls(client, block_tag, key_batches, outcomes)
+    return outcomes
+
+
+def read_request_batches(
+    client: RpcClient,
+    block_tag: str,
+    key_batches: list[list[tuple[str, int]]],
+) -> list[list[Any] | Exception]:
+    """One attempt at fetch_request_batches(); with client.failures set, failed subcalls leave their error."""
+    allow_failure = client.failures is not None
+    plans = [reader_requests(client.reader, keys, block_tag, allow_failure) for keys in key_batches]
+    try:
+        with PROFILER.timed("multicall.withdrawal_requests", sum(len(keys) for keys in key_batches)):
+            raw_results = client.batch([request for _, requests in plans for request in requests], raise_errors=False)
+    except RpcConnectionError:
+        # Still unreachable after the client's retries; splitting the batches would not help.
+        raise
+    except RuntimeError as exc:
+        return [exc] * len(key_batches)
+
+    outcomes: list[list[Any] | Exception] = []
+    fallback: list[int] = []
+    position = 0
+    for i, (keys, (reader, requests)) in enumerate(zip(key_batches, plans, strict=True)):
+        results = raw_results[position : position + len(requests)]
+        position += len(requests)
+        try:
+            outcomes.append(decode_reader_results(reader, keys, results, allow_failure))
+        except (RuntimeError, ValueError) as exc:
+            if reader != "multicall" and not is_capacity_error(str(exc)):
+                fallback.append(i)
+            outcomes.append(exc)
+
+    if fallback:
+        fall_back_to_multicall(client, str(outcomes[fallback[0]]))
+        retried = read_request_batches(client, block_tag, [key_batches[i] for i in fallback])
+        for i, outcome in zip(fallback, retried, strict=True):
+            outcomes[i] = outcome
+    return outcomes
+
+
+def retry_failed_subcalls(
+    client: RpcClient,
+    block_tag: str,
+    key_batches: list[list[tuple[str, int]]],
+    outcomes: list[list[Any] | Exception],
+) -> None:
+    """Re-read only the requests whose subcalls failed, with backoff, up to client.retries times.
+
+    Each failed slot in outcomes ends up as the request read on a later attempt, or
+    as None once it is recorded in client.failures.
+    """
+    assert client.failures is not None
+    failed = [
+        (i, j)
+        for i, outcome in enumerate(outcomes)
+        if not isinstance(outcome, Exception)
+        for j, request in enumerate(outcome)
+        if isinstance(request, Exception)
+    ]
+    size = max((len(keys) for keys in key_batches), default=1)
+    attempt = 0
+    while failed and attempt < client.retries:
+        attempt += 1
+        client.failures.count_retries(len(failed))
+        PROFILER.count_retries("multicall.withdrawal_requests", len(failed))
+        time.sleep(0.25 * 2 ** (attempt - 1))
+        keys = [key_batches[i][j] for i, j in failed]
+        batches = [keys[start : start + size] for start in range(0, len(keys), size)]
+        retried = read_request_batches(client, block_tag, batches)
+        for position, (i, j) in enumerate(failed):
+            outcome = retried[position // size]
+            outcomes[i][j] = outcome if isinstance(outcome, Exception) else outcome[position % size]
+        failed = [(i, j) for i, j in failed if isinstance(outcomes[i][j], Exception)]
+
+    for i, j in failed:
+        arm, request_id = key_batches[i][j]
+        client.failures.add(arm, request_id, str(outcomes[i][j]))
+        outcomes[i][j] = None
+
+
+class ReaderFallbackWarning(UserWarning):
+    """The requested reader could not be used and requests are read through Multicall3."""
+
+
+def fall_back_to_multicall(client: RpcClient, reason: str) -> None:
+    if client.reader != "multicall":
+        warnings.warn(f"{client.reader} reader unavailable, using Multicall3: {reason}", ReaderFallbackWarning)
+        client.reader = "multicall"
+
+
+def reader_requests(
+    reader: str,
+    keys: list[tuple[str, int]],
+    block_tag: str,
+    allow_failure: bool = False,
+) -> tuple[str, list[tuple[str, list[Any]]]]:
+    """JSON-RPC requests reading one batch of keys, and the reader they are for.
+
+    multicall makes one aggregate3 eth_call. override runs the state-override range
+    reader when the keys are consecutive ids of one ARM, and uses multicall otherwise.
+    storage reads the two storage slots of every request with eth_getStorageAt, and
+    proof reads them with one eth_getProof per ARM in the batch.
+    """
+    if reader == "override":
+        run = range_reader_run(keys)
+        if run is not None:
+            return reader, [("eth_call", range_reader_params(*run, block_tag))]
+    elif reader in ("storage", "proof"):
+        with PROFILER.timed("encode.storage_slots", len(keys)):
+            slots = [withdrawal_request_slot(request_id) for _, request_id in keys]
+        if reader == "storage":
+            return reader, [
+                ("eth_getStorageAt", [arm, hex(slot + half), block_tag])
+                for (arm, _), slot in zip(keys, slots, strict=True)
+                for half in (0, 1)
+            ]
+        slots_by_arm: dict[str, list[str]] = {}
+        for (arm, _), slot in zip(keys, slots, strict=True):
+            slots_by_arm.setdefault(arm, []).extend([f"0x{slot:064x}", f"0x{slot + 1:064x}"])
+        return reader, [("eth_getProof", [arm, arm_slots, block_tag]) for arm, arm_slots in slots_by_arm.items()]
+
+    calls = [(arm, calldata_with_uint256(SELECTOR_WITHDRAWAL_REQUESTS, request_id)) for arm, request_id in keys]
+    return "multicall", [("eth_call", multicall_params(calls, block_tag, allow_failure))]
+
+
+def decode_reader_results(
+    reader: str,
+    keys: list[tuple[str, int]],
+    results: list[Any],
+    allow_failure: bool = False,
+) -> list[Any]:
+    """Decode the results of reader_requests(), raising the first error among them.
+
+    With allow_failure, a failed Multicall3 subcall leaves its error in its request's place.
+    """
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    request_ids = [request_id for _, request_id in keys]
+    if reader == "override":
+        return decode_range_reader_return(results[0], request_ids)
+    if reader == "storage":
+        return decode_withdrawal_request_slots(request_ids, results)
+    if reader == "proof":
+        arms = list(dict.fromkeys(arm for arm, _ in keys))
+        words_by_arm = {
+            arm: iter(proof["value"] for proof in result["storageProof"])
+            for arm, result in zip(arms, results, strict=True)
+        }
+        values = [value for arm, _ in keys for value in islice(words_by_arm[arm], 2)]
+        return decode_withdrawal_request_slots(request_ids, values)
+    if allow_failure:
+        return decode_withdrawal_requests_allowing_failure(results[0], request_ids)
+    return decode_withdrawal_requests(results[0], request_ids)
+
+
+def storage_layout_problem(client: RpcClient, block_tag: str, arms: list[tuple[str, Snapshot]]) -> str | None:
+    """Check that storage reads agree with Multicall3 for each ARM before trusting them.
+
+    Compares the nextWithdrawalIndex slot with the snapshot and the newest request
+    read through client.reader with the same request read through Multicall3.
+    Returns what did not match, or None.
+    """
+    keys = [(arm, snapshot.next_withdrawal_index - 1) for arm, snapshot in arms if snapshot.next_withdrawal_index]
+    stored_reader, stored_requests = reader_requests(client.reader, keys, block_tag) if keys else ("", [])
+    _, called_requests = reader_requests("multicall", keys, block_tag) if keys else ("", [])
+    try:
+        results = client.batch(
+            [("eth_getStorageAt", [arm, hex(NEXT_WITHDRAWAL_INDEX_SLOT), block_tag]) for arm, _ in arms]
+            + stored_requests
+            + called_requests
+        )
+        for (arm, snapshot), value in zip(arms, results[: len(arms)], strict=True):
+            if int(value, 16) != snapshot.next_withdrawal_index:
+                return f"storage slot {NEXT_WITHDRAWAL_INDEX_SLOT} of {arm} is not nextWithdrawalIndex()"
+        if not keys:
+            return None
+        stored_results = results[len(arms) : len(arms) + len(stored_requests)]
+        stored = decode_reader_results(stored_reader, keys, stored_results)
+        called = decode_reader_results("multicall", keys, results[len(arms) + len(stored_requests) :])
+    except RpcConnectionError:
+        raise
+    except (RuntimeError, ValueError) as exc:
+        return str(exc)
+    for (arm, _), stored_request, called_request in zip(keys, stored, called, strict=True):
+        if stored_request != called_request:
+            return f"storage slots of withdrawalRequests({called_request.request_id}) on {arm} do not match"
+    return None
+
+
+def range_reader_run(keys: list[tuple[str, int]]) -> tuple[str, int, int] | None:
+    """(ARM, start id, end id) when keys are consecutive ids of one ARM, else None."""
+    arm, start_id = keys[0]
+    if any(key != (arm, start_id + i) for i, key in enumerate(keys)):
+        return None
+    return arm, start_id, start_id + len(keys)
+
+
+def range_reader_params(arm: str, start_id: int, end_id: int, block_tag: str) -> list[Any]:
+    """eth_call params running the range reader over [start_id, end_id) of one ARM."""
+    data = "0x" + (address_word(arm) + word(start_id) + word(end_id)).hex()
+    return [{"to": RANGE_READER, "data": data}, block_tag, {RANGE_READER: {"code": RANGE_READER_CODE}}]
+
+
+def fetch_request_ids(
+    client: RpcClient,
+    arm: str,
+    block_tag: str,
+    request_ids: list[int],
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> list[WithdrawalRequest]:
+    keys = [(arm, request_id) for request_id in request_ids]
+    return fetch_request_keys(client, block_tag, keys, batch_size, concurrency, calls_per_post)
+
+
+def fetch_request_keys(
+    client: RpcClient,
+    block_tag: str,
+    keys: Iterable[tuple[str, int]],
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> list[WithdrawalRequest]:
+    return [
+        request
+        for chunk in iter_request_keys(client, block_tag, keys, batch_size, concurrency, calls_per_post)
+        for request in chunk
+    ]
+
+
+def iter_request_keys(
+    client: RpcClient,
+    block_tag: str,
+    keys: Iterable[tuple[str, int]],
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> Iterator[list[WithdrawalRequest]]:
+    """Yield (ARM, request id) keys as chunks of requests in key order.
+
+    Batches too big for the node are split and retried, and fast ones grow the batch
+    size. Any other failure, or a single key that still fails, raises, or with
+    client.failures set is recorded there and left out of the chunks. Multicall3
+    takes a target per call, so keys for different ARMs share batches.
+    Keys are consumed lazily one round of concurrency * calls_per_post batches at
+    a time, and every batch is yielded as soon as all batches before it are done.
+    """
+    sizer = batch_size if isinstance(batch_size, BatchSizer) else BatchSizer(batch_size, 0, max_size=batch_size)
+    key_iter = iter(keys)
+
+    def run_group(group: list[list[tuple[str, int]]]) -> tuple[list[list[tuple[str, int]]], list[Any], float]:
+        started = time.monotonic()
+        outcomes = fetch_request_batches(client, block_tag, group)
+        return group, outcomes, time.monotonic() - started
+
+    executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+    try:
+        while True:
+            batches: list[list[tuple[str, int]]] = []
+            while len(batches) < concurrency * calls_per_post:
+                batch = list(islice(key_iter, sizer.size))
+                if not batch:
+                    break
+                batches.append(batch)
+            if not batches:
+                return
+
+            # Batches after the first failure are held back until the split retries are done.
+            fetched: dict[tuple[str, int], WithdrawalRequest | None] = {}
+            held: list[list[tuple[str, int]]] = []
+            pending = batches
+            while pending:
+                groups = [pending[i : i + calls_per_post] for i in range(0, len(pending), calls_per_post)]
+                retry: list[list[tuple[str, int]]] = []
+                rounds = executor.map(run_group, groups) if executor else map(run_group, groups)
+                for group, outcomes, elapsed in rounds:
+                    for batch, outcome in zip(group, outcomes, strict=True):
+                        # Only a batch too big for the node is worth splitting; smaller ones would fail the same way.
+                        if isinstance(outcome, Exception) and (len(batch) == 1 or not is_capacity_error(str(outcome))):
+                            if client.failures is None:
+                                raise outcome
+                            for key in batch:
+                                client.failures.add(*key, str(outcome))
+                            outcome = [None] * len(batch)
+                        if isinstance(outcome, Exception):
+                            sizer.on_failure(len(batch))
+                            PROFILER.count_retries("multicall.withdrawal_requests")
+                            middle = len(batch) // 2
+                            retry.extend([batch[:middle], batch[middle:]])
+                            if pending is batches:
+                                held.append(batch)
+                            continue
+
+                        sizer.on_success(len(batch), elapsed)
+                        if pending is batches and not held:
+                            yield [request for request in outcome if request is not None]
+                        else:
+                            fetched.update(zip(batch, outcome, strict=True))
+                            if pending is batches:
+                                held.append(batch)
+                pending = retry
+
+            if held:
+                yield [fetched[key] for batch in held for key in batch if fetched[key] is not None]
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+@dataclass(frozen=True)
+class Frontier:
+    """Where an ARM's claimable() liquidity runs out in its withdrawal queue.
+
+    Requests with ids below frontier_id have queued <= claimable() and are not
+    waiting for liquidity. next_queued is the queued amount of the last of the
+    next_count requests from frontier_id on.
+    """
+
+    frontier_id: int
+    next_count: int
+    next_queued: int
+    liquidity_needed: int
+    probes: int
+    rounds: int
+
+
+def find_frontiers(
+    client: RpcClient,
+    block_tag: str,
+    arms: list[tuple[str, Snapshot]],
+    next_count: int,
+    probes_per_round: int = 16,
+) -> list[Frontier]:
+    """Search each ARM's queue for the first request whose queued exceeds claimable().
+
+    queued is cumulative, so it only grows with the request id and the liquidity
+    boundary can be found by search instead of a full scan. Each round probes up
+    to probes_per_round evenly spaced ids per ARM in one pinned aggregate3 call,
+    which narrows the range probes_per_round + 1 times; 1 is a plain binary search.
+    """
+    # [low, high] bounds the first id past the liquidity per ARM; high == nextWithdrawalIndex means none is.
+    bounds = [[0, snapshot.next_withdrawal_index] for _, snapshot in arms]
+    queued: list[dict[int, int]] = [{} for _ in arms]
+    probes = [0] * len(arms)
+    rounds = 0
+
+    def probe(wanted: list[list[int]]) -> None:
+        keys = [(i, request_id) for i, ids in enumerate(wanted) for request_id in ids]
+        calls = [
+            (arms[i][0], calldata_with_uint256(SELECTOR_WITHDRAWAL_REQUESTS, request_id)) for i, request_id in keys
+        ]
+        for (i, request_id), data in zip(keys, multicall(client, block_tag, calls), strict=True):
+            queued[i][request_id] = decode_withdrawal_request(request_id, data).queued
+            probes[i] += 1
+
+    while any(low < high for low, high in bounds):
+        wanted = []
+        for low, high in bounds:
+            if high - low <= probes_per_round:
+                wanted.append(list(range(low, high)))
+            else:
+                step = (high - low) / (probes_per_round + 1)
+                wanted.append(sorted({low + int(step * j) for j in range(1, probes_per_round + 1)}))
+        probe(wanted)
+        rounds += 1
+
+        for i, ids in enumerate(wanted):
+            claimable = arms[i][1].claimable_frontier
+            for request_id in ids:
+                if queued[i][request_id] <= claimable:
+                    bounds[i][0] = max(bounds[i][0], request_id + 1)
+                else:
+                    bounds[i][1] = min(bounds[i][1], request_id)
+
+    # Read the last of the next requests past the frontier unless the search already did.
+    last_ids = [
+        min(frontier_id + next_count, snapshot.next_withdrawal_index) - 1
+        for (frontier_id, _), (_, snapshot) in zip(bounds, arms, strict=True)
+    ]
+    unread = [
+        [last_id] if last_id >= frontier_id and last_id not in queued[i] else []
+        for i, ((frontier_id, _), last_id) in enumerate(zip(bounds, last_ids, strict=True))
+    ]
+    if any(unread):
+        probe(unread)
+        rounds += 1
+
+    frontiers = []
+    for i, ((frontier_id, _), (_, snapshot)) in enumerate(zip(bounds, arms, strict=True)):
+        count = max(0, last_ids[i] + 1 - frontier_id)
+        next_queued = queued[i][last_ids[i]] if count else snapshot.claimable_frontier
+        frontiers.append(
+            Frontier(
+                frontier_id=frontier_id,
+                next_count=count,
+                next_queued=next_queued,
+                liquidity_needed=max(0, next_queued - snapshot.claimable_frontier),
+                probes=probes[i],
+                rounds=rounds,
+            )
+        )
+    return frontiers
+
+
+class ScanState:
+    """On-disk record of the withdrawal requests seen for one ARM on one chain.
+
+    A claimed request never becomes unclaimed again, so claimed entries read at or
+    before the pinned block are served from here instead of being fetched. Only
+    requests read at least LOG_REORG_DEPTH blocks below the pinned block are kept,
+    so a claim that is reorged away is never served. A state with no path is kept
+    in memory only.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path | None, chain_id: int, arm: str) -> None:
+        self.path = path
+        self.chain_id = chain_id
+        self.arm = arm
+        # request id -> (request, block number it was read at)
+        self.entries: dict[int, tuple[WithdrawalRequest, int]] = {}
+        # Ids seen claimed above the safe block and not kept yet.
+        self.unconfirmed: set[int] = set()
+
+    @classmethod
+    def load(cls, state_dir: Path, chain_id: int, arm: str) -> ScanState:
+        state = cls(state_dir / f"{chain_id}-{arm}.json", chain_id, arm)
+        if not state.path.exists():
+            return state
+
+        payload = json.loads(state.path.read_text())
+        if payload.get("version") != cls.VERSION or payload.get("chain_id") != chain_id or payload.get("arm") != arm:
+            return state
+
+        for raw_id, entry in payload["requests"].items():
+            withdrawer, claimed, claim_timestamp, assets, queued, shares, read_block = entry
+            request_id = int(raw_id)
+            request = WithdrawalRequest(
+                request_id=request_id,
+                withdrawer=withdrawer,
+                claimed=claimed,
+                claim_timestamp=claim_timestamp,
+                assets=int(assets),
+                queued=int(queued),
+                shares=None if shares is None else int(shares),
+                queue_units="assets" if shares is None else "shares",
+            )
+            state.entries[request_id] = (request, read_block)
+        return state
+
+    def claimed_at(self, request_id: int, block_number: int) -> WithdrawalRequest | None:
+        entry = self.entries.get(request_id)
+        if entry is None:
+            return None
+        request, read_block = entry
+        if not request.claimed or read_block > block_number:
+            return None
+        return request
+
+    def split(
+        self,
+        start_id: int,
+        end_id: int,
+        block_number: int,
+    ) -> tuple[dict[int, WithdrawalRequest], list[int]]:
+        """Return the claimed requests that can be reused and the ids that must be fetched."""
+        cached: dict[int, WithdrawalRequest] = {}
+        missing: list[int] = []
+        for request_id in range(start_id, end_id):
+            request = self.claimed_at(request_id, block_number)
+            if request is None:
+                missing.append(request_id)
+            else:
+                cached[request_id] = request
+        return cached, missing
+
+    def update(
+        self, requests: Iterable[WithdrawalRequest], block_number: int, safe_block: int | None = None
+    ) -> None:
+        """Keep the requests read at block_number.
+
+        Read above safe_block, a claim could still be reorged away, so the request is
+        only marked for confirm() to re-read at the safe block.
+        """
+        if safe_block is not None and block_number > safe_block:
+            self.unconfirmed.update(
+                request.request_id
+                for request in requests
+                if request.claimed and self.claimed_at(request.request_id, block_number) is None
+            )
+            return
+        for request in requests:
+            previous = self.entries.get(request.request_id)
+            if previous is None or previous[1] <= block_number:
+                self.entries[request.request_id] = (request, block_number)
+
+    def confirm(self, client: RpcClient, safe_block: int, batch_size: int | BatchSizer) -> None:
+        """Re-read the unconfirmed claims at safe_block and keep those already claimed there.
+
+        Requests that fail to read, or are not claimed yet at safe_block, are read
+        again by the next scan.
+        """
+        size = batch_size.size if isinstance(batch_size, BatchSizer) else batch_size
+        request_ids = sorted(self.unconfirmed)
+        self.unconfirmed.clear()
+        for start in range(0, len(request_ids), size):
+            keys = [(self.arm, request_id) for request_id in request_ids[start : start + size]]
+            try:
+                (outcome,) = read_request_batches(client, hex(safe_block), [keys])
+            except RuntimeError:
+                return
+            if not isinstance(outcome, Exception):
+                self.update(
+                    (request for request in outcome if isinstance(request, WithdrawalRequest) and request.claimed),
+                    safe_block,
+                )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        payload = {
+            "version": self.VERSION,
+            "chain_id": self.chain_id,
+            "arm": self.arm,
+            "requests": {
+                str(request_id): [
+                    request.withdrawer,
+                    request.claimed,
+                    request.claim_timestamp,
+                    str(request.assets),
+                    str(request.queued),
+                    None if request.shares is None else str(request.shares),
+                    read_block,
+                ]
+                for request_id, (request, read_block) in sorted(self.entries.items())
+            },
+        }
+        write_file_atomically(self.path, json.dumps(payload, separators=(",", ":")))
+
+
+def fetch_requests_incremental(
+    client: RpcClient,
+    state: ScanState,
+    block_tag: str,
+    block_number: int,
+    start_id: int,
+    end_id: int,
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> tuple[list[WithdrawalRequest], int]:
+    cached, missing = state.split(start_id, end_id, block_number)
+    fetched = fetch_request_ids(client, state.arm, block_tag, missing, batch_size, concurrency, calls_per_post)
+    safe_block = max(0, block_number - LOG_REORG_DEPTH)
+    state.update(fetched, block_number, safe_block)
+    state.confirm(client, safe_block, batch_size)
+    cached.update((request.request_id, request) for request in fetched)
+    return [cached[request_id] for request_id in range(start_id, end_id)], len(missing)
+
+
+def fetch_logs(
+    client: RpcClient,
+    address: str,
+    topics: list[Any],
+    from_block: int,
+    to_block: int,
+    chunk_size: int = DEFAULT_LOG_CHUNK,
+    ranges_per_post: int = 4,
+) -> tuple[list[dict[str, Any]], int]:
+    """Read logs for [from_block, to_block] in block order.
+
+    Ranges are sent several per POST. A range the provider refuses halves the
+    chunk size and is retried; after a fully successful POST the size moves up,
+    bisecting between the largest accepted and smallest refused range.
+    Returns the logs and the chunk size reached.
+    """
+    logs: list[dict[str, Any]] = []
+    accepted = 0
+    refused = MAX_LOG_CHUNK + 1
+    cursor = from_block
+    while cursor <= to_block:
+        ranges = []
+        start = cursor
+        while start <= to_block and len(ranges) < ranges_per_post:
+            end = min(start + chunk_size - 1, to_block)
+            ranges.append((start, end))
+            start = end + 1
+
+        results = client.batch(
+            [
+                ("eth_getLogs", [{"address": address, "topics": topics, "fromBlock": hex(start), "toBlock": hex(end)}])
+                for start, end in ranges
+            ],
+            raise_errors=False,
+        )
+        for (start, end), result in zip(ranges, results, strict=True):
+            if isinstance(result, Exception):
+                if end == start:
+                    raise result
+                refused = min(refused, end - start + 1)
+                chunk_size = max(1, (end - start + 1) // 2)
+                break
+            logs.extend(log for log in result if not log.get("removed"))
+            accepted = max(accepted, end - start + 1)
+            cursor = end + 1
+        else:
+            if refused > MAX_LOG_CHUNK:
+                chunk_size = min(MAX_LOG_CHUNK, chunk_size * 2)
+            else:
+                chunk_size = max(accepted, (accepted + refused) // 2)
+
+    return logs, chunk_size
+
+
+class LogIndex:
+    """Open withdrawal request ids for one ARM built from RedeemRequested and RedeemClaimed logs."""
+
+    VERSION = 1
+
+    def __init__(self, path: Path | None, chain_id: int, arm: str, from_block: int) -> None:
+        self.path = path
+        self.chain_id = chain_id
+        self.arm = arm
+        self.from_block = from_block
+        self.synced_block = from_block - 1
+        self.requested_count = 0
+        self.chunk_size = DEFAULT_LOG_CHUNK
+        # request id -> withdrawer for requests without a claim log yet
+        self.open: dict[int, str] = {}
+
+    @classmethod
+    def load(cls, state_dir: Path | None, chain_id: int, arm: str, from_block: int) -> LogIndex:
+        path = state_dir / f"{chain_id}-{arm}-logs.json" if state_dir else None
+        index = cls(path, chain_id, arm, from_block)
+        if path is None or not path.exists():
+            return index
+
+        payload = json.loads(path.read_text())
+        if (
+            payload.get("version") != cls.VERSION
+            or payload.get("chain_id") != chain_id
+            or payload.get("arm") != arm
+            or payload.get("from_block") != from_block
+        ):
+            return index
+
+        index.synced_block = payload["synced_block"]
+        index.requested_count = payload["requested_count"]
+        index.chunk_size = payload["chunk_size"]
+        index.open = {int(request_id): withdrawer for request_id, withdrawer in payload["open"].items()}
+        return index
+
+    def copy(self) -> LogIndex:
+        index = LogIndex(None, self.chain_id, self.arm, self.from_block)
+        index.synced_block = self.synced_block
+        index.requested_count = self.requested_count
+        index.chunk_size = self.chunk_size
+        index.open = dict(self.open)
+        return index
+
+    def apply(self, logs: Iterable[dict[str, Any]]) -> None:
+        for log in logs:
+            topics = log["topics"]
+            withdrawer = "0x" + strip_0x(topics[1])[-40:]
+            request_id = int(topics[2], 16)
+            if topics[0] == TOPIC_REDEEM_REQUESTED:
+                self.open[request_id] = withdrawer
+                self.requested_count += 1
+            elif topics[0] == TOPIC_REDEEM_CLAIMED:
+                self.open.pop(request_id, None)
+
+    def sync(self, client: RpcClient, to_block: int) -> None:
+        if to_block <= self.synced_block:
+            return
+        logs, self.chunk_size = fetch_logs(
+            client,
+            self.arm,
+            [[TOPIC_REDEEM_REQUESTED, TOPIC_REDEEM_CLAIMED]],
+            self.synced_block + 1,
+            to_block,
+            self.chunk_size,
+        )
+        self.apply(logs)
+        self.synced_block = to_block
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        payload = {
+            "version": self.VERSION,
+            "chain_id": self.chain_id,
+            "arm": self.arm,
+            "from_block": self.from_block,
+            "synced_block": self.synced_block,
+            "requested_count": self.requested_count,
+            "chunk_size": self.chunk_size,
+            "open": {str(request_id): withdrawer for request_id, withdrawer in sorted(self.open.items())},
+        }
+        write_file_atomically(self.path, json.dumps(payload, separators=(",", ":")))
+
+
+def open_ids_from_logs(
+    client: RpcClient,
+    state_dir: Path | None,
+    chain_id: int,
+    arm: str,
+    from_block: int,
+    snapshot: Snapshot,
+) -> list[int]:
+    """Sync the log index up to the pinned block and return the ids it still sees as open."""
+    index = LogIndex.load(state_dir, chain_id, arm, from_block)
+    if index.synced_block > snapshot.block_number:
+        # The persisted index is ahead of a historical --block; rebuild it in memory.
+        index = LogIndex(None, chain_id, arm, from_block)
+
+    index.sync(client, max(index.synced_block, snapshot.block_number - LOG_REORG_DEPTH))
+    index.save()
+    pinned = index.copy()
+    pinned.sync(client, snapshot.block_number)
+
+    if pinned.requested_count != snapshot.next_withdrawal_index:
+        raise RuntimeError(
+            f"log index saw {pinned.requested_count} RedeemRequested events but nextWithdrawalIndex is "
+            f"{snapshot.next_withdrawal_index}. Use a --from-block at or before the ARM deployment."
+        )
+    return sorted(pinned.open)
+
+
+def withdrawer_request_ids(
+    client: RpcClient,
+    arm: str,
+    withdrawers: list[str],
+    from_block: int,
+    to_block: int,
+    include_claimed: bool = False,
+) -> list[int]:
+    """Find the withdrawers' request ids from logs filtered on the indexed withdrawer topic.
+
+    Ids with a RedeemClaimed log are left out unless include_claimed is set.
+    """
+    topics = [
+        [TOPIC_REDEEM_REQUESTED, TOPIC_REDEEM_CLAIMED],
+        ["0x" + address_word(withdrawer).hex() for withdrawer in withdrawers],
+    ]
+    logs, _ = fetch_logs(client, arm, topics, from_block, to_block)
+    requested: set[int] = set()
+    claimed: set[int] = set()
+    for log in logs:
+        request_id = int(log["topics"][2], 16)
+        if log["topics"][0] == TOPIC_REDEEM_REQUESTED:
+            requested.add(request_id)
+        elif log["topics"][0] == TOPIC_REDEEM_CLAIMED:
+            claimed.add(request_id)
+    return sorted(requested if include_claimed else requested - claimed)
+
+
+class ChunkReader:
+    """Splits a stream of chunks into consecutive runs of an exact number of items."""
+
+    def __init__(self, chunks: Iterable[list[Any]]) -> None:
+        self._chunks = iter(chunks)
+        self._leftover: list[Any] = []
+
+    def take(self, count: int, dropped: Callable[[], int] | None = None) -> Iterator[list[Any]]:
+        """Yield the next count items. dropped() counts those of them the stream left out.
+
+        It is read again after every chunk, because a chunk is only yielded once its
+        own items have been dropped.
+        """
+        while True:
+            remaining = count - (dropped() if dropped else 0)
+            if remaining <= 0:
+                return
+            if not self._leftover:
+                self._leftover = next(self._chunks)
+                continue
+            chunk, self._leftover = self._leftover[:remaining], self._leftover[remaining:]
+            count -= len(chunk)
+            yield chunk
+
+
+def merge_cached(
+    cached: dict[int, WithdrawalRequest],
+    chunks: Iterable[list[WithdrawalRequest]],
+) -> Iterator[list[WithdrawalRequest]]:
+    """Interleave cached requests into fetched chunks so the stream stays in request id order."""
+    cached_ids = sorted(cached)
+    position = 0
+    for chunk in chunks:
+        merged: list[WithdrawalRequest] = []
+        for request in chunk:
+            while position < len(cached_ids) and cached_ids[position] < request.request_id:
+                merged.append(cached[cached_ids[position]])
+                position += 1
+            merged.append(request)
+        yield merged
+    if position < len(cached_ids):
+        yield [cached[request_id] for request_id in cached_ids[position:]]
+
+
+@dataclass
+class QueueCounts:
+    open_count: int = 0
+    claimable_now_count: int = 0
+    zero_share_open_count: int = 0
+
+    def add(self, request: WithdrawalRequest, snapshot: Snapshot) -> str:
+        """Count the request and return its status, so callers classify each request once."""
+        status = request_status(request, snapshot)
+        if status == "claimed":
+            return status
+        self.open_count += 1
+        if request.shares == 0:
+            self.zero_share_open_count += 1
+        elif status == "claimable_now":
+            self.claimable_now_count += 1
+        return status
+
+
+@dataclass
+class WithdrawerTotals:
+    request_count: int = 0
+    open_count: int = 0
+    open_assets: int = 0
+    claimable_now_count: int = 0
+    claimable_now_assets: int = 0
+
+    def add(self, request: WithdrawalRequest, status: str) -> None:
+        self.request_count += 1
+        if status == "claimed":
+            return
+        self.open_count += 1
+        self.open_assets += request.assets
+        if status == "claimable_now":
+            self.claimable_now_count += 1
+            self.claimable_now_assets += request.assets
+
+    def to_dict(self, withdrawer: str, decimals: int) -> dict[str, Any]:
+        return {
+            "withdrawer": withdrawer,
+            "request_count": self.request_count,
+            "open_count": self.open_count,
+            "open_assets_raw": str(self.open_assets),
+            "open_assets": format_units(self.open_assets, decimals),
+            "claimable_now_count": self.claimable_now_count,
+            "claimable_now_assets_raw": str(self.claimable_now_assets),
+            "claimable_now_assets": format_units(self.claimable_now_assets, decimals),
+        }
+
+
+REQUEST_STATUSES = ("claimed", "unclaimed_zero_shares", "waiting_delay", "waiting_liquidity", "claimable_now")
+
+
+class RequestStore:
+    """Requests kept for output, packed into flat columns rather than one object per request.
+
+    Ids and timestamps live in arrays, statuses and flags in byte arrays, and
+    withdrawers and amounts in packed byte columns. Request objects and formatted
+    rows are only rebuilt, a chunk at a time, while the output is written.
+    """
+
+    __slots__ = ("request_ids", "claim_timestamps", "statuses", "flags", "withdrawers", "amounts")
+
+    def __init__(self) -> None:
+        self.request_ids = array("Q")
+        self.claim_timestamps = array("Q")
+        self.statuses = bytearray()
+        # bit 0: claimed, bit 1: the request has shares
+        self.flags = bytearray()
+        self.withdrawers = bytearray()
+        # assets, queued and shares as three 32-byte words per request
+        self.amounts = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.request_ids)
+
+    def append(self, request: WithdrawalRequest, status: str) -> None:
+        self.request_ids.append(request.request_id)
+        self.claim_timestamps.append(request.claim_timestamp)
+        self.statuses.append(REQUEST_STATUSES.index(status))
+        self.flags.append(request.claimed | (request.shares is not None) << 1)
+        self.withdrawers += bytes.fromhex(strip_0x(request.withdrawer))
+        self.amounts += word(request.assets) + word(request.queued) + word(request.shares or 0)
+
+    def items(self) -> Iterator[tuple[WithdrawalRequest, str]]:
+        withdrawers = memoryview(self.withdrawers)
+        amounts = memoryview(self.amounts)
+        for i, request_id in enumerate(self.request_ids):
+            flags = self.flags[i]
+            offset = 96 * i
+            shares = int.from_bytes(amounts[offset + 64 : offset + 96], "big") if flags & 2 else None
+            request = WithdrawalRequest(
+                request_id,
+                "0x" + withdrawers[20 * i : 20 * i + 20].hex(),
+                bool(flags & 1),
+                self.claim_timestamps[i],
+                int.from_bytes(amounts[offset : offset + 32], "big"),
+                int.from_bytes(amounts[offset + 32 : offset + 64], "big"),
+                shares,
+                "assets" if shares is None else "shares",
+            )
+            yield request, REQUEST_STATUSES[self.statuses[i]]
+
+    def rows(self, snapshot: Snapshot, decimals: int, chunk_size: int = 1000) -> Iterator[dict[str, Any]]:
+        items = self.items()
+        while chunk := list(islice(items, chunk_size)):
+            yield from build_rows(
+                [request for request, _ in chunk], snapshot, decimals, [status for _, status in chunk]
+            )
+
+
+def iso_timestamp(timestamp: int | None) -> str:
+    if timestamp is None:
+        return ""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def format_units(value: int, decimals: int) -> str:
+    scale = 10**decimals
+    whole = value // scale
+    fraction = value % scale
+    if fraction == 0:
+        return str(whole)
+
+    fraction_text = str(fraction).rjust(decimals, "0").rstrip("0")
+    return f"{whole}.{fraction_text}"
+
+
+def request_status(request: WithdrawalRequest, snapshot: Snapshot) -> str:
+    if request.claimed:
+        return "claimed"
+    if request.shares == 0:
+        return "unclaimed_zero_shares"
+    if request.claim_timestamp > snapshot.block_timestamp:
+        return "waiting_delay"
+    if request.queued > snapshot.claimable_frontier:
+        return "waiting_liquidity"
+    return "claimable_now"
+
+
+def build_rows(
+    requests: list[WithdrawalRequest],
+    snapshot: Snapshot,
+    decimals: int,
+    statuses: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    with PROFILER.timed("build_rows", len(requests)):
+        return _build_rows(requests, snapshot, decimals, statuses)
+
+
+def _build_rows(
+    requests: list[WithdrawalRequest],
+    snapshot: Snapshot,
+    decimals: int,
+    statuses: list[str] | None,
+) -> list[dict[str, Any]]:
+    if statuses is None:
+        statuses = [request_status(request, snapshot) for request in requests]
+    rows: list[dict[str, Any]] = []
+    for request, status in zip(requests, statuses, strict=True):
+        requested_at = None
+        if snapshot.claim_delay <= request.claim_timestamp:
+            requested_at = request.claim_timestamp - snapshot.claim_delay
+
+        shares_raw = "" if request.shares is None else str(request.shares)
+        shares = "" if request.shares is None else format_units(request.shares, decimals)
+        rows.append(
+            {
+                "request_id": request.request_id,
+                "withdrawer": request.withdrawer,
+                "claimed": request.claimed,
+                "status": status,
+                "claimable_now": status == "claimable_now",
+                "zero_shares": request.shares == 0,
+                "queue_units": request.queue_units,
+                "requested_at_utc": iso_timestamp(requested_at),
+                "claimable_at_utc": iso_timestamp(request.claim_timestamp),
+                "assets_raw": str(request.assets),
+                "assets": format_units(request.assets, decimals),
+                "queued_raw": str(request.queued),
+                "queued": format_units(request.queued, decimals),
+                "shares_raw": shares_raw,
+                "shares": shares,
+            }
+        )
+    return rows
+
+
+@dataclass
+class QueueReport:
+    """One ARM's redeem queue at a pinned block, as returned by scan_queues."""
+
+    target: ArmTarget
+    block_tag: str
+    chain_id: int
+    snapshot: Snapshot
+    counts: QueueCounts
+    # Counts and asset totals over every request, claimed ones included.
+    totals: WithdrawerTotals
+    # The selected requests in id order, with the status of each.
+    requests: list[WithdrawalRequest]
+    statuses: list[str]
+
+    def items(self) -> Iterator[tuple[WithdrawalRequest, str]]:
+        return zip(self.requests, self.statuses, strict=True)
+
+    def rows(self) -> list[dict[str, Any]]:
+        """The requests formatted like the rows of the json and csv output."""
+        return build_rows(self.requests, self.snapshot, self.target.decimals, self.statuses)
+
+
+@dataclass
+class QueuePlan:
+    """The requests of one ARM a scan reads: ids in [start_id, end_id) at the snapshot's block."""
+
+    target: ArmTarget
+    snapshot: Snapshot
+    start_id: int
+    end_id: int
+    # Ids to fetch, in order. cached holds the requests served from a ScanState instead.
+    missing: Sequence[int]
+    cached: dict[int, WithdrawalRequest] = field(default_factory=dict)
+    state: ScanState | None = None
+    frontier: Frontier | None = None
+
+
+def plan_queue(
+    target: ArmTarget,
+    snapshot: Snapshot,
+    start_id: int,
+    end_id: int,
+    ids: Iterable[int] | None = None,
+    state: ScanState | None = None,
+    frontier: Frontier | None = None,
+) -> QueuePlan:
+    """Plan a scan of the ids in [start_id, end_id), or only of those in ids if given.
+
+    With a state, the claimed requests it holds are served from it rather than fetched.
+    """
+    if ids is not None:
+        missing = [request_id for request_id in ids if start_id <= request_id < end_id]
+        return QueuePlan(target, snapshot, start_id, end_id, missing, frontier=frontier)
+    if state is not None:
+        cached, missing = state.split(start_id, end_id, snapshot.block_number)
+        return QueuePlan(target, snapshot, start_id, end_id, missing, cached, state, frontier)
+    return QueuePlan(target, snapshot, start_id, end_id, range(start_id, end_id), frontier=frontier)
+
+
+class QueueScan:
+    """Classifies the requests of one planned ARM while scan_plans() reads them.
+
+    counts and totals cover every request read, claimed ones included, and are
+    complete once chunks() is exhausted. With withdrawers, by_withdrawer keeps
+    totals per withdrawer, starting with those given.
+    """
+
+    def __init__(
+        self,
+        plan: QueuePlan,
+        chunks: Iterable[list[WithdrawalRequest]],
+        include_claimed: bool,
+        withdrawers: list[str] | None,
+        client: RpcClient | None = None,
+        batch_size: int | BatchSizer = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.plan = plan
+        self.counts = QueueCounts()
+        self.totals = WithdrawerTotals()
+        self.by_withdrawer = {withdrawer: WithdrawerTotals() for withdrawer in withdrawers} if withdrawers else None
+        self._chunks = chunks
+        self._include_claimed = include_claimed
+        self._client = client
+        self._batch_size = batch_size
+
+    def chunks(self) -> Iterator[tuple[list[WithdrawalRequest], list[str]]]:
+        """Yield the selected requests of each chunk, in id order, with their statuses."""
+        snapshot, state = self.plan.snapshot, self.plan.state
+        safe_block = max(0, snapshot.block_number - LOG_REORG_DEPTH)
+        for chunk in self._chunks:
+            if state is not None:
+                state.update(chunk, snapshot.block_number, safe_block)
+            selected: list[WithdrawalRequest] = []
+            statuses: list[str] = []
+            for request in chunk:
+                status = self.counts.add(request, snapshot)
+                self.totals.add(request, status)
+                if self.by_withdrawer is not None:
+                    self.by_withdrawer.setdefault(request.withdrawer, WithdrawerTotals()).add(request, status)
+                if self._include_claimed or status != "claimed":
+                    selected.append(request)
+                    statuses.append(status)
+            yield selected, statuses
+        if state is not None:
+            if self._client is not None:
+                state.confirm(self._client, safe_block, self._batch_size)
+            state.save()
+
+
+def scan_plans(
+    client: RpcClient,
+    block_tag: str,
+    plans: list[QueuePlan],
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+    include_claimed: bool = False,
+    withdrawers: list[str] | None = None,
+) -> Iterator[QueueScan]:
+    """Read the planned requests of all ARMs in shared aggregate3 batches and yield a QueueScan per plan.
+
+    Each scan's chunks() must be exhausted before the next scan is taken.
+    """
+    keys = ((plan.target.address, request_id) for plan in plans for request_id in plan.missing)
+    reader = ChunkReader(iter_request_keys(client, block_tag, keys, batch_size, concurrency, calls_per_post))
+    failures = client.failures
+    for plan in plans:
+        dropped = (lambda arm=plan.target.address: failures.count(arm)) if failures is not None else None
+        chunks = merge_cached(plan.cached, reader.take(len(plan.missing), dropped))
+        yield QueueScan(plan, chunks, include_claimed, withdrawers, client, batch_size)
+
+
+def scan_queues(
+    client: RpcClient,
+    targets: list[ArmTarget],
+    block_arg: str,
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+    include_claimed: bool = False,
+    states: dict[str, ScanState] | None = None,
+) -> list[QueueReport]:
+    """Read and classify every request of each ARM at one pinned block.
+
+    Requests of all ARMs share aggregate3 batches. states maps ARM addresses to
+    their ScanState: claimed requests found there are not fetched again, and the
+    requests read are added to it and saved.
+    """
+    block_tag, snapshots, chain_id = fetch_pinned_snapshots(client, [target.address for target in targets], block_arg)
+    plans = [
+        plan_queue(
+            target,
+            snapshot,
+            0,
+            snapshot.next_withdrawal_index,
+            state=states.get(target.address) if states is not None else None,
+        )
+        for target, snapshot in zip(targets, snapshots, strict=True)
+    ]
+    reports = []
+    for scan in scan_plans(client, block_tag, plans, batch_size, concurrency, calls_per_post, include_claimed):
+        report = QueueReport(
+            scan.plan.target, block_tag, chain_id, scan.plan.snapshot, scan.counts, scan.totals, [], []
+        )
+        for requests, statuses in scan.chunks():
+            report.requests.extend(requests)
+            report.statuses.extend(statuses)
+        reports.append(report)
+    return reports
+
+
+class QueueWatcher:
+    """Follows new blocks and keeps the open requests of one ARM current.
+
+    Each poll reads the redeem logs since the last processed block and re-reads
+    only the ids they touch. If the last processed block was reorged out, the
+    watcher rolls back LOG_REORG_DEPTH blocks and re-reads every open id plus
+    every id claimed since then.
+    """
+
+    def __init__(
+        self,
+        client: RpcClient,
+        arm: str,
+        decimals: int,
+        batch_size: int | BatchSizer,
+        concurrency: int = 1,
+        calls_per_post: int = 1,
+    ) -> None:
+        self.client = client
+        self.arm = arm
+        self.decimals = decimals
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.calls_per_post = calls_per_post
+        self.log_chunk = DEFAULT_LOG_CHUNK
+        self.snapshot: Snapshot | None = None
+        self.open: dict[int, WithdrawalRequest] = {}
+        self.block_hash = ""
+        # block number -> ids claimed in that block, kept for LOG_REORG_DEPTH blocks
+        self.recent_claims: dict[int, list[int]] = {}
+
+    def start(self, snapshot: Snapshot, requests: Iterable[WithdrawalRequest]) -> None:
+        block = self.client.call("eth_getBlockByNumber", [hex(snapshot.block_number), False])
+        self.snapshot = snapshot
+        self.block_hash = block["hash"]
+        self.open = {request.request_id: request for request in requests if not request.claimed}
+
+    def poll(self) -> dict[str, Any] | None:
+        """Process the chain up to the current head. Returns None if there is no new block."""
+        assert self.snapshot is not None, "start() must be called first"
+        previous = self.snapshot
+        head = int(self.client.call("eth_blockNumber", []), 16)
+        if head <= previous.block_number:
+            return None
+
+        calls = snapshot_calls(self.arm)
+        head_block, last_block, raw_result = self.client.batch(
+            [
+                ("eth_getBlockByNumber", [hex(head), False]),
+                ("eth_getBlockByNumber", [hex(previous.block_number), False]),
+                ("eth_call", multicall_params(calls, hex(head))),
+            ]
+        )
+        results = check_multicall_results(calls, raw_result)
+        snapshot = Snapshot(
+            block_number=head,
+            block_timestamp=int(head_block["timestamp"], 16),
+            next_withdrawal_index=decode_uint256(results[0]),
+            claimable_frontier=decode_uint256(results[1]),
+            claim_delay=decode_uint256(results[2]),
+        )
+
+        reorged = last_block is None or last_block["hash"] != self.block_hash
+        from_block = previous.block_number + 1
+        touched: set[int] = set()
+        if reorged:
+            from_block = max(0, previous.block_number - LOG_REORG_DEPTH) + 1
+            touched.update(self.open)
+            for block_number, ids in self.recent_claims.items():
+                if block_number >= from_block:
+                    touched.update(ids)
+
+        logs, self.log_chunk = fetch_logs(
+            self.client,
+            self.arm,
+            [[TOPIC_REDEEM_REQUESTED, TOPIC_REDEEM_CLAIMED]],
+            from_block,
+            head,
+            self.log_chunk,
+        )
+        for log in logs:
+            request_id = int(log["topics"][2], 16)
+            touched.add(request_id)
+            if log["topics"][0] == TOPIC_REDEEM_CLAIMED:
+                self.recent_claims.setdefault(int(log["blockNumber"], 16), []).append(request_id)
+        self.recent_claims = {
+            block_number: ids
+            for block_number, ids in self.recent_claims.items()
+            if block_number > head - LOG_REORG_DEPTH
+        }
+
+        fetched = fetch_request_ids(
+            self.client,
+            self.arm,
+            hex(head),
+            sorted(request_id for request_id in touched if request_id < snapshot.next_withdrawal_index),
+            self.batch_size,
+            self.concurrency,
+            self.calls_per_post,
+        )
+
+        old_open = self.open
+        new_open = {
+            request_id: request
+            for request_id, request in old_open.items()
+            if request_id < snapshot.next_withdrawal_index
+        }
+        new_requests = []
+        claimed_ids = []
+        for request in fetched:
+            is_new = request.request_id >= previous.next_withdrawal_index
+            if is_new:
+                new_requests.append(request)
+            if request.claimed:
+                if new_open.pop(request.request_id, None) is not None or is_new:
+                    claimed_ids.append(request.request_id)
+            else:
+                new_open[request.request_id] = request
+
+        became_claimable = [
+            request_id
+            for request_id, request in new_open.items()
+            if request_status(request, snapshot) == "claimable_now"
+            and (request_id not in old_open or request_status(old_open[request_id], previous) != "claimable_now")
+        ]
+
+        self.snapshot = snapshot
+        self.block_hash = head_block["hash"]
+        self.open = new_open
+
+        diff: dict[str, Any] = {
+            "type": "diff",
+            "from_block": previous.block_number,
+            "block_number": head,
+            "block_timestamp_utc": iso_timestamp(snapshot.block_timestamp),
+            "new_requests": build_rows(new_requests, snapshot, self.decimals),
+            "became_claimable": sorted(became_claimable),
+            "claimed": sorted(claimed_ids),
+            "open_count": len(new_open),
+        }
+        if reorged:
+            diff["reorg"] = {
+                "rolled_back_to": from_block - 1,
+                "dropped": sorted(set(old_open) - set(new_open) - set(claimed_ids)),
+            }
+        if snapshot.claimable_frontier != previous.claimable_frontier:
+            diff["claimable_frontier"] = {
+                "from": format_units(previous.claimable_frontier, self.decimals),
+                "to": format_units(snapshot.claimable_frontier, self.decimals),
+            }
+        if snapshot.next_withdrawal_index != previous.next_withdrawal_index:
+            diff["next_withdrawal_index"] = {
+                "from": previous.next_withdrawal_index,
+                "to": snapshot.next_withdrawal_index,
+            }
+        return diff
+
+
+def parse_block_range(value: str) -> range:
+    """Parse START:END:STEP into the sampled block numbers, END included."""
+    parts = value.split(":")
+    if len(parts) != 3:
+        raise ValueError("--block-range must be START:END:STEP")
+    start, end, step = (int(part, 0) for part in parts)
+    if start < 0 or end < start or step <= 0:
+        raise ValueError("--block-range needs 0 <= START <= END and STEP > 0")
+    return range(start, end + 1, step)
+
+
+def backfill_series(
+    client: RpcClient,
+    arm: str,
+    decimals: int,
+    blocks: range,
+    first_snapshot: Snapshot,
+    open_requests: Iterable[WithdrawalRequest],
+    batch_size: int | BatchSizer,
+    concurrency: int = 1,
+    calls_per_post: int = 1,
+) -> Iterator[dict[str, Any]]:
+    """Yield queue metrics at every sampled block, starting from the open requests at the first one.
+
+    Each sample is derived from the previous one: RedeemRequested logs add
+    requests and RedeemClaimed logs remove them. The logs for the whole range
+    are read once, new requests are read once at the last block (their fields
+    never change apart from claimed, which the logs track), and only the
+    pinned snapshot is read per sample, concurrency samples at a time.
+    Claim times are interpolated between the timestamps of the samples around them.
+    """
+    logs: list[dict[str, Any]] = []
+    if blocks[-1] > blocks[0]:
+        logs, _ = fetch_logs(
+            client, arm, [[TOPIC_REDEEM_REQUESTED, TOPIC_REDEEM_CLAIMED]], blocks[0] + 1, blocks[-1]
+        )
+    events = [(int(log["blockNumber"], 16), log["topics"][0], int(log["topics"][2], 16)) for log in logs]
+
+    new_ids = [request_id for _, topic, request_id in events if topic == TOPIC_REDEEM_REQUESTED]
+    keys = ((arm, request_id) for request_id in new_ids)
+    new_requests = {
+        request.request_id: replace(request, claimed=False)
+        for chunk in iter_request_keys(client, hex(blocks[-1]), keys, batch_size, concurrency, calls_per_post)
+        for request in chunk
+    }
+
+    def read_snapshot(block_number: int) -> Snapshot:
+        return fetch_pinned_snapshots(client, [arm], str(block_number))[1][0]
+
+    open_by_id = {request.request_id: request for request in open_requests if not request.claimed}
+    requested_count = first_snapshot.next_withdrawal_index
+    position = 0
+    previous: Snapshot | None = None
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for snapshot in chain([first_snapshot], executor.map(read_snapshot, blocks[1:])):
+            claim_times: list[int] = []
+            while position < len(events) and events[position][0] <= snapshot.block_number:
+                block_number, topic, request_id = events[position]
+                position += 1
+                if topic == TOPIC_REDEEM_REQUESTED:
+                    open_by_id[request_id] = new_requests[request_id]
+                    requested_count += 1
+                    continue
+                request = open_by_id.pop(request_id, None)
+                if request is not None and previous is not None:
+                    elapsed = snapshot.block_timestamp - previous.block_timestamp
+                    claimed_at = previous.block_timestamp + elapsed * (block_number - previous.block_number) // (
+                        snapshot.block_number - previous.block_number
+                    )
+                    claim_times.append(claimed_at - (request.claim_timestamp - snapshot.claim_delay))
+
+            if requested_count != snapshot.next_withdrawal_index:
+                raise RuntimeError(
+                    f"logs saw {requested_count} requests by block {snapshot.block_number} but "
+                    f"nextWithdrawalIndex is {snapshot.next_withdrawal_index}"
+                )
+
+            counts = {"claimable_now": 0, "waiting_liquidity": 0, "waiting_delay": 0}
+            open_assets = 0
+            oldest_requested_at = None
+            for request in open_by_id.values():
+                status = request_status(request, snapshot)
+                if status in counts:
+                    counts[status] += 1
+                open_assets += request.assets
+                requested_at = request.claim_timestamp - snapshot.claim_delay
+                if oldest_requested_at is None or requested_at < oldest_requested_at:
+                    oldest_requested_at = requested_at
+
+            yield {
+                "block_number": snapshot.block_number,
+                "block_timestamp_utc": iso_timestamp(snapshot.block_timestamp),
+                "next_withdrawal_index": snapshot.next_withdrawal_index,
+                "open_count": len(open_by_id),
+                "open_assets": format_units(open_assets, decimals),
+                "claimable_frontier": format_units(snapshot.claimable_frontier, decimals),
+                "claimable_now_count": counts["claimable_now"],
+                "waiting_liquidity_count": counts["waiting_liquidity"],
+                "waiting_delay_count": counts["waiting_delay"],
+                "claimed_count": len(claim_times),
+                "mean_time_to_claim_s": sum(claim_times) // len(claim_times) if claim_times else "",
+                "oldest_open_age_s": (
+                    "" if oldest_requested_at is None else snapshot.block_timestamp - oldest_requested_at
+                ),
+            }
+            previous = snapshot
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,415 @@
+"""Fixed-width binary snapshots of an ARM's redeem queue, and diffs between two of them.
+
+A snapshot file is a HEADER followed by one RECORD per request in id order. All
+integers are big-endian; amounts are 128-bit, the width withdrawalRequests packs
+them in. Statuses are indexes into REQUEST_STATUSES. Files are opened with mmap,
+so reading one costs nothing until its records are looked at, and a diff compares
+raw record bytes, a block of records at a time, without any RPC call.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import Any, Iterator
+
+from .core import (
+    REQUEST_STATUSES,
+    ArmTarget,
+    RequestStore,
+    Snapshot,
+    WithdrawalRequest,
+    format_units,
+    iso_timestamp,
+    write_file_atomically,
+)
+
+SNAPSHOT_MAGIC = b"ARMREDQ\x00"
+SNAPSHOT_VERSION = 1
+# magic, version, record size, decimals, chain id, block number, block timestamp,
+# next withdrawal index, claim delay, record count, ARM address, ARM name, claimable frontier
+HEADER = struct.Struct(">8sHHB3xQQQQQQ20s32s32s12x")
+# request id, withdrawer, flags (bit 0: claimed, bit 1: has shares), status, claim timestamp,
+# assets, queued, shares
+RECORD = struct.Struct(">Q20sBBQ16s16s16s")
+RECORD_ID = struct.Struct(f">Q{RECORD.size - 8}x")
+STATUS_OFFSET = 29
+# Records compared per block before a diff looks at them one by one.
+DIFF_BLOCK = 256
+
+
+def write_snapshot_file(
+    path: str | Path,
+    target: ArmTarget,
+    chain_id: int,
+    snapshot: Snapshot,
+    store: RequestStore,
+) -> None:
+    """Write the requests kept in store, straight from its packed columns."""
+    amounts = bytes(store.amounts)
+    # Every amount is a 32-byte word; its high 16 bytes, quadwords 0 and 1 of 4, must be zero.
+    quads = memoryview(amounts).cast("Q")
+    high_halves = quads[0::4].tobytes() + quads[1::4].tobytes()
+    if high_halves.count(0) != len(high_halves):
+        raise ValueError("an amount is wider than the 128 bits a snapshot record holds")
+    records = bytearray(len(store) * RECORD.size)
+    withdrawers = bytes(store.withdrawers)
+    for i, request_id in enumerate(store.request_ids):
+        offset = 96 * i
+        RECORD.pack_into(
+            records,
+            i * RECORD.size,
+            request_id,
+            withdrawers[20 * i : 20 * i + 20],
+            store.flags[i],
+            store.statuses[i],
+            store.claim_timestamps[i],
+            amounts[offset + 16 : offset + 32],
+            amounts[offset + 48 : offset + 64],
+            amounts[offset + 80 : offset + 96],
+        )
+    header = HEADER.pack(
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_VERSION,
+        RECORD.size,
+        target.decimals,
+        chain_id,
+        snapshot.block_number,
+        snapshot.block_timestamp,
+        snapshot.next_withdrawal_index,
+        snapshot.claim_delay,
+        len(store),
+        bytes.fromhex(target.address[2:]),
+        # Unnamed ARMs are named by their address, which the reader falls back to.
+        # Cut to 32 bytes without splitting a UTF-8 character, which the reader could not decode.
+        (target.name if target.name != target.address else "").encode()[:32].decode("utf-8", "ignore").encode(),
+        snapshot.claimable_frontier.to_bytes(32, "big"),
+    )
+
+    write_file_atomically(Path(path), header, records)
+
+
+class SnapshotFile:
+    """A snapshot file mapped into memory. Records are decoded only when read."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{self.path} is not a redeem snapshot file")
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            record_size,
+            decimals,
+            self.chain_id,
+            block_number,
+            block_timestamp,
+            next_withdrawal_index,
+            claim_delay,
+            self.count,
+            arm,
+            name,
+            claimable_frontier,
+        ) = HEADER.unpack_from(self._map)
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a redeem snapshot file")
+        if version != SNAPSHOT_VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{self.path} has snapshot version {version}; expected {SNAPSHOT_VERSION}")
+        if size != HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{self.path} is truncated: {self.count} records need {self.count * RECORD.size} bytes")
+
+        address = "0x" + arm.hex()
+        self.target = ArmTarget(name.rstrip(b"\0").decode() or address, address, decimals)
+        self.snapshot = Snapshot(
+            block_number=block_number,
+            block_timestamp=block_timestamp,
+            next_withdrawal_index=next_withdrawal_index,
+            claimable_frontier=int.from_bytes(claimable_frontier, "big"),
+            claim_delay=claim_delay,
+        )
+        self.records = memoryview(self._map)[HEADER.size :]
+
+    def __enter__(self) -> SnapshotFile:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        # The memoryview has to be released before the map can close.
+        if getattr(self, "records", None) is not None:
+            self.records.release()
+        self._map.close()
+
+    def record_bytes(self, start: int, stop: int) -> bytes:
+        """Raw bytes of records [start, stop). Comparing these is much faster than comparing memoryviews."""
+        return self._map[HEADER.size + start * RECORD.size : HEADER.size + stop * RECORD.size]
+
+    def request_id(self, index: int) -> int:
+        return int.from_bytes(self.records[index * RECORD.size : index * RECORD.size + 8], "big")
+
+    def request_ids(self) -> list[int]:
+        return [request_id for (request_id,) in RECORD_ID.iter_unpack(self.records)]
+
+    def status(self, index: int) -> str:
+        return REQUEST_STATUSES[self.records[index * RECORD.size + STATUS_OFFSET]]
+
+    def request(self, index: int) -> WithdrawalRequest:
+        request_id, withdrawer, flags, _, claim_timestamp, assets, queued, shares = RECORD.unpack_from(
+            self.records, index * RECORD.size
+        )
+        has_shares = bool(flags & 2)
+        return WithdrawalRequest(
+            request_id,
+            "0x" + withdrawer.hex(),
+            bool(flags & 1),
+            claim_timestamp,
+            int.from_bytes(assets, "big"),
+            int.from_bytes(queued, "big"),
+            int.from_bytes(shares, "big") if has_shares else None,
+            "shares" if has_shares else "assets",
+        )
+
+    def items(self) -> Iterator[tuple[WithdrawalRequest, str]]:
+        for index in range(self.count):
+            yield self.request(index), self.status(index)
+
+    def contiguous(self) -> bool:
+        """Whether the records hold every id from the first to the last; ids are always increasing."""
+        return not self.count or self.request_id(self.count - 1) - self.request_id(0) == self.count - 1
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "name": self.target.name,
+            "arm": self.target.address,
+            "chain_id": self.chain_id,
+            "block_number": self.snapshot.block_number,
+            "block_timestamp_utc": iso_timestamp(self.snapshot.block_timestamp),
+            "next_withdrawal_index": self.snapshot.next_withdrawal_index,
+            "claimable_frontier_raw": str(self.snapshot.claimable_frontier),
+            "claimable_frontier": format_units(self.snapshot.claimable_frontier, self.target.decimals),
+            "request_count": self.count,
+        }
+
+
+@dataclass(frozen=True)
+class RequestChange:
+    request_id: int
+    withdrawer: str
+    # None when the request is missing from that snapshot.
+    old_status: str | None
+    new_status: str | None
+    # 0 when the request is missing from that snapshot.
+    old_assets: int
+    new_assets: int
+
+    @property
+    def assets(self) -> int:
+        return self.new_assets if self.new_status is not None else self.old_assets
+
+    @property
+    def assets_delta(self) -> int:
+        return self.new_assets - self.old_assets
+
+
+@dataclass
+class SnapshotDiff:
+    old: SnapshotFile
+    new: SnapshotFile
+    changes: list[RequestChange]
+    unchanged_count: int
+
+    def transitions(self) -> Counter[tuple[str | None, str | None]]:
+        return Counter((change.old_status, change.new_status) for change in self.changes)
+
+    def open_assets_delta(self) -> int:
+        """Change in the assets of open requests. Unchanged requests contribute nothing."""
+        return sum(
+            (change.new_assets if change.new_status not in (None, "claimed") else 0)
+            - (change.old_assets if change.old_status not in (None, "claimed") else 0)
+            for change in self.changes
+        )
+
+    def claimable_now_assets_delta(self) -> int:
+        return sum(
+            (change.new_assets if change.new_status == "claimable_now" else 0)
+            - (change.old_assets if change.old_status == "claimable_now" else 0)
+            for change in self.changes
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        decimals = self.new.target.decimals
+        open_delta = self.open_assets_delta()
+        claimable_delta = self.claimable_now_assets_delta()
+        return {
+            "old": self.old.metadata(),
+            "new": self.new.metadata(),
+            "changed_count": len(self.changes),
+            "unchanged_count": self.unchanged_count,
+            "open_assets_delta_raw": str(open_delta),
+            "open_assets_delta": signed_units(open_delta, decimals),
+            "claimable_now_assets_delta_raw": str(claimable_delta),
+            "claimable_now_assets_delta": signed_units(claimable_delta, decimals),
+            "transitions": [
+                {"from": old_status, "to": new_status, "count": count}
+                for (old_status, new_status), count in sorted(self.transitions().items(), key=transition_key)
+            ],
+            "changes": [
+                {
+                    "request_id": change.request_id,
+                    "withdrawer": change.withdrawer,
+                    "old_status": change.old_status,
+                    "new_status": change.new_status,
+                    "assets_raw": str(change.assets),
+                    "assets": format_units(change.assets, decimals),
+                    "assets_delta_raw": str(change.assets_delta),
+                    "assets_delta": signed_units(change.assets_delta, decimals),
+                }
+                for change in self.changes
+            ],
+        }
+
+
+def signed_units(value: int, decimals: int) -> str:
+    return ("-" if value < 0 else "+") + format_units(abs(value), decimals)
+
+
+def transition_key(item: tuple[tuple[str | None, str | None], int]) -> tuple[str, str]:
+    (old_status, new_status), _ = item
+    return old_status or "", new_status or ""
+
+
+def request_change(old: SnapshotFile, old_index: int | None, new: SnapshotFile, new_index: int | None) -> RequestChange:
+    old_request = old.request(old_index) if old_index is not None else None
+    new_request = new.request(new_index) if new_index is not None else None
+    request = new_request or old_request
+    assert request is not None
+    return RequestChange(
+        request.request_id,
+        request.withdrawer,
+        old.status(old_index) if old_index is not None else None,
+        new.status(new_index) if new_index is not None else None,
+        old_request.assets if old_request else 0,
+        new_request.assets if new_request else 0,
+    )
+
+
+def diff_snapshot_files(old: SnapshotFile, new: SnapshotFile) -> SnapshotDiff:
+    """Compare two snapshots of the same ARM request by request."""
+    if old.chain_id != new.chain_id or old.target.address != new.target.address:
+        raise ValueError(
+            f"snapshots are of different ARMs: {old.target.name} on chain {old.chain_id} "
+            f"and {new.target.name} on chain {new.chain_id}"
+        )
+
+    changes: list[RequestChange] = []
+    unchanged = 0
+    if old.contiguous() and new.contiguous():
+        old_first = old.request_id(0) if old.count else 0
+        new_first = new.request_id(0) if new.count else 0
+        start = max(old_first, new_first)
+        end = max(start, min(old_first + old.count, new_first + new.count))
+        # Both files hold ids [start, end) at a fixed offset from each other: compare blocks of raw
+        # records and only look at single records inside blocks that differ.
+        old_offset, new_offset = start - old_first, start - new_first
+        for i in chain(range(min(old_offset, old.count)), range(old_offset + end - start, old.count)):
+            changes.append(request_change(old, i, new, None))
+        for i in chain(range(min(new_offset, new.count)), range(new_offset + end - start, new.count)):
+            changes.append(request_change(old, None, new, i))
+        for block in range(0, end - start, DIFF_BLOCK):
+            stop = min(end - start, block + DIFF_BLOCK)
+            if old.record_bytes(old_offset + block, old_offset + stop) == new.record_bytes(
+                new_offset + block, new_offset + stop
+            ):
+                unchanged += stop - block
+                continue
+            for i in range(block, stop):
+                if old.record_bytes(old_offset + i, old_offset + i + 1) == new.record_bytes(
+                    new_offset + i, new_offset + i + 1
+                ):
+                    unchanged += 1
+                else:
+                    changes.append(request_change(old, old_offset + i, new, new_offset + i))
+        changes.sort(key=lambda change: change.request_id)
+        return SnapshotDiff(old, new, changes, unchanged)
+
+    # Scans of open ids only leave gaps: match the records up by id instead.
+    old_positions = {request_id: index for index, request_id in enumerate(old.request_ids())}
+    new_positions = {request_id: index for index, request_id in enumerate(new.request_ids())}
+    for request_id in sorted(old_positions.keys() | new_positions.keys()):
+        old_index = old_positions.get(request_id)
+        new_index = new_positions.get(request_id)
+        if (
+            old_index is not None
+            and new_index is not None
+            and old.record_bytes(old_index, old_index + 1) == new.record_bytes(new_index, new_index + 1)
+        ):
+            unchanged += 1
+        else:
+            changes.append(request_change(old, old_index, new, new_index))
+    return SnapshotDiff(old, new, changes, unchanged)
+
+
+def diff_table_lines(diff: SnapshotDiff) -> list[str]:
+    old, new = diff.old, diff.new
+    target = new.target
+    decimals = target.decimals
+    arm_label = target.address if target.name == target.address else f"{target.name} {target.address}"
+    lines = [
+        f"ARM: {arm_label}",
+        (
+            f"Blocks: {old.snapshot.block_number} ({iso_timestamp(old.snapshot.block_timestamp)}) -> "
+            f"{new.snapshot.block_number} ({iso_timestamp(new.snapshot.block_timestamp)})"
+        ),
+        f"Total requests: {old.snapshot.next_withdrawal_index} -> {new.snapshot.next_withdrawal_index}",
+        (
+            f"Claimable frontier: {format_units(old.snapshot.claimable_frontier, decimals)} -> "
+            f"{format_units(new.snapshot.claimable_frontier, decimals)}"
+        ),
+        f"Changed requests: {len(diff.changes)} | unchanged: {diff.unchanged_count}",
+        (
+            f"Open assets: {signed_units(diff.open_assets_delta(), decimals)} | "
+            f"claimable now assets: {signed_units(diff.claimable_now_assets_delta(), decimals)}"
+        ),
+        "",
+    ]
+    if not diff.changes:
+        lines.append("No changes.")
+        return lines
+
+    for (old_status, new_status), count in sorted(diff.transitions().items(), key=transition_key):
+        lines.append(f"{old_status or '(none)'} -> {new_status or '(none)'}: {count}")
+    lines.append("")
+
+    rows = diff.to_dict()["changes"]
+    for row in rows:
+        row["old_status"] = row["old_status"] or "(none)"
+        row["new_status"] = row["new_status"] or "(none)"
+    columns = [
+        ("request_id", "id"),
+        ("withdrawer", "withdrawer"),
+        ("old_status", "old status"),
+        ("new_status", "new status"),
+        ("assets", "assets"),
+        ("assets_delta", "assets delta"),
+    ]
+    widths = {key: max(len(label), *(len(str(row[key])) for row in rows)) for key, label in columns}
+    lines.append("  ".join(label.ljust(widths[key]) for key, label in columns))
+    lines.append("  ".join("-" * widths[key] for key, _ in columns))
+    lines.extend("  ".join(str(row[key]).ljust(widths[key]) for key, _ in columns) for row in rows)
+    return lines
@@ -0,0 +1,277 @@
+"""Table, JSON, csv, ndjson and time-series output of the pending redeems checker."""
+
+from __future__ import annotations
+
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable
+
+from .core import PROFILER, QueueWatcher
+
+
+def run_watch(watcher: QueueWatcher, metadata: dict[str, Any], poll_interval: float, output_path: str | None) -> None:
+    output_file = Path(output_path).open("a") if output_path else sys.stdout
+    try:
+        print(json.dumps({"type": "snapshot", "metadata": metadata}), file=output_file, flush=True)
+        while True:
+            diff = watcher.poll()
+            if diff is None:
+                time.sleep(poll_interval)
+                continue
+            print(json.dumps(diff), file=output_file, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output_path:
+            output_file.close()
+
+
+def write_json(rows: Iterable[dict[str, Any]], metadata: dict[str, Any], output_path: str | None) -> None:
+    """Write {"metadata": ..., "requests": [...]} one row at a time.
+
+    The output matches json.dumps(payload, indent=2) without holding every row in memory.
+    """
+    output_file = Path(output_path).open("w") if output_path else sys.stdout
+    row_iter = iter(rows)
+    try:
+        with PROFILER.timed("write.json"):
+            metadata_text = json.dumps(metadata, indent=2).replace("\n", "\n  ")
+            output_file.write(f'{{\n  "metadata": {metadata_text},\n  "requests": [')
+            separator = "\n"
+            # Encoding rows a chunk at a time is much faster than one json.dumps call per row.
+            while chunk := list(islice(row_iter, 1000)):
+                # Drop the chunk's own "[\n" and "\n]" and indent its elements one more level.
+                output_file.write(separator + "  " + json.dumps(chunk, indent=2)[2:-2].replace("\n", "\n  "))
+                separator = ",\n"
+            output_file.write("]\n}\n" if separator == "\n" else "\n  ]\n}\n")
+            output_file.flush()
+    finally:
+        if output_path:
+            output_file.close()
+
+
+CSV_FIELDNAMES = [
+    "request_id",
+    "withdrawer",
+    "claimed",
+    "status",
+    "claimable_now",
+    "zero_shares",
+    "queue_units",
+    "requested_at_utc",
+    "claimable_at_utc",
+    "assets_raw",
+    "assets",
+    "queued_raw",
+    "queued",
+    "shares_raw",
+    "shares",
+]
+
+
+def write_csv(rows: Iterable[dict[str, Any]], output_path: str | None, with_arm: bool = False) -> None:
+    writer = StreamWriter("csv", output_path, with_arm)
+    try:
+        writer.write_rows(rows)
+    finally:
+        writer.close()
+
+
+class StreamWriter:
+    """Writes csv or ndjson rows as they are produced, flushing after every chunk.
+
+    ndjson lines carry a "type": one "metadata" line before each ARM's requests,
+    a "request" line per row, a "summary" line with the ARM's counts after them,
+    and a final "total" line when several ARMs are written.
+    """
+
+    def __init__(self, output_format: str, output_path: str | None, with_arm: bool = False) -> None:
+        self.output_format = output_format
+        self.output_file = Path(output_path).open("w", newline="") if output_path else sys.stdout
+        self.should_close = output_path is not None
+        self.csv_writer = None
+        if output_format == "csv":
+            fieldnames = ["arm", *CSV_FIELDNAMES] if with_arm else CSV_FIELDNAMES
+            self.csv_writer = csv.DictWriter(self.output_file, fieldnames=fieldnames)
+            self.csv_writer.writeheader()
+
+    def _write_line(self, line_type: str, payload: dict[str, Any]) -> None:
+        self.output_file.write(json.dumps({"type": line_type, **payload}, separators=(",", ":")) + "\n")
+
+    def begin_section(self, metadata: dict[str, Any]) -> None:
+        if self.output_format == "ndjson":
+            self._write_line("metadata", metadata)
+
+    def write_rows(self, rows: Iterable[dict[str, Any]]) -> None:
+        with PROFILER.timed(f"write.{self.output_format}"):
+            if self.csv_writer is not None:
+                self.csv_writer.writerows(rows)
+            else:
+                for row in rows:
+                    self._write_line("request", row)
+            self.output_file.flush()
+
+    def end_section(self, metadata: dict[str, Any]) -> None:
+        if self.output_format == "ndjson":
+            self._write_line("summary", metadata)
+            self.output_file.flush()
+
+    def write_total(self, summary: dict[str, Any]) -> None:
+        if self.output_format == "ndjson":
+            self._write_line("total", summary)
+
+    def close(self) -> None:
+        self.output_file.flush()
+        if self.should_close:
+            self.output_file.close()
+
+
+def write_table(rows: list[dict[str, Any]], metadata: dict[str, Any], output_path: str | None) -> None:
+    with PROFILER.timed("write.table", len(rows)):
+        write_text("\n".join(table_lines(rows, metadata)), output_path)
+
+
+def write_multi_table(
+    sections: list[tuple[list[dict[str, Any]], dict[str, Any]]],
+    summary: dict[str, Any],
+    output_path: str | None,
+) -> None:
+    windows = " in frontier windows" if summary.get("counts_scope") == "frontier_window" else ""
+    lines = [
+        f"Block: {summary['block_number']} ({summary['block_timestamp_utc']})",
+        (
+            f"ARMs: {summary['arm_count']} | open requests{windows}: {summary['open_count']} | "
+            f"claimable now: {summary['claimable_now_count']} | "
+            f"zero-share open: {summary['zero_share_open_count']}"
+        ),
+    ]
+    with PROFILER.timed("write.table", sum(len(rows) for rows, _ in sections)):
+        for rows, metadata in sections:
+            lines.extend(["", "=" * 72])
+            lines.extend(table_lines(rows, metadata))
+        write_text("\n".join(lines), output_path)
+
+
+SERIES_FIELDNAMES = [
+    "block_number",
+    "block_timestamp_utc",
+    "next_withdrawal_index",
+    "open_count",
+    "open_assets",
+    "claimable_frontier",
+    "claimable_now_count",
+    "waiting_liquidity_count",
+    "waiting_delay_count",
+    "claimed_count",
+    "mean_time_to_claim_s",
+    "oldest_open_age_s",
+]
+
+
+def write_series(
+    samples: Iterable[dict[str, Any]],
+    metadata: dict[str, Any],
+    output_format: str,
+    output_path: str | None,
+) -> None:
+    """Write --block-range samples. csv and ndjson rows are written as each sample arrives."""
+    if output_format in ("json", "table"):
+        rows = list(samples)
+        if output_format == "json":
+            write_text(json.dumps({"metadata": {**metadata, "sample_count": len(rows)}, "samples": rows}), output_path)
+            return
+        widths = {key: max(len(key), *(len(str(row[key])) for row in rows)) for key in SERIES_FIELDNAMES}
+        lines = [
+            f"ARM: {metadata['name']} {metadata['arm']}",
+            f"Blocks: {metadata['block_range']} ({len(rows)} samples)",
+            "",
+            "  ".join(key.ljust(widths[key]) for key in SERIES_FIELDNAMES),
+            "  ".join("-" * widths[key] for key in SERIES_FIELDNAMES),
+        ]
+        lines.extend("  ".join(str(row[key]).ljust(widths[key]) for key in SERIES_FIELDNAMES) for row in rows)
+        write_text("\n".join(lines), output_path)
+        return
+
+    output_file = Path(output_path).open("w", newline="") if output_path else sys.stdout
+    try:
+        if output_format == "csv":
+            csv_writer = csv.DictWriter(output_file, fieldnames=SERIES_FIELDNAMES)
+            csv_writer.writeheader()
+        else:
+            output_file.write(json.dumps({"type": "metadata", **metadata}, separators=(",", ":")) + "\n")
+        for sample in samples:
+            if output_format == "csv":
+                csv_writer.writerow(sample)
+            else:
+                output_file.write(json.dumps({"type": "sample", **sample}, separators=(",", ":")) + "\n")
+            output_file.flush()
+    finally:
+        if output_path:
+            output_file.close()
+
+
+def write_text(text: str, output_path: str | None) -> None:
+    if output_path:
+        Path(output_path).write_text(text + "\n")
+    else:
+        print(text)
+
+
+def table_lines(rows: list[dict[str, Any]], metadata: dict[str, Any]) -> list[str]:
+    arm_label = metadata["arm"] if metadata["name"] == metadata["arm"] else f"{metadata['name']} {metadata['arm']}"
+    # With --frontier only the ids around the frontier are read, so the counts cover that window alone.
+    window = " in frontier window" if metadata.get("counts_scope") == "frontier_window" else ""
+    lines = [
+        f"ARM: {arm_label}",
+        f"Block: {metadata['block_number']} ({metadata['block_timestamp_utc']})",
+        f"Total requests: {metadata['next_withdrawal_index']}",
+        f"Checked request ids: [{metadata['start_id']}, {metadata['end_id']})",
+        (
+            f"Open requests{window}: {metadata['open_count']} | "
+            f"claimable now: {metadata['claimable_now_count']} | "
+            f"zero-share open: {metadata['zero_share_open_count']}"
+        ),
+    ]
+    for totals in metadata.get("withdrawers", []):
+        lines.append(
+            f"Withdrawer {totals['withdrawer']}: open {totals['open_count']} ({totals['open_assets']}) | "
+            f"claimable now {totals['claimable_now_count']} ({totals['claimable_now_assets']})"
+        )
+    if metadata.get("failed_count"):
+        lines.append(f"Failed requests: {metadata['failed_count']}, left out of the counts and rows below")
+    if "frontier_id" in metadata:
+        lines.append(
+            f"Liquidity frontier: ids < {metadata['frontier_id']} are within claimable() | "
+            f"next {metadata['frontier_next_count']} need {metadata['liquidity_needed']} more "
+            f"({metadata['frontier_probes']} probes in {metadata['frontier_rounds']} rounds)"
+        )
+    lines.append("")
+
+    if not rows:
+        lines.append("No matching requests.")
+    else:
+        columns = [
+            ("request_id", "id"),
+            ("withdrawer", "withdrawer"),
+            ("status", "status"),
+            ("queue_units", "queue"),
+            ("assets", "assets"),
+            ("shares", "shares"),
+            ("claimable_at_utc", "claimable_at_utc"),
+        ]
+
+        widths = {
+            key: max(len(label), *(len(str(row[key])) for row in rows))
+            for key, label in columns
+        }
+        header = "  ".join(label.ljust(widths[key]) for key, label in columns)
+        separator = "  ".join("-" * widths[key] for key, _ in columns)
+        lines.extend([header, separator])
+        for row in rows:
+            lines.append("  ".join(str(row[key]).ljust(widths[key]) for key, _ in columns))
+
+    return lines
@@ -0,0 +1,5 @@
+"""Unit tests of the pending_redeems package.
+
+Run from script/ with `python -m unittest`. The RPC tests answer from the
+stand-in node of stand_in.py, served on a local port.
+"""
@@ -0,0 +1,421 @@
+"""A JSON-RPC stand-in node answering from a synthetic withdrawal queue.
+
+bench_pending_redeems.py serves it for the benchmarks; the unit tests serve it
+from a background thread with StandInServer.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from pending_redeems import core as redeems
+
+CHAIN_ID = 1
+HEAD_BLOCK = 31_000_000
+GENESIS_TIMESTAMP = 1_600_000_000
+BLOCK_TIME = 12
+CLAIM_DELAY = 600
+# Request i is made in block FIRST_REQUEST_BLOCK + i and, if claimed, claimed one block later. It comes
+# after the deployment blocks of KNOWN_ARMS, so event scans from those blocks see every request.
+FIRST_REQUEST_BLOCK = 21_000_000
+
+
+class SyntheticQueue:
+    """A withdrawal queue whose request fields are pure functions of the request id and block.
+
+    Requests below claimed_fraction of the queue are claimed, except every 50th
+    which is left open, like a straggler that never came back to claim.
+    """
+
+    def __init__(self, size: int, claimed_fraction: float, words: int) -> None:
+        self.size = size
+        self.claimed_fraction = claimed_fraction
+        self.claimed_boundary = int(size * claimed_fraction)
+        self.words = words
+
+    @staticmethod
+    def assets(request_id: int) -> int:
+        return 10**18 + (request_id % 97) * 10**16
+
+    @staticmethod
+    def queued(request_id: int) -> int:
+        # Closed form of sum(assets(k) for k in range(request_id + 1)).
+        full, rest = divmod(request_id + 1, 97)
+        return (request_id + 1) * 10**18 + (full * (96 * 97 // 2) + rest * (rest - 1) // 2) * 10**16
+
+    def claimed(self, request_id: int) -> bool:
+        return request_id < self.claimed_boundary and request_id % 50 != 0
+
+    @staticmethod
+    def withdrawer(request_id: int) -> int:
+        # 997 distinct withdrawers, so addresses come back to redeem again.
+        return ((request_id % 997) * 0x9E3779B97F4A7C15 + 1) % 2**160
+
+    def request_block(self, request_id: int) -> int:
+        return FIRST_REQUEST_BLOCK + request_id
+
+    def size_at(self, block_number: int) -> int:
+        return min(self.size, max(0, block_number - FIRST_REQUEST_BLOCK + 1))
+
+    def claimable_frontier(self, block_number: int) -> int:
+        # Liquid up to a little past the claimed part of the queue at that block.
+        count = self.size_at(block_number)
+        return self.queued(min(count - 1, int(count * self.claimed_fraction) + count // 100)) if count else 0
+
+    def fields(self, request_id: int, block_number: int) -> list[int]:
+        """withdrawalRequests return words of a request at a block, all zero before it is made."""
+        if request_id >= self.size_at(block_number):
+            return [0] * self.words
+        fields = [
+            self.withdrawer(request_id),
+            int(self.claimed(request_id) and self.request_block(request_id) + 1 <= block_number),
+            GENESIS_TIMESTAMP + self.request_block(request_id) * BLOCK_TIME + CLAIM_DELAY,
+            self.assets(request_id),
+            self.queued(request_id),
+        ]
+        if self.words == 6:
+            fields.append(self.assets(request_id))
+        return fields
+
+    def encode_request(self, request_id: int, block_number: int) -> bytes:
+        return b"".join(redeems.word(field) for field in self.fields(request_id, block_number))
+
+    def storage_words(self, request_id: int, block_number: int) -> tuple[int, int]:
+        """The request's two AbstractARM storage slots. The legacy 6-word layout is not modelled and reads as zero."""
+        if self.words == 6:
+            return 0, 0
+        withdrawer, claimed, claim_timestamp, assets, queued = self.fields(request_id, block_number)
+        return withdrawer | claimed << 160 | claim_timestamp << 168, assets | queued << 128
+
+
+def resolve_block(tag: str) -> int:
+    return {"latest": HEAD_BLOCK, "finalized": HEAD_BLOCK - 64}.get(tag) or int(tag, 16)
+
+
+class StandInNode:
+    def __init__(
+        self,
+        queue: SyntheticQueue,
+        error_rate: float,
+        max_calls: int | None,
+        state_override: bool = True,
+        subcall_error_rate: float = 0.0,
+        failing_ids: frozenset[int] = frozenset(),
+        seed: int = 1,
+    ) -> None:
+        self.queue = queue
+        self.error_rate = error_rate
+        self.max_calls = max_calls
+        self.state_override = state_override
+        self.subcall_error_rate = subcall_error_rate
+        self.failing_ids = failing_ids
+        # Storage slot -> (request id, 0 or 1 for the first or second slot), built on the first storage read.
+        self.slots: dict[int, tuple[int, int]] | None = None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def subcall(self, call_data: bytes, block_number: int) -> tuple[bool, bytes]:
+        selector = call_data[:4]
+        if selector == redeems.SELECTOR_WITHDRAWAL_REQUESTS:
+            request_id = int.from_bytes(call_data[4:36], "big")
+            with self.lock:
+                flaky = self.subcall_error_rate and self.random.random() < self.subcall_error_rate
+            if flaky or request_id in self.failing_ids:
+                return False, b""
+            return True, self.queue.encode_request(request_id, block_number)
+        if selector == redeems.SELECTOR_NEXT_WITHDRAWAL_INDEX:
+            return True, redeems.word(self.queue.size_at(block_number))
+        if selector == redeems.SELECTOR_CLAIMABLE:
+            return True, redeems.word(self.queue.claimable_frontier(block_number))
+        if selector == redeems.SELECTOR_CLAIM_DELAY:
+            return True, redeems.word(CLAIM_DELAY)
+        if selector == redeems.SELECTOR_GET_BLOCK_NUMBER:
+            return True, redeems.word(block_number)
+        if selector == redeems.SELECTOR_GET_CURRENT_BLOCK_TIMESTAMP:
+            return True, redeems.word(GENESIS_TIMESTAMP + block_number * BLOCK_TIME)
+        if selector == redeems.SELECTOR_GET_CHAIN_ID:
+            return True, redeems.word(CHAIN_ID)
+        return False, b""
+
+    def aggregate3(self, data: bytes, block_number: int) -> str:
+        if data[:4] != redeems.SELECTOR_AGGREGATE3:
+            raise ValueError("only Multicall3 aggregate3 is supported")
+        body = memoryview(data)[4:]
+        array_start = redeems.read_word(body, 0)
+        count = redeems.read_word(body, array_start)
+        if self.max_calls is not None and count > self.max_calls:
+            raise OverflowError("out of gas")
+
+        base = array_start + 32
+        encoded = []
+        for i in range(count):
+            tuple_start = base + redeems.read_word(body, base + 32 * i)
+            allow_failure = redeems.read_word(body, tuple_start + 32) != 0
+            bytes_start = tuple_start + redeems.read_word(body, tuple_start + 64)
+            length = redeems.read_word(body, bytes_start)
+            call_data = bytes(body[bytes_start + 32 : bytes_start + 32 + length])
+            success, return_data = self.subcall(call_data, block_number)
+            if not success and not allow_failure:
+                raise RuntimeError("execution reverted: Multicall3: call failed")
+            encoded.append(redeems.word(success) + redeems.word(64) + redeems.encode_bytes(return_data))
+
+        offsets = []
+        offset = 32 * count
+        for item in encoded:
+            offsets.append(redeems.word(offset))
+            offset += len(item)
+        return "0x" + (redeems.word(32) + redeems.word(count) + b"".join(offsets) + b"".join(encoded)).hex()
+
+    def execute(self, code: bytes, call_data: bytes, block_number: int) -> str:
+        """Run EVM code with only the opcodes the range reader uses. STATICCALLs are answered by subcall()."""
+        mask = 2**256 - 1
+        stack: list[int] = []
+        memory = bytearray()
+        return_data = b""
+        calls = 0
+        pc = 0
+
+        def expand(end: int) -> None:
+            if end > len(memory):
+                memory.extend(bytes(end - len(memory)))
+
+        while pc < len(code):
+            op = code[pc]
+            pc += 1
+            if 0x60 <= op <= 0x7F:
+                stack.append(int.from_bytes(code[pc : pc + op - 0x5F], "big"))
+                pc += op - 0x5F
+            elif 0x80 <= op <= 0x8F:
+                stack.append(stack[-(op - 0x7F)])
+            elif 0x90 <= op <= 0x9F:
+                depth = op - 0x8E
+                stack[-1], stack[-depth] = stack[-depth], stack[-1]
+            elif op in (0x01, 0x03, 0x10, 0x14, 0x1B):
+                a, b = stack.pop(), stack.pop()
+                if op == 0x01:
+                    stack.append((a + b) & mask)
+                elif op == 0x03:
+                    stack.append((a - b) & mask)
+                elif op == 0x10:
+                    stack.append(int(a < b))
+                elif op == 0x14:
+                    stack.append(int(a == b))
+                else:
+                    stack.append((b << a) & mask if a < 256 else 0)
+            elif op == 0x15:
+                stack.append(int(stack.pop() == 0))
+            elif op == 0x35:
+                offset = stack.pop()
+                stack.append(int.from_bytes(call_data[offset : offset + 32].ljust(32, b"\x00"), "big"))
+            elif op == 0x3D:
+                stack.append(len(return_data))
+            elif op == 0x51:
+                offset = stack.pop()
+                expand(offset + 32)
+                stack.append(int.from_bytes(memory[offset : offset + 32], "big"))
+            elif op == 0x52:
+                offset, value = stack.pop(), stack.pop()
+                expand(offset + 32)
+                memory[offset : offset + 32] = value.to_bytes(32, "big")
+            elif op == 0x56:
+                pc = stack.pop()
+            elif op == 0x57:
+                destination, condition = stack.pop(), stack.pop()
+                if condition:
+                    pc = destination
+            elif op == 0x5A:
+                stack.append(30_000_000)
+            elif op == 0x5B:
+                pass
+            elif op == 0xFA:
+                _, _, in_offset, in_size, out_offset, out_size = (stack.pop() for _ in range(6))
+                calls += 1
+                if self.max_calls is not None and calls > self.max_calls:
+                    raise OverflowError("out of gas")
+                expand(in_offset + in_size)
+                expand(out_offset + out_size)
+                success, return_data = self.subcall(bytes(memory[in_offset : in_offset + in_size]), block_number)
+                copied = return_data[:out_size]
+                memory[out_offset : out_offset + len(copied)] = copied
+                stack.append(int(success))
+            elif op == 0xF3:
+                offset, size = stack.pop(), stack.pop()
+                expand(offset + size)
+                return "0x" + memory[offset : offset + size].hex()
+            elif op == 0xFD:
+                raise RuntimeError("execution reverted")
+            elif op == 0x00:
+                break
+            else:
+                raise RuntimeError(f"invalid opcode 0x{op:02x}")
+        return "0x"
+
+    def eth_call(self, params: list[Any]) -> str:
+        to = params[0]["to"].lower()
+        data = bytes.fromhex(redeems.strip_0x(params[0]["data"]))
+        block_number = resolve_block(params[1] if len(params) > 1 else "latest")
+        overrides = {address.lower(): account for address, account in (params[2] if len(params) > 2 else {}).items()}
+        if self.state_override and "code" in overrides.get(to, {}):
+            return self.execute(bytes.fromhex(redeems.strip_0x(overrides[to]["code"])), data, block_number)
+        if to == redeems.MULTICALL3.lower():
+            return self.aggregate3(data, block_number)
+        # No code at the address: the call succeeds and returns nothing.
+        return "0x"
+
+    def storage_at(self, slot: int, block_number: int) -> int:
+        if slot == redeems.NEXT_WITHDRAWAL_INDEX_SLOT:
+            return self.queue.size_at(block_number)
+        with self.lock:
+            if self.slots is None:
+                self.slots = {}
+                for request_id in range(self.queue.size):
+                    first = redeems.withdrawal_request_slot(request_id)
+                    self.slots[first] = (request_id, 0)
+                    self.slots[first + 1] = (request_id, 1)
+        if slot not in self.slots:
+            return 0
+        request_id, half = self.slots[slot]
+        return self.queue.storage_words(request_id, block_number)[half]
+
+    def get_proof(self, keys: list[str], block_number: int) -> dict[str, Any]:
+        storage_proof = [
+            {"key": key, "value": hex(self.storage_at(int(key, 16), block_number)), "proof": []} for key in keys
+        ]
+        return {"accountProof": [], "balance": "0x0", "nonce": "0x0", "storageProof": storage_proof}
+
+    def get_logs(self, log_filter: dict[str, Any]) -> list[dict[str, Any]]:
+        from_block = int(log_filter["fromBlock"], 16)
+        to_block = int(log_filter["toBlock"], 16)
+        topic_filter = [*log_filter.get("topics", []), None, None][:2]
+        topics, withdrawers = ([topic] if isinstance(topic, str) else topic for topic in topic_filter)
+        topics = topics or [redeems.TOPIC_REDEEM_REQUESTED, redeems.TOPIC_REDEEM_CLAIMED]
+
+        logs = []
+        first_id = max(0, from_block - FIRST_REQUEST_BLOCK - 1)
+        last_id = min(self.queue.size - 1, to_block - FIRST_REQUEST_BLOCK)
+        for request_id in range(first_id, last_id + 1):
+            withdrawer = "0x" + f"{self.queue.withdrawer(request_id):064x}"
+            if withdrawers and withdrawer not in withdrawers:
+                continue
+            request_block = self.queue.request_block(request_id)
+            events = [(request_block, redeems.TOPIC_REDEEM_REQUESTED)]
+            if self.queue.claimed(request_id):
+                events.append((request_block + 1, redeems.TOPIC_REDEEM_CLAIMED))
+            for block_number, topic in events:
+                if from_block <= block_number <= to_block and topic in topics:
+                    logs.append(
+                        {
+                            "blockNumber": hex(block_number),
+                            "topics": [topic, withdrawer, "0x" + f"{request_id:064x}"],
+                            "data": "0x",
+                            "removed": False,
+                        }
+                    )
+        logs.sort(key=lambda log: int(log["blockNumber"], 16))
+        return logs
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        method = request.get("method")
+        params = request.get("params", [])
+        with self.lock:
+            inject_error = self.random.random() < self.error_rate
+        try:
+            if inject_error:
+                raise ConnectionError("injected error")
+            if method == "eth_chainId":
+                result: Any = hex(CHAIN_ID)
+            elif method == "eth_blockNumber":
+                result = hex(HEAD_BLOCK)
+            elif method == "eth_getBlockByNumber":
+                block_number = resolve_block(params[0])
+                result = {
+                    "number": hex(block_number),
+                    "hash": "0x" + f"{block_number:064x}",
+                    "timestamp": hex(GENESIS_TIMESTAMP + block_number * BLOCK_TIME),
+                }
+            elif method == "eth_call":
+                result = self.eth_call(params)
+            elif method == "eth_getStorageAt":
+                result = f"0x{self.storage_at(int(params[1], 16), resolve_block(params[2])):064x}"
+            elif method == "eth_getProof":
+                result = self.get_proof(params[1], resolve_block(params[2]))
+            elif method == "eth_getLogs":
+                result = self.get_logs(params[0])
+            else:
+                return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "not found"}}
+        except OverflowError as exc:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": str(exc)}}
+        except RuntimeError as exc:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": 3, "message": str(exc)}}
+        except ConnectionError as exc:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32603, "message": str(exc)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+
+def make_handler(
+    node: StandInNode, latency: float, http_error_rate: float = 0.0, slow_fraction: float = 0.0, slow: float = 0.0
+) -> type[BaseHTTPRequestHandler]:
+    rng = random.Random(7)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if latency:
+                time.sleep(latency)
+            if slow_fraction and rng.random() < slow_fraction:
+                time.sleep(slow)
+            if http_error_rate and rng.random() < http_error_rate:
+                body = b"service unavailable"
+                self.send_response(503)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if isinstance(payload, list):
+                response: Any = [node.handle(request) for request in payload]
+            else:
+                response = node.handle(payload)
+
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=1)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+class StandInServer:
+    def __init__(self, node: StandInNode) -> None:
+        self.node = node
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(node, 0.0))
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve_queue(
+    size: int, words: int = 5, claimed_fraction: float = 0.5, max_calls: int | None = None, **node_options: Any
+) -> StandInServer:
+    queue = SyntheticQueue(size, claimed_fraction, words)
+    return StandInServer(StandInNode(queue, 0.0, max_calls, **node_options))
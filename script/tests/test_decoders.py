@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import unittest
+
+from bench_redeem_decoder import generic_decode, synthetic_aggregate3_return
+from pending_redeems import core as redeems
+
+
+def aggregate3_return(results: list[tuple[bool, bytes]]) -> str:
+    tuples = [redeems.word(success) + redeems.word(64) + redeems.encode_bytes(data) for success, data in results]
+    offsets = []
+    offset = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(redeems.word(offset))
+        offset += len(encoded)
+    return "0x" + (redeems.word(32) + redeems.word(len(tuples)) + b"".join(offsets) + b"".join(tuples)).hex()
+
+
+def request_words(request_id: int, words: int) -> bytes:
+    fields = [0xABC + request_id, request_id % 2, 1_700_000_000 + request_id, 10**18 + request_id, 10**21, 7][:words]
+    return b"".join(redeems.word(field) for field in fields)
+
+
+class WithdrawalRequestDecoderTest(unittest.TestCase):
+    def test_fixed_layout_matches_generic_decoder(self) -> None:
+        request_ids = list(range(100, 350))
+        for words in (5, 6):
+            with self.subTest(words=words):
+                hex_data = synthetic_aggregate3_return(len(request_ids), words)
+                requests = redeems.decode_withdrawal_requests(hex_data, request_ids)
+                self.assertEqual(requests, generic_decode(hex_data, request_ids))
+                self.assertEqual({request.queue_units for request in requests}, {"assets" if words == 5 else "shares"})
+                self.assertEqual({request.claimed for request in requests}, {True, False})
+
+    def test_mixed_layouts_fall_back_to_generic_decoder(self) -> None:
+        request_ids = [1, 2, 3]
+        # Only request 2 comes from a 6-word ARM, so the results are not evenly spaced.
+        results = [(True, request_words(request_id, 6 if request_id == 2 else 5)) for request_id in request_ids]
+        hex_data = aggregate3_return(results)
+        requests = redeems.decode_withdrawal_requests(hex_data, request_ids)
+        self.assertEqual(requests, generic_decode(hex_data, request_ids))
+        self.assertEqual([request.shares for request in requests], [None, 7, None])
+
+    def test_empty_batch(self) -> None:
+        self.assertEqual(redeems.decode_withdrawal_requests(aggregate3_return([]), []), [])
+
+    def test_failed_call_raises(self) -> None:
+        for failed in (0, 2):
+            with self.subTest(failed=failed):
+                results = [(True, request_words(i, 5)) for i in range(3)]
+                results[failed] = (False, b"")
+                with self.assertRaises(RuntimeError):
+                    redeems.decode_withdrawal_requests(aggregate3_return(results), [0, 1, 2])
+
+    def test_failed_call_left_in_place_with_allow_failure(self) -> None:
+        hex_data = aggregate3_return([(True, request_words(0, 5)), (False, b"\x01"), (True, request_words(2, 5))])
+        requests = redeems.decode_withdrawal_requests_allowing_failure(hex_data, [0, 1, 2])
+        self.assertIsInstance(requests[1], RuntimeError)
+        self.assertEqual([request.request_id for request in (requests[0], requests[2])], [0, 2])
+        self.assertTrue(redeems.aggregate3_has_failure(hex_data))
+        self.assertFalse(redeems.aggregate3_has_failure(aggregate3_return([(True, request_words(0, 5))])))
+
+
+if __name__ == "__main__":
+    unittest.main()
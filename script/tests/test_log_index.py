@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+
+from pending_redeems import core as redeems
+
+from .stand_in import CHAIN_ID, FIRST_REQUEST_BLOCK, StandInNode, StandInServer, SyntheticQueue
+
+ARM = redeems.DEFAULT_ARM.lower()
+QUEUE_SIZE = 300
+# Pinned right after the last request is made, so the newest requests and claims are within the reorg depth.
+PINNED_BLOCK = FIRST_REQUEST_BLOCK + QUEUE_SIZE
+FROM_BLOCK = FIRST_REQUEST_BLOCK - 1
+
+
+class ReorgingNode(StandInNode):
+    """Drops the RedeemClaimed logs after dropped_claims_after, as if those blocks were reorged away."""
+
+    dropped_claims_after: int | None = None
+
+    def get_logs(self, log_filter: dict[str, Any]) -> list[dict[str, Any]]:
+        logs = super().get_logs(log_filter)
+        if self.dropped_claims_after is None:
+            return logs
+        return [
+            log
+            for log in logs
+            if log["topics"][0] != redeems.TOPIC_REDEEM_CLAIMED
+            or int(log["blockNumber"], 16) <= self.dropped_claims_after
+        ]
+
+
+class LogIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queue = SyntheticQueue(QUEUE_SIZE, 1.0, 5)
+        self.node = ReorgingNode(self.queue, 0.0, None)
+        server = StandInServer(self.node)
+        self.addCleanup(server.close)
+        self.client = redeems.RpcClient(server.url, 30)
+        self.addCleanup(self.client.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_dir = Path(tmp.name)
+
+    def open_ids(self, block_number: int) -> list[int]:
+        _, snapshots, _ = redeems.fetch_pinned_snapshots(self.client, [ARM], str(block_number))
+        return redeems.open_ids_from_logs(self.client, self.state_dir, CHAIN_ID, ARM, FROM_BLOCK, snapshots[0])
+
+    def expected_open_ids(self, block_number: int, claimed_until: int | None = None) -> list[int]:
+        last_block = block_number if claimed_until is None else min(block_number, claimed_until)
+        return [
+            request_id
+            for request_id in range(self.queue.size_at(block_number))
+            if not (self.queue.claimed(request_id) and self.queue.request_block(request_id) + 1 <= last_block)
+        ]
+
+    def saved_index(self) -> dict[str, Any]:
+        return json.loads((self.state_dir / f"{CHAIN_ID}-{ARM}-logs.json").read_text())
+
+    def test_recent_blocks_are_not_saved(self) -> None:
+        self.assertEqual(self.open_ids(PINNED_BLOCK), self.expected_open_ids(PINNED_BLOCK))
+        self.assertEqual(self.saved_index()["synced_block"], PINNED_BLOCK - redeems.LOG_REORG_DEPTH)
+
+    def test_reorged_claims_are_dropped(self) -> None:
+        self.open_ids(PINNED_BLOCK)
+        # The claims of the last 10 blocks are reorged away; the saved index must not still hold them.
+        self.node.dropped_claims_after = PINNED_BLOCK - 10
+        reorged = self.expected_open_ids(PINNED_BLOCK, PINNED_BLOCK - 10)
+        self.assertGreater(len(reorged), len(self.expected_open_ids(PINNED_BLOCK)))
+        self.assertEqual(self.open_ids(PINNED_BLOCK), reorged)
+
+    def test_index_ahead_of_pinned_block_is_rebuilt(self) -> None:
+        self.open_ids(PINNED_BLOCK)
+        saved = self.saved_index()
+        earlier = PINNED_BLOCK - 150
+        self.assertEqual(self.open_ids(earlier), self.expected_open_ids(earlier))
+        # The historical read does not roll the saved index back.
+        self.assertEqual(self.saved_index(), saved)
+
+    def test_known_arms_start_at_their_deployment_block(self) -> None:
+        self.assertLessEqual(redeems.deployment_block(ARM), FROM_BLOCK)
+        self.assertIsNone(redeems.deployment_block("0x" + "11" * 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+import warnings
+import zlib
+from pathlib import Path
+
+from pending_redeems import core as redeems
+
+from .stand_in import CHAIN_ID, HEAD_BLOCK, serve_queue
+
+ARM = redeems.DEFAULT_ARM.lower()
+QUEUE_SIZE = 300
+
+
+def read_queue(
+    url: str, reader: str, batch_size: int | redeems.BatchSizer = 64
+) -> tuple[list[redeems.WithdrawalRequest], str]:
+    """Read every request the way the command line does and return them with the reader that ended up used."""
+    client = redeems.RpcClient(url, 30)
+    client.reader = reader
+    try:
+        block_tag, snapshots, _ = redeems.fetch_pinned_snapshots(client, [ARM], "latest")
+        if reader in ("storage", "proof"):
+            problem = redeems.storage_layout_problem(client, block_tag, [(ARM, snapshots[0])])
+            if problem:
+                redeems.fall_back_to_multicall(client, problem)
+        keys = ((ARM, request_id) for request_id in range(snapshots[0].next_withdrawal_index))
+        requests = [
+            request for chunk in redeems.iter_request_keys(client, block_tag, keys, batch_size) for request in chunk
+        ]
+        return requests, client.reader
+    finally:
+        client.close()
+
+
+class ReaderParityTest(unittest.TestCase):
+    def check_readers(self, words: int) -> dict[str, tuple[list[redeems.WithdrawalRequest], str]]:
+        server = serve_queue(QUEUE_SIZE, words)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", redeems.ReaderFallbackWarning)
+                results = {reader: read_queue(server.url, reader) for reader in redeems.READERS}
+        finally:
+            server.close()
+
+        expected, _ = results["multicall"]
+        self.assertEqual([request.request_id for request in expected], list(range(QUEUE_SIZE)))
+        claimed = {request.claimed for request in expected}
+        self.assertEqual(claimed, {True, False}, "the queue should mix claimed and open requests")
+        for reader, (requests, _) in results.items():
+            with self.subTest(reader=reader):
+                self.assertEqual(requests, expected)
+        return results
+
+    def test_current_layout(self) -> None:
+        results = self.check_readers(5)
+        for reader, (requests, used) in results.items():
+            with self.subTest(reader=reader):
+                # Every reader reads this layout itself; none fell back to Multicall3.
+                self.assertEqual(used, reader)
+                self.assertTrue(all(request.shares is None for request in requests))
+
+    def test_legacy_layout_with_shares(self) -> None:
+        results = self.check_readers(6)
+        for reader, (requests, used) in results.items():
+            with self.subTest(reader=reader):
+                # The range reader and the slot readers only know the 5-word layout and must fall back.
+                self.assertEqual(used, "multicall")
+                self.assertTrue(all(request.shares == request.assets for request in requests))
+                self.assertTrue(all(request.queue_units == "shares" for request in requests))
+
+    def test_storage_fall_back_warns(self) -> None:
+        server = serve_queue(QUEUE_SIZE, 6)
+        try:
+            with self.assertWarns(redeems.ReaderFallbackWarning):
+                read_queue(server.url, "storage")
+        finally:
+            server.close()
+
+
+class StorageSlotTest(unittest.TestCase):
+    def test_slot_packing(self) -> None:
+        withdrawer = 0x1234567890ABCDEF1234567890ABCDEF12345678
+        values = []
+        for claimed in (1, 0):
+            values.append(hex(withdrawer | claimed << 160 | 1_700_000_600 << 168))
+            values.append(hex(10**18 | (5 * 10**21) << 128))
+        requests = redeems.decode_withdrawal_request_slots([7, 8], values)
+        self.assertEqual([request.claimed for request in requests], [True, False])
+        for request in requests:
+            self.assertEqual(request.withdrawer, f"0x{withdrawer:040x}")
+            self.assertEqual(request.claim_timestamp, 1_700_000_600)
+            self.assertEqual((request.assets, request.queued, request.shares), (10**18, 5 * 10**21, None))
+
+
+class BatchRetryTest(unittest.TestCase):
+    def test_connection_failures_are_retried_without_splitting(self) -> None:
+        server = serve_queue(QUEUE_SIZE)
+        client = redeems.RpcClient(server.url, 30)
+        try:
+            block_tag, _, _ = redeems.fetch_pinned_snapshots(client, [ARM], "latest")
+            post = client.transport.post
+            failures = [redeems.RpcConnectionError("RPC connection failed: reset")] * 2
+
+            def flaky_post(body: bytes) -> bytes:
+                if failures:
+                    raise failures.pop()
+                return post(body)
+
+            client.transport.post = flaky_post  # type: ignore[method-assign]
+            sizer = redeems.BatchSizer(64, 60.0)
+            keys = [(ARM, request_id) for request_id in range(128)]
+            chunks = redeems.iter_request_keys(client, block_tag, keys, sizer)
+            requests = [request for chunk in chunks for request in chunk]
+        finally:
+            client.close()
+            server.close()
+        self.assertEqual([request.request_id for request in requests], list(range(128)))
+        self.assertEqual(sizer.max_size, redeems.MAX_BATCH_SIZE)
+
+    def test_error_without_id_fails_the_whole_batch(self) -> None:
+        client = redeems.RpcClient("http://127.0.0.1:9", 30, retries=0)
+        self.addCleanup(client.close)
+        error = b'{"jsonrpc":"2.0","id":null,"error":{"code":-32005,"message":"daily request limit reached"}}'
+        for body in (error, b"[" + error + b"]"):
+            client.transport.post = lambda _, body=body: body  # type: ignore[method-assign]
+            for requests in ([("eth_chainId", [])], [("eth_chainId", []), ("eth_blockNumber", [])]):
+                with self.subTest(body=body[:1], requests=len(requests)):
+                    with self.assertRaisesRegex(redeems.RpcError, "daily request limit reached"):
+                        client.batch(requests)
+
+
+class BatchSplitTest(unittest.TestCase):
+    def test_sizer_limits(self) -> None:
+        sizer = redeems.BatchSizer(100, 1.0)
+        sizer.on_failure(100)
+        self.assertEqual((sizer.size, sizer.max_size), (50, 99))
+        sizer.on_success(50, 0.1)
+        self.assertEqual(sizer.size, 75)
+        sizer.on_success(75, 0.1)
+        self.assertEqual(sizer.size, 99)
+        # Slow or partial batches do not grow it.
+        sizer.on_success(99, 0.9)
+        sizer.on_success(10, 0.1)
+        self.assertEqual(sizer.size, 99)
+
+    def test_failed_batches_are_split(self) -> None:
+        server = serve_queue(QUEUE_SIZE, max_calls=40)
+        try:
+            sizer = redeems.BatchSizer(256, 60.0)
+            requests, _ = read_queue(server.url, "multicall", sizer)
+        finally:
+            server.close()
+        self.assertEqual([request.request_id for request in requests], list(range(QUEUE_SIZE)))
+        # Each failure halves the size, so it settles within a factor of two of what the node accepts.
+        self.assertLessEqual(sizer.size, 40)
+        self.assertLess(sizer.max_size, 80)
+
+    def test_other_failures_raise_without_splitting(self) -> None:
+        server = serve_queue(QUEUE_SIZE, failing_ids=frozenset({5}))
+        try:
+            sizer = redeems.BatchSizer(64, 60.0)
+            with self.assertRaisesRegex(redeems.RpcError, "call failed"):
+                read_queue(server.url, "multicall", sizer)
+        finally:
+            server.close()
+        self.assertEqual(sizer.max_size, redeems.MAX_BATCH_SIZE)
+
+
+class CallCacheTest(unittest.TestCase):
+    def test_results_with_failed_calls_are_not_cached(self) -> None:
+        server = serve_queue(QUEUE_SIZE, failing_ids=frozenset({5}))
+        self.addCleanup(server.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = redeems.CallCache(Path(tmp.name) / "calls.db", 2**20)
+        client = redeems.RpcClient(server.url, 30, retries=1, cache=cache)
+        self.addCleanup(client.close)
+        client.failures = redeems.FailureReport(client.retries + 1)
+
+        # Below the stand-in's finalized block, so the calls are cached.
+        block_tag, _, _ = redeems.fetch_pinned_snapshots(client, [ARM], str(HEAD_BLOCK - 100))
+        keys = [(ARM, request_id) for request_id in range(64)]
+        requests = [request for chunk in redeems.iter_request_keys(client, block_tag, keys, 32) for request in chunk]
+
+        self.assertEqual([request.request_id for request in requests], [i for i in range(64) if i != 5])
+        self.assertEqual([(failed.arm, failed.request_id) for failed in client.failures.failed], [(ARM, 5)])
+        cached = ["0x" + zlib.decompress(row[0]).hex() for row in cache.connection.execute("SELECT result FROM calls")]
+        # The snapshot and the batch without request 5; neither the batch with it nor its retries.
+        self.assertEqual(len(cached), 2)
+        self.assertFalse(any(redeems.aggregate3_has_failure(result) for result in cached))
+
+    def test_finalized_block_is_read_again_for_newer_calls(self) -> None:
+        server = serve_queue(QUEUE_SIZE)
+        self.addCleanup(server.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = redeems.CallCache(Path(tmp.name) / "calls.db", 2**20)
+        client = redeems.RpcClient(server.url, 30, cache=cache)
+        self.addCleanup(client.close)
+        # As if the finalized block was read a while ago, when it was 1000 blocks lower.
+        stale = time.monotonic() - redeems.FINALIZED_REFRESH_INTERVAL
+        client._cache_chain = (CHAIN_ID, HEAD_BLOCK - 1000, stale)
+
+        redeems.fetch_pinned_snapshots(client, [ARM], str(HEAD_BLOCK - 100))
+        self.assertEqual(client._cache_chain[:2], (CHAIN_ID, HEAD_BLOCK - 64))
+        self.assertEqual(cache.connection.execute("SELECT COUNT(*) FROM calls").fetchone(), (1,))
+
+
+if __name__ == "__main__":
+    unittest.main()
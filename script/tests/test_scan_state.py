@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from pending_redeems import core as redeems
+
+from .stand_in import CHAIN_ID, FIRST_REQUEST_BLOCK, StandInNode, StandInServer, SyntheticQueue
+
+ARM = redeems.DEFAULT_ARM.lower()
+QUEUE_SIZE = 300
+# Pinned right after the last request is made, so the newest claims are within the reorg depth.
+PINNED_BLOCK = FIRST_REQUEST_BLOCK + QUEUE_SIZE
+SAFE_BLOCK = PINNED_BLOCK - redeems.LOG_REORG_DEPTH
+
+
+class ScanStateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queue = SyntheticQueue(QUEUE_SIZE, 1.0, 5)
+        server = StandInServer(StandInNode(self.queue, 0.0, None))
+        self.addCleanup(server.close)
+        self.client = redeems.RpcClient(server.url, 30)
+        self.addCleanup(self.client.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.state_dir = Path(tmp.name)
+        self.target = redeems.resolve_arms([ARM], 18)[0]
+
+    def scan(self) -> redeems.QueueReport:
+        state = redeems.ScanState.load(self.state_dir, CHAIN_ID, ARM)
+        (report,) = redeems.scan_queues(
+            self.client, [self.target], str(PINNED_BLOCK), 64, include_claimed=True, states={ARM: state}
+        )
+        return report
+
+    def test_only_reorg_safe_claims_are_kept(self) -> None:
+        report = self.scan()
+        state = redeems.ScanState.load(self.state_dir, CHAIN_ID, ARM)
+        # Request i is claimed in block FIRST_REQUEST_BLOCK + i + 1.
+        safe_claims = [
+            request_id
+            for request_id in range(QUEUE_SIZE)
+            if self.queue.claimed(request_id) and FIRST_REQUEST_BLOCK + request_id + 1 <= SAFE_BLOCK
+        ]
+        self.assertEqual(sorted(state.entries), safe_claims)
+        self.assertEqual({read_block for _, read_block in state.entries.values()}, {SAFE_BLOCK})
+
+        # A second scan serves the kept claims and reads the rest again, with the same result.
+        self.assertEqual(self.scan().requests, report.requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
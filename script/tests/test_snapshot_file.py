@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+from bench_snapshot_diff import synthetic_store
+from pending_redeems import core as redeems
+from pending_redeems.snapshot_file import SnapshotFile, diff_snapshot_files, write_snapshot_file
+
+TARGET = redeems.ArmTarget("lidoARM", redeems.DEFAULT_ARM.lower(), 18)
+
+
+def subset(store: redeems.RequestStore, keep: set[int]) -> redeems.RequestStore:
+    kept = redeems.RequestStore()
+    for request, status in store.items():
+        if request.request_id in keep:
+            kept.append(request, status)
+    return kept
+
+
+def expected_transitions(old: redeems.RequestStore, new: redeems.RequestStore) -> Counter:
+    old_items = {request.request_id: (request, status) for request, status in old.items()}
+    new_items = {request.request_id: (request, status) for request, status in new.items()}
+    transitions: Counter = Counter()
+    for request_id in old_items.keys() | new_items.keys():
+        old_request, old_status = old_items.get(request_id, (None, None))
+        new_request, new_status = new_items.get(request_id, (None, None))
+        if (old_request, old_status) != (new_request, new_status):
+            transitions[(old_status, new_status)] += 1
+    return transitions
+
+
+class SnapshotFileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, store: redeems.RequestStore, block_number: int = 20_000_000) -> Path:
+        path = Path(self.tmp.name) / name
+        snapshot = redeems.Snapshot(block_number, 1_700_000_000, len(store), 10**21, 600)
+        write_snapshot_file(path, TARGET, 1, snapshot, store)
+        return path
+
+    def test_round_trip(self) -> None:
+        store = synthetic_store(1000, 0.5)
+        with SnapshotFile(self.write("queue.snap", store)) as snapshot_file:
+            self.assertEqual(len(snapshot_file), 1000)
+            self.assertEqual(snapshot_file.target, TARGET)
+            self.assertEqual(snapshot_file.chain_id, 1)
+            self.assertEqual(snapshot_file.snapshot.claimable_frontier, 10**21)
+            self.assertTrue(snapshot_file.contiguous())
+            self.assertEqual(list(snapshot_file.items()), list(store.items()))
+        self.assertEqual([path.name for path in Path(self.tmp.name).iterdir()], ["queue.snap"])
+
+    def test_long_names_are_cut_on_a_character_boundary(self) -> None:
+        # 31 ASCII bytes and then a 3-byte character straddling the 32-byte name field.
+        target = redeems.ArmTarget("a" * 31 + "\u20ac" + "ARM", TARGET.address, 18)
+        path = Path(self.tmp.name) / "named.snap"
+        write_snapshot_file(path, target, 1, redeems.Snapshot(1, 1, 0, 0, 600), redeems.RequestStore())
+        with SnapshotFile(path) as snapshot_file:
+            self.assertEqual(snapshot_file.target.name, "a" * 31)
+
+    def test_file_mode_follows_umask(self) -> None:
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+        path = self.write("mode.snap", synthetic_store(10, 0.5))
+        self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
+
+    def test_rejects_other_files(self) -> None:
+        path = Path(self.tmp.name) / "other.snap"
+        path.write_bytes(b"\0" * 512)
+        with self.assertRaises(ValueError):
+            SnapshotFile(path)
+
+    def test_diff(self) -> None:
+        # The later snapshot has 300 more requests, and more of the earlier ones are claimed.
+        old_store = synthetic_store(1000, 0.3)
+        new_store = synthetic_store(1300, 0.6)
+        cases = {
+            "contiguous": (old_store, new_store),
+            # Scans of open ids only leave gaps in the ids.
+            "gaps": (subset(old_store, set(range(0, 1000, 3))), subset(new_store, set(range(0, 1300, 2)))),
+            "identical": (new_store, new_store),
+        }
+        for name, (old, new) in cases.items():
+            with self.subTest(case=name):
+                old_path = self.write(f"{name}-old.snap", old)
+                new_path = self.write(f"{name}-new.snap", new, 20_001_000)
+                with SnapshotFile(old_path) as old_file, SnapshotFile(new_path) as new_file:
+                    diff = diff_snapshot_files(old_file, new_file)
+                    self.assertEqual(diff.transitions(), expected_transitions(old, new))
+                    self.assertEqual(
+                        [change.request_id for change in diff.changes],
+                        sorted(change.request_id for change in diff.changes),
+                    )
+                    self.assertEqual(
+                        len(diff.changes) + diff.unchanged_count,
+                        len({request.request_id for request, _ in (*old.items(), *new.items())}),
+                    )
+
+    def test_diff_rejects_other_arms(self) -> None:
+        store = synthetic_store(10, 0.5)
+        old_path = self.write("old.snap", store)
+        other = Path(self.tmp.name) / "other.snap"
+        target = redeems.ArmTarget("etherfiARM", redeems.KNOWN_ARMS["etherfiARM"][0].lower(), 18)
+        write_snapshot_file(other, target, 1, redeems.Snapshot(1, 1, 10, 0, 600), store)
+        with SnapshotFile(old_path) as old_file, SnapshotFile(other) as other_file:
+            with self.assertRaises(ValueError):
+                diff_snapshot_files(old_file, other_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
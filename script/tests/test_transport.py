@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest import mock
+
+from pending_redeems import core as redeems
+
+from .stand_in import CHAIN_ID, serve_queue
+
+NO_PROXY_ENV = {name: "" for name in ("HTTP_PROXY", "http_proxy", "HTTPS_PROXY", "https_proxy", "NO_PROXY", "no_proxy")}
+
+
+class TruncatedGzipHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = gzip.compress(b'{"jsonrpc":"2.0","id":1,"result":"0x1"}' * 20)[:-12]
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HttpTransportTest(unittest.TestCase):
+    def setUp(self) -> None:
+        server = serve_queue(10)
+        self.addCleanup(server.close)
+        self.url = server.url
+
+    def chain_id(self, rpc_url: str, **proxy_env: str) -> int:
+        with mock.patch.dict(os.environ, {**NO_PROXY_ENV, **proxy_env}):
+            client = redeems.RpcClient(rpc_url, 5, retries=0)
+        try:
+            return int(client.call("eth_chainId", []), 16)
+        finally:
+            client.close()
+
+    def test_http_proxy(self) -> None:
+        # The stand-in answers whatever URL it is asked for, so it can stand in for the proxy too.
+        self.assertEqual(self.chain_id("http://rpc.invalid/key", http_proxy=self.url), CHAIN_ID)
+
+    def test_no_proxy(self) -> None:
+        closed = "http://127.0.0.1:9"
+        self.assertEqual(self.chain_id(self.url, http_proxy=closed, no_proxy="127.0.0.1"), CHAIN_ID)
+        with self.assertRaises(redeems.RpcConnectionError):
+            self.chain_id(self.url, http_proxy=closed)
+
+    def test_truncated_gzip_body(self) -> None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TruncatedGzipHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        transport = redeems.HttpTransport(f"http://127.0.0.1:{server.server_port}", 5)
+        self.addCleanup(transport.close)
+        with self.assertRaisesRegex(redeems.RpcConnectionError, "truncated"):
+            transport.post(b"{}")
+
+
+if __name__ == "__main__":
+    unittest.main()